@@ -0,0 +1,57 @@
+# ----------------------------------------
+# Compares CisaLogicEvaluator.eval with the compiled form on realistic skip conditions.
+#
+# PYTHONPATH=src python benchmarks/bench_compiled_eval.py
+# ----------------------------------------
+
+import random
+import timeit
+
+from surveylang.logicelements.logicparser import CisaLogicParser, CisaLogicEvaluator
+from surveylang.logicelements.logiccompiler import CisaLogicCompiler
+
+N_SECTIONS = 40
+N_ITEMS = 200
+N_EXPRESSIONS = 500
+
+
+def skip_condition(rnd: random.Random) -> str:
+    templates = [
+        'IN({v}, S{s})',
+        'EQ({v}, I{i}) AND IN({v}, S{s})',
+        'ANY(IN({v}, S{s}), IN({w}, S{s}), EQ({v}, I{i}))',
+        'ALL(GTE({v}, I{i}), LT({w}, I{j}), NOT IN(99, S{s}))',
+        'NOT ANY(SGT({w}, S{s}), SLTE({v}, S{s}))',
+        'ALL(EQ(1, I{i}), ANY(GT({v}, I{j}), IN({w}, S{s})), NOT EQ(9, I{j}))',
+    ]
+    return rnd.choice(templates).format(v=rnd.randint(1, 5), w=rnd.randint(5, 10), s=rnd.randint(1, N_SECTIONS),
+                                        i=rnd.randint(1, N_ITEMS), j=rnd.randint(1, N_ITEMS))
+
+
+def main():
+    rnd = random.Random(7)
+    parser = CisaLogicParser()
+    ref_dict = {'S{}'.format(i + 1): i for i in range(N_SECTIONS)}
+    ref_dict.update({'I{}'.format(i + 1): i for i in range(N_ITEMS)})
+    per_section = N_ITEMS // N_SECTIONS
+    section_responses = [[rnd.randint(1, 10) for _ in range(per_section)] for _ in range(N_SECTIONS)]
+    logics = [parser.parse(skip_condition(rnd)) for _ in range(N_EXPRESSIONS)]
+
+    evaluator = CisaLogicEvaluator(ref_dict, section_responses)
+    compiler = CisaLogicCompiler(ref_dict)
+    compiled = [compiler.compile(logic) for logic in logics]
+    assert [bool(evaluator.eval(x)) for x in logics] == [c.eval(evaluator) for c in compiled]
+
+    items = evaluator.item_responses
+    n = 20
+    t_eval = min(timeit.repeat(lambda: [evaluator.eval(x) for x in logics], number=n, repeat=5))
+    t_comp = min(timeit.repeat(lambda: [c(section_responses, items) for c in compiled], number=n, repeat=5))
+    per_eval = 1e6 * t_eval / (n * N_EXPRESSIONS)
+    per_comp = 1e6 * t_comp / (n * N_EXPRESSIONS)
+    print('eval(logic):      {:8.3f} us/expression'.format(per_eval))
+    print('compiled(S, I):   {:8.3f} us/expression'.format(per_comp))
+    print('speedup:          {:8.1f}x'.format(per_eval / per_comp))
+
+
+if __name__ == '__main__':
+    main()
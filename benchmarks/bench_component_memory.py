@@ -0,0 +1,49 @@
+# ----------------------------------------
+# Memory and construction time of Option and Item objects.
+#
+# PYTHONPATH=src python benchmarks/bench_component_memory.py
+# ----------------------------------------
+
+import timeit
+import tracemalloc
+
+from surveylang.models import instrument_components as components
+
+N = 100_000
+
+
+def make_option(i: int) -> components.Option:
+    option = components.Option()
+    option.set_value(i % 5 + 1)
+    option.set_text('Option')
+    return option
+
+
+def make_item(i: int) -> components.Item:
+    item = components.Item()
+    item.set_shortname('item')
+    return item
+
+
+def measure(name: str, make):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [make(i) for i in range(N)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    per_object = (after - before) / N
+    del objects
+    seconds = min(timeit.repeat(lambda: [make(i) for i in range(N)], number=1, repeat=5))
+    print('{:<7} {:8.1f} bytes/object  {:8.3f} us/object'.format(name, per_object, 1e6 * seconds / N))
+
+
+def main():
+    measure('Option', make_option)
+    measure('Item', make_item)
+    items = [make_item(i) for i in range(N)]
+    seconds = min(timeit.repeat(lambda: [x.get_uid() for x in items], number=1, repeat=1))
+    print('first get_uid: {:8.3f} us/object'.format(1e6 * seconds / N))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# ----------------------------------------
+# Evaluating skip conditions respondent by respondent: a new CisaLogicEvaluator per respondent
+# against one FlatCisaLogicEvaluator rebound to each row of a response matrix.
+#
+# PYTHONPATH=src python benchmarks/bench_flat_evaluator.py
+# ----------------------------------------
+
+import random
+import timeit
+
+import numpy as np
+
+from surveylang.logicelements.logicparser import CisaLogicParser, CisaLogicEvaluator, FlatCisaLogicEvaluator, \
+    DESCENT_BACKEND
+
+N_RESPONDENTS = 5000
+N_SECTIONS = 40
+ITEMS_PER_SECTION = 5
+N_CONDITIONS = 20
+
+
+def skip_condition(rnd: random.Random) -> str:
+    n_items = N_SECTIONS * ITEMS_PER_SECTION
+    templates = [
+        'IN({v}, S{s})',
+        'EQ({v}, I{i}) AND IN({v}, S{s})',
+        'ANY(IN({v}, S{s}), SGT({w}, S{s}), EQ({v}, I{i}))',
+        'ALL(GTE({v}, I{i}), LT({w}, I{j}), NOT IN(9, S{s}))',
+    ]
+    return rnd.choice(templates).format(v=rnd.randint(1, 5), w=rnd.randint(5, 10), s=rnd.randint(1, N_SECTIONS),
+                                        i=rnd.randint(1, n_items), j=rnd.randint(1, n_items))
+
+
+def main():
+    rnd = random.Random(3)
+    offsets = list(range(0, N_SECTIONS * ITEMS_PER_SECTION + 1, ITEMS_PER_SECTION))
+    ref_dict = {'S{}'.format(s + 1): s for s in range(N_SECTIONS)}
+    ref_dict.update({'I{}'.format(i + 1): i for i in range(offsets[-1])})
+    parser = CisaLogicParser(DESCENT_BACKEND)
+    logics = [parser.parse(skip_condition(rnd)) for _ in range(N_CONDITIONS)]
+    values = np.random.default_rng(3).integers(1, 10, size=(N_RESPONDENTS, offsets[-1]))
+    rows = values.tolist()
+    sections = list(zip(offsets, offsets[1:]))
+
+    def per_respondent(conditions):
+        for row in rows:
+            evaluator = CisaLogicEvaluator(ref_dict, [row[a:b] for a, b in sections])
+            for logic in conditions:
+                evaluator.eval(logic)
+
+    flat = FlatCisaLogicEvaluator(ref_dict, offsets)
+
+    def rebound(conditions):
+        for row in values:
+            flat.bind(row)
+            for logic in conditions:
+                flat.eval(logic)
+
+    for label, conditions in (('bind only', []), ('{} conditions'.format(N_CONDITIONS), logics)):
+        t_new = min(timeit.repeat(lambda: per_respondent(conditions), number=1, repeat=3))
+        t_flat = min(timeit.repeat(lambda: rebound(conditions), number=1, repeat=3))
+        print('{:<14} new evaluator {:8.2f} us/respondent   rebound flat {:8.2f} us/respondent'.format(
+            label, 1e6 * t_new / N_RESPONDENTS, 1e6 * t_flat / N_RESPONDENTS))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+# ----------------------------------------
+# Import time of the models and cost of the first parse, each measured in a fresh interpreter,
+# plus the time to build the LALR tables compared with loading the shipped ones.
+#
+# PYTHONPATH=src python benchmarks/bench_import_time.py
+# ----------------------------------------
+
+import os
+import subprocess
+import sys
+import timeit
+
+PROBE = '''
+import sys, time
+t0 = time.perf_counter()
+import surveylang.models.instrument_component_base
+t1 = time.perf_counter()
+from surveylang.logicelements.logicparser import parse_cached
+parse_cached('EQ(1, I1)')
+t2 = time.perf_counter()
+print(t1 - t0, t2 - t1)
+'''
+
+
+def run_probe(runs: int = 10) -> tuple[float, float]:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    imports, parses = [], []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', PROBE], capture_output=True, text=True, env=env, check=True)
+        t_import, t_parse = map(float, out.stdout.split())
+        imports.append(t_import)
+        parses.append(t_parse)
+    return min(imports), min(parses)
+
+
+def main():
+    t_import, t_parse = run_probe()
+    print('import instrument_component_base: {:7.1f} ms'.format(1e3 * t_import))
+    print('first parse (loads sly):          {:7.1f} ms'.format(1e3 * t_parse))
+
+    from sly.yacc import LRTable
+    from surveylang.logicelements.logicgrammar import LogicParser, CachedLRTable, TABLES_FILE
+    signature = LogicParser.get_signature()
+    t_build = min(timeit.repeat(lambda: LRTable(LogicParser._grammar), number=1, repeat=5))
+    t_load = min(timeit.repeat(lambda: CachedLRTable.load(TABLES_FILE, signature), number=1, repeat=5))
+    print('build LALR tables:                {:7.1f} ms'.format(1e3 * t_build))
+    print('load shipped tables:              {:7.1f} ms'.format(1e3 * t_load))
+
+
+if __name__ == '__main__':
+    main()
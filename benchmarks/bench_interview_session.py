@@ -0,0 +1,84 @@
+# ----------------------------------------
+# Per-event latency of InterviewSession on an instrument with 10k entry/exit conditions.
+#
+# PYTHONPATH=src python benchmarks/bench_interview_session.py
+# ----------------------------------------
+
+import random
+import time
+
+from surveylang.models.instrument_component_base import InstrumentLogicBlock, InstrumentLogicExpression
+from surveylang.models.interview_session import InterviewSession
+from surveylang.models import instrument_components as components
+
+N_SECTIONS = 500  # One single-answer item per section
+N_SEGMENTS = 2500
+CONDITIONS_PER_BLOCK = 2  # Entry and exit: 4 conditions per segment
+N_EVENTS = 5000
+
+
+def condition(rnd: random.Random) -> str:
+    s, i = rnd.randint(1, N_SECTIONS), rnd.randint(1, N_SECTIONS)
+    return rnd.choice(['IN({v}, S{s})', 'EQ({v}, I{i}) AND NOT IN(9, S{s})', 'GT({v}, I{i})',
+                       'ANY(SLT({v}, S{s}), EQ({v}, I{i}))']).format(v=rnd.randint(1, 5), s=s, i=i)
+
+
+def build(rnd: random.Random) -> components.Questionnaire:
+    questionnaire = components.Questionnaire()
+    section = components.Section()
+    question = components.Question()
+    battery = components.Battery()
+    for n in range(N_SEGMENTS):
+        segment = components.Segment()
+        segment.set_shortname('SEG{}'.format(n))
+        segment.set_entry_logic(InstrumentLogicBlock(
+            [InstrumentLogicExpression(condition(rnd), '@NEXT') for _ in range(CONDITIONS_PER_BLOCK)], '@HERE'))
+        segment.set_exit_logic(InstrumentLogicBlock(
+            [InstrumentLogicExpression(condition(rnd), '@NEXT') for _ in range(CONDITIONS_PER_BLOCK)]))
+        battery.add_child(segment)
+    question.add_child(battery)
+    section.add_child(question)
+    questionnaire.add_child(section)
+    return questionnaire
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def main():
+    rnd = random.Random(3)
+    questionnaire = build(rnd)
+    ref_dict = {'S{}'.format(i + 1): i for i in range(N_SECTIONS)}
+    ref_dict.update({'I{}'.format(i + 1): i for i in range(N_SECTIONS)})
+    started = time.perf_counter()
+    session = InterviewSession(questionnaire, ref_dict, [[rnd.randint(1, 5)] for _ in range(N_SECTIONS)])
+    print('conditions: {}, session setup: {:.1f} ms'.format(session.get_condition_count(),
+                                                             1e3 * (time.perf_counter() - started)))
+    session.start()
+
+    latencies, evaluations = [], []
+    for _ in range(N_EVENTS):
+        n = rnd.randint(1, N_SECTIONS)
+        ref, value = (('I{}'.format(n), rnd.randint(1, 9)) if rnd.random() < 0.5
+                      else ('S{}'.format(n), [rnd.randint(1, 9)]))
+        started = time.perf_counter()
+        session.set_answer(ref, value)
+        latencies.append(time.perf_counter() - started)
+        evaluations.append(session.last_event_evaluations)
+    print('set_answer: mean {:.1f} us, p50 {:.1f} us, p99 {:.1f} us, {:.1f} conditions re-evaluated per event'.format(
+        1e6 * sum(latencies) / len(latencies), 1e6 * percentile(latencies, 0.5), 1e6 * percentile(latencies, 0.99),
+        sum(evaluations) / len(evaluations)))
+
+    steps = []
+    for _ in range(200):
+        started = time.perf_counter()
+        session.get_next_component()
+        steps.append(time.perf_counter() - started)
+    print('get_next_component: mean {:.1f} us, p99 {:.1f} us'.format(1e6 * sum(steps) / len(steps),
+                                                                      1e6 * percentile(steps, 0.99)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# ----------------------------------------
+# Out-of-core waves: writing a MappedResponseStore, opening it (small and large files), and streaming
+# batch evaluation and tabulation over it in chunks, against the same answers in a SparseResponseStore.
+#
+# PYTHONPATH=src python benchmarks/bench_mapped_store.py
+# ----------------------------------------
+
+import os
+import tempfile
+import timeit
+
+import numpy as np
+
+from surveylang.models.mapped_response_store import MappedResponseStore
+from surveylang.models.sparse_response_store import SparseResponseStore
+from surveylang.logicelements.logicparser import CisaLogicParser, DESCENT_BACKEND
+
+N_RESPONDENTS = 200_000
+N_SECTIONS = 40
+ITEMS_PER_SECTION = 10
+ANSWERED = 0.08
+CHUNK_SIZE = 50_000
+
+CONDITIONS = [
+    'EQ(3, I17)',
+    'IN(5, S12)',
+    'ANY(SGT(7, S3), EQ(1, I250), NOT IN(2, S30))',
+    'ALL(GTE(4, I8), LT(9, I9), IN(1, S1))',
+]
+
+
+def main():
+    rng = np.random.default_rng(5)
+    n_items = N_SECTIONS * ITEMS_PER_SECTION
+    section_offsets = list(range(0, n_items + 1, ITEMS_PER_SECTION))
+    ref_dict = {'S{}'.format(s + 1): s for s in range(N_SECTIONS)}
+    ref_dict.update({'I{}'.format(i + 1): i for i in range(n_items)})
+    parser = CisaLogicParser(DESCENT_BACKEND)
+    logics = [parser.parse(expr) for expr in CONDITIONS]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        small = MappedResponseStore.create(os.path.join(tmp, 'small'))
+        small.append_answers([1], [1], raw=['1'])
+        small.close()
+
+        path = os.path.join(tmp, 'wave')
+        memory = SparseResponseStore()
+        rows = []
+        for _ in range(N_RESPONDENTS):
+            slots = np.flatnonzero(rng.random(n_items) < ANSWERED)
+            values = rng.integers(0, 10, len(slots))
+            rows.append((slots, values, [str(v) for v in values.tolist()]))
+            memory.append_answers(slots, values)
+
+        def write():
+            with MappedResponseStore.create(path, buffer_size=4096) as store:
+                for slots, values, raw in rows:
+                    store.append_answers(slots, values, raw=raw)
+
+        t_write = timeit.timeit(write, number=1)
+        store = MappedResponseStore(path)
+        print('{} respondents, {:.1f} answers each, {:.1f} MB on disk, written in {:.2f} s ({:.1f} us/respondent)'.format(
+            len(store), store.get_response_count() / len(store), store.nbytes() / 1e6, t_write,
+            1e6 * t_write / len(store)))
+        for label, name in (('small', 'small'), ('large', 'wave')):
+            t_open = min(timeit.repeat(lambda: MappedResponseStore(os.path.join(tmp, name)), number=20, repeat=5)) / 20
+            print('open {:<5} {:8.1f} us'.format(label, 1e6 * t_open))
+
+        batch = memory.get_batch_evaluator(ref_dict, section_offsets)
+
+        def in_memory():
+            evaluator = memory.get_batch_evaluator(ref_dict, section_offsets)
+            return [evaluator.eval(x) for x in logics]
+
+        t_memory = min(timeit.repeat(in_memory, number=1, repeat=3))
+        t_mapped = min(timeit.repeat(lambda: store.eval_all(logics, ref_dict, section_offsets, CHUNK_SIZE),
+                                     number=1, repeat=3))
+        assert all((batch.eval(x) == r).all() for x, r in
+                   zip(logics, store.eval_all(logics, ref_dict, section_offsets, CHUNK_SIZE)))
+        print('{} conditions, index + eval: in memory {:7.1f} ms   mapped, chunks of {} {:7.1f} ms'.format(
+            len(logics), 1e3 * t_memory, CHUNK_SIZE, 1e3 * t_mapped))
+
+        where = store.eval(logics[1], ref_dict, section_offsets, CHUNK_SIZE)
+        t_tab = min(timeit.repeat(lambda: store.tabulate(16, where, CHUNK_SIZE), number=1, repeat=3))
+        print('tabulate I17 where IN(5, S12): {:7.1f} ms'.format(1e3 * t_tab))
+        chunk = next(store.iter_chunks(CHUNK_SIZE))
+        print('item_idx + val of one chunk: {:.1f} MB (whole wave in memory: {:.1f} MB)'.format(
+            (chunk.column('item_idx').nbytes + chunk.column('val').nbytes) / 1e6, memory.nbytes() / 1e6))
+
+
+if __name__ == '__main__':
+    main()
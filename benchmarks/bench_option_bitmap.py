@@ -0,0 +1,58 @@
+# ----------------------------------------
+# Conditions on a checkbox section over a batch of respondents: the padded values block with an answered mask
+# against one SectionBitmap (a uint64 word per respondent).
+#
+# PYTHONPATH=src python benchmarks/bench_option_bitmap.py
+# ----------------------------------------
+
+import timeit
+
+import numpy as np
+
+from surveylang.logicelements.batchevaluator import CisaBatchEvaluator, SectionBitmap
+from surveylang.logicelements.logicparser import CisaLogicParser, DESCENT_BACKEND
+
+N_RESPONDENTS = 200_000
+N_OPTIONS = 24
+MAX_SELECTED = 8
+
+CONDITIONS = [
+    'IN(7, S1)',
+    'SLT(3, S1)',
+    'SGTE(20, S1)',
+    'ANY(IN(2, S1), IN(5, S1), IN(11, S1), IN(17, S1))',
+    'ALL(IN(1, S1), NOT IN(24, S1))',
+]
+
+
+def main():
+    rng = np.random.default_rng(8)
+    selected = rng.random((N_RESPONDENTS, N_OPTIONS)) < MAX_SELECTED / (2 * N_OPTIONS)
+    option_values = np.arange(1, N_OPTIONS + 1)
+
+    # Values layout: the selected values left aligned in MAX_SELECTED columns, the rest masked out
+    selected[np.cumsum(selected, axis=1) > MAX_SELECTED] = False
+    counts = selected.sum(axis=1)
+    values = np.zeros((N_RESPONDENTS, MAX_SELECTED), dtype=np.int64)
+    answered = np.arange(MAX_SELECTED) < counts[:, None]
+    values[answered] = np.broadcast_to(option_values, selected.shape)[selected]
+
+    ref_dict = {'S1': 0}
+    by_values = CisaBatchEvaluator(ref_dict, values, [0, MAX_SELECTED], answered)
+    bitmap = SectionBitmap.from_selected(selected, option_values)
+    by_bits = CisaBatchEvaluator(ref_dict, values, [0, MAX_SELECTED], answered, bitmaps={0: bitmap})
+    print('values block {:6.1f} bytes/respondent   bitmap {:6.1f} bytes/respondent'.format(
+        (values.nbytes + answered.nbytes) / N_RESPONDENTS, bitmap.words.nbytes / N_RESPONDENTS))
+
+    parser = CisaLogicParser(DESCENT_BACKEND)
+    for expr in CONDITIONS:
+        logic = parser.parse(expr)
+        assert (by_values.eval(logic) == by_bits.eval(logic)).all()
+        t_values = min(timeit.repeat(lambda: by_values.eval(logic), number=5, repeat=5)) / 5
+        t_bits = min(timeit.repeat(lambda: by_bits.eval(logic), number=5, repeat=5)) / 5
+        print('{:<52} values {:7.2f} ms   bitmap {:7.2f} ms   {:5.1f}x'.format(
+            expr, 1e3 * t_values, 1e3 * t_bits, t_values / t_bits))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# ----------------------------------------
+# Parse throughput of the sly backend and the recursive-descent backend on a corpus of skip conditions.
+#
+# PYTHONPATH=src python benchmarks/bench_parser_backends.py
+# ----------------------------------------
+
+import random
+import timeit
+
+from surveylang.logicelements.logicparser import CisaLogicParser, SLY_BACKEND, DESCENT_BACKEND
+
+N_EXPRESSIONS = 5000
+
+
+def condition(rnd: random.Random, depth: int = 2) -> str:
+    if depth == 0 or rnd.random() < 0.4:
+        template = rnd.choice(['IN({v}, S{s})', 'EQ({v}, I{i})', 'GTE({v}, I{i})', 'SLT({v}, S{s})',
+                               'NOT IN({v}, S{s})'])
+        return template.format(v=rnd.randint(1, 10), s=rnd.randint(1, 40), i=rnd.randint(1, 400))
+    args = [condition(rnd, depth - 1) for _ in range(rnd.randint(2, 4))]
+    return rnd.choice([
+        lambda: 'ANY({})'.format(', '.join(args)),
+        lambda: 'ALL({})'.format(', '.join(args)),
+        lambda: ' AND '.join(args),
+        lambda: ' OR '.join(args),
+        lambda: 'NOT({})'.format(args[0]),
+    ])()
+
+
+def main():
+    rnd = random.Random(11)
+    corpus = [condition(rnd) for _ in range(N_EXPRESSIONS)]
+    tokens = sum(len(CisaLogicParser(DESCENT_BACKEND).lexer.tokenize(x)) - 1 for x in corpus)
+    print('{} expressions, {:.1f} tokens/expression'.format(N_EXPRESSIONS, tokens / N_EXPRESSIONS))
+
+    trees, seconds = {}, {}
+    for backend in (SLY_BACKEND, DESCENT_BACKEND):
+        parser = CisaLogicParser(backend)
+        trees[backend] = [parser.parse(x) for x in corpus]  # Also loads the backend
+        seconds[backend] = min(timeit.repeat(lambda: [parser.parse(x) for x in corpus], number=1, repeat=5))
+        print('{:<8} {:8.2f} us/expression  {:10.0f} expressions/s'.format(
+            backend, 1e6 * seconds[backend] / N_EXPRESSIONS, N_EXPRESSIONS / seconds[backend]))
+    assert trees[SLY_BACKEND] == trees[DESCENT_BACKEND]
+    print('speedup: {:.1f}x'.format(seconds[SLY_BACKEND] / seconds[DESCENT_BACKEND]))
+
+
+if __name__ == '__main__':
+    main()
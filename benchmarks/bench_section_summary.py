@@ -0,0 +1,48 @@
+# ----------------------------------------
+# Section operators on multi-select sections: scanning the answers for every condition against
+# summarizing each section once per respondent (SectionSummary) and answering them with lookups.
+# The conditions read a few hot sections, each of them several times.
+#
+# PYTHONPATH=src python benchmarks/bench_section_summary.py
+# ----------------------------------------
+
+import random
+import timeit
+
+from surveylang.logicelements.logicparser import CisaLogicParser, CisaLogicEvaluator, DESCENT_BACKEND
+
+N_RESPONDENTS = 2000
+N_SECTIONS = 20
+N_CONDITIONS = 40
+N_HOT_SECTIONS = 5
+
+
+def section_condition(rnd: random.Random) -> str:
+    template = rnd.choice(['IN({v}, S{s})', 'SLT({v}, S{s})', 'SGTE({v}, S{s})', 'NOT IN({v}, S{s})',
+                           'ANY(IN({v}, S{s}), IN({w}, S{s}))', 'ALL(SGT({v}, S{s}), NOT IN({w}, S{s}))'])
+    return template.format(v=rnd.randint(1, 60), w=rnd.randint(1, 60), s=rnd.randint(1, N_HOT_SECTIONS))
+
+
+def main():
+    rnd = random.Random(5)
+    ref_dict = {'S{}'.format(s + 1): s for s in range(N_SECTIONS)}
+    parser = CisaLogicParser(DESCENT_BACKEND)
+    logics = [parser.parse(section_condition(rnd)) for _ in range(N_CONDITIONS)]
+    for answers in (5, 50):
+        respondents = [[sorted(rnd.sample(range(1, 61), answers)) for _ in range(N_SECTIONS)]
+                       for _ in range(N_RESPONDENTS)]
+
+        def run(summarize: bool):
+            for section_responses in respondents:
+                evaluator = CisaLogicEvaluator(ref_dict, section_responses, summarize)
+                for logic in logics:
+                    evaluator.eval(logic)
+
+        t_scan = min(timeit.repeat(lambda: run(False), number=1, repeat=7))
+        t_summary = min(timeit.repeat(lambda: run(True), number=1, repeat=7))
+        print('{:>2} answers/section  scan {:7.1f} us/respondent  summarized {:7.1f} us/respondent'.format(
+            answers, 1e6 * t_scan / N_RESPONDENTS, 1e6 * t_summary / N_RESPONDENTS))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# ----------------------------------------
+# Memory and batch evaluation of a heavily routed instrument (8% of the items answered):
+# dense respondents x items arrays with an answered mask against SparseResponseStore (CSR).
+#
+# PYTHONPATH=src python benchmarks/bench_sparse_store.py
+# ----------------------------------------
+
+import timeit
+
+import numpy as np
+
+from surveylang.models.sparse_response_store import SparseResponseStore
+from surveylang.logicelements.batchevaluator import CisaBatchEvaluator
+from surveylang.logicelements.logicparser import CisaLogicParser, DESCENT_BACKEND
+
+N_RESPONDENTS = 20_000
+N_SECTIONS = 40
+ITEMS_PER_SECTION = 10
+ANSWERED = 0.08
+
+CONDITIONS = [
+    'EQ(3, I17)',
+    'IN(5, S12)',
+    'ANY(SGT(7, S3), EQ(1, I250), NOT IN(2, S30))',
+    'ALL(GTE(4, I8), LT(9, I9), IN(1, S1))',
+]
+
+
+def main():
+    rng = np.random.default_rng(4)
+    n_items = N_SECTIONS * ITEMS_PER_SECTION
+    section_offsets = list(range(0, n_items + 1, ITEMS_PER_SECTION))
+    ref_dict = {'S{}'.format(s + 1): s for s in range(N_SECTIONS)}
+    ref_dict.update({'I{}'.format(i + 1): i for i in range(n_items)})
+
+    store = SparseResponseStore()
+    for _ in range(N_RESPONDENTS):
+        slots = np.flatnonzero(rng.random(n_items) < ANSWERED)
+        store.append_answers(slots, rng.integers(0, 10, len(slots)))
+    values, answered = store.to_dense(n_items)
+    print('{:.1f} answers/respondent'.format(store.get_answer_count() / N_RESPONDENTS))
+    print('dense values + mask: {:8.1f} bytes/respondent'.format((values.nbytes + answered.nbytes) / N_RESPONDENTS))
+    print('sparse store:        {:8.1f} bytes/respondent'.format(store.nbytes() / N_RESPONDENTS))
+
+    dense = CisaBatchEvaluator(ref_dict, values, section_offsets, answered)
+    t_index = min(timeit.repeat(lambda: store.get_batch_evaluator(ref_dict, section_offsets), number=1, repeat=3))
+    sparse = store.get_batch_evaluator(ref_dict, section_offsets)
+    print('sparse column index: {:8.2f} ms'.format(1e3 * t_index))
+    parser = CisaLogicParser(DESCENT_BACKEND)
+    for expr in CONDITIONS:
+        logic = parser.parse(expr)
+        assert (dense.eval(logic) == sparse.eval(logic)).all()
+        t_dense = min(timeit.repeat(lambda: dense.eval(logic), number=5, repeat=5)) / 5
+        t_sparse = min(timeit.repeat(lambda: sparse.eval(logic), number=5, repeat=5)) / 5
+        print('{:<46} dense {:7.3f} ms   sparse {:7.3f} ms'.format(expr, 1e3 * t_dense, 1e3 * t_sparse))
+
+
+if __name__ == '__main__':
+    main()
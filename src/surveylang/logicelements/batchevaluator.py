@@ -0,0 +1,353 @@
+# ----------------------------------------
+# Evaluates one CisaLogic tree over many respondents at once.
+#
+# Responses are given as a respondents x items array. Sections are contiguous column ranges
+# described by section_offsets: section s spans the columns section_offsets[s]:section_offsets[s + 1].
+# For respondent r this is the same layout CisaLogicEvaluator uses, so
+#   CisaBatchEvaluator(ref_dict, values, section_offsets).eval(logic)[r]
+#   == CisaLogicEvaluator(ref_dict, [list(values[r, a:b]) for a, b in sections]).eval(logic)
+#
+# An optional answered mask marks the cells that hold a response. Unanswered cells are left out of
+# the section operators and make item operators evaluate to False.
+#
+# Multi-select sections can be given as SectionBitmaps instead (see models.option_bitmap): one bit per option,
+# set when the respondent selected it. Section operators on them are bitwise tests of whole batches.
+# ----------------------------------------
+
+import numpy as np
+
+from surveylang.logicelements.logicparser import CisaLogic, CisaIndexable
+from surveylang.logicelements.logicparser import CisaRecursiveOperator, CisaSectionOperator, CisaItemOperator
+from surveylang.logicelements.logicparser import IN, SLT, SLTE, SGT, SGTE
+from surveylang.logicelements.logicparser import EQ, LT, LTE, GT, GTE
+from surveylang.logicelements.logicparser import ANY, ALL, NOT
+
+
+class SectionBitmap:
+    """
+    Answers of a multi-select section for a batch of respondents, as packed bits: bit b of respondent r is set when r
+    selected the option whose value is bit_values[b]. words holds 64 bits per uint64 word, one row per respondent.
+    """
+
+    def __init__(self, words: np.ndarray, bit_values):
+        words = np.asarray(words, dtype=np.uint64)
+        if words.ndim == 1:
+            words = words[:, None]
+        bit_values = np.asarray(bit_values)
+        if words.ndim != 2 or words.shape[1] * 64 < len(bit_values):
+            raise ValueError("words must be a respondents x words array with a bit for every value")
+        self.words = words
+        self.bit_values = bit_values
+
+    @classmethod
+    def from_selected(cls, selected: np.ndarray, bit_values) -> 'SectionBitmap':
+        """
+        Pack a respondents x bits boolean array
+        """
+        selected = np.asarray(selected, dtype=bool)
+        return cls(pack_bits(selected, words_for(selected.shape[1])), bit_values)
+
+    def __len__(self) -> int:
+        return self.words.shape[0]
+
+    def get_bits(self, respondent: int) -> int:
+        """
+        Bits of one respondent as a single integer, bit b being option b
+        """
+        return int.from_bytes(self.words[respondent].astype('<u8').tobytes(), 'little')
+
+    def select(self, logic: CisaSectionOperator) -> np.ndarray | None:
+        """
+        Bits whose value satisfies the operator, None for operators that are not section comparisons
+        """
+        values = self.bit_values
+        if isinstance(logic, IN):
+            return values == logic.x
+        if isinstance(logic, SLT):
+            return values < logic.x
+        if isinstance(logic, SLTE):
+            return values <= logic.x
+        if isinstance(logic, SGT):
+            return values > logic.x
+        if isinstance(logic, SGTE):
+            return values >= logic.x
+        return None
+
+    def get_mask(self, selected: np.ndarray) -> np.ndarray:
+        return pack_bits(selected[None, :], self.words.shape[1])[0]
+
+    def any_of(self, selected: np.ndarray) -> np.ndarray:
+        """
+        Respondents that selected at least one of the selected bits
+        """
+        mask = self.get_mask(selected)
+        if self.words.shape[1] == 1:
+            return (self.words[:, 0] & mask[0]) != 0
+        return ((self.words & mask) != 0).any(axis=1)
+
+    def eval(self, logic: CisaSectionOperator) -> np.ndarray:
+        selected = self.select(logic)
+        if selected is None:
+            return np.zeros(len(self), dtype=bool)
+        return self.any_of(selected)
+
+
+def words_for(n_bits: int) -> int:
+    return max((n_bits + 63) // 64, 1)
+
+
+def pack_bits(selected: np.ndarray, n_words: int) -> np.ndarray:
+    """
+    Pack a rows x bits boolean array into rows x n_words uint64 words, bit b in word b // 64
+    """
+    padded = np.zeros((selected.shape[0], n_words * 64), dtype=bool)
+    padded[:, :selected.shape[1]] = selected
+    packed = np.packbits(padded, axis=1, bitorder='little')
+    return packed.view('<u8').astype(np.uint64, copy=False)
+
+
+class CisaBatchEvaluator:
+    def __init__(self, ref_dict: dict[str, int], values: np.ndarray, section_offsets,
+                 answered: np.ndarray | None = None, bitmaps: dict[int, SectionBitmap] | None = None):
+        values = np.asarray(values)
+        if values.ndim != 2:
+            raise ValueError("values must be a respondents x items array")
+        section_offsets = np.asarray(section_offsets, dtype=np.int64)
+        if section_offsets.ndim != 1 or len(section_offsets) == 0 or section_offsets[0] != 0 \
+                or section_offsets[-1] != values.shape[1] or np.any(np.diff(section_offsets) < 0):
+            raise ValueError("section_offsets must be non decreasing, start at 0 and end at the number of items")
+        if answered is not None:
+            answered = np.asarray(answered, dtype=bool)
+            if answered.shape != values.shape:
+                raise ValueError("answered must have the same shape as values")
+            if answered.all():
+                answered = None
+        bitmaps = dict(bitmaps) if bitmaps else {}
+        if any(len(x) != values.shape[0] for x in bitmaps.values()):
+            raise ValueError("bitmaps must have one row per respondent")
+        self.ref_dict = ref_dict
+        self.values = values
+        self.section_offsets = section_offsets
+        self.answered = answered
+        self.bitmaps = bitmaps  # Section index -> SectionBitmap, used instead of the values of the section
+        # Columns read by item operators: the same as values unless items are laid out per respondent
+        self._item_values = values
+        self._item_answered = answered
+
+    @classmethod
+    def from_section_responses(cls, ref_dict: dict[str, int], respondents: list[list[list[int]]],
+                               dtype=np.int64, bitmaps: dict[int, SectionBitmap] | None = None) \
+            -> 'CisaBatchEvaluator':
+        """
+        Build the columnar arrays from one section_responses list per respondent.
+        Sections shorter than the longest answer given for them are padded and masked out.
+        Item refs index the concatenated sections of each respondent, as in CisaLogicEvaluator, so with sections
+        of different lengths an item ref can point into different sections for different respondents. Items past
+        the last answer of a respondent are unanswered (CisaLogicEvaluator raises IndexError there).
+        """
+        n_sections = max((len(x) for x in respondents), default=0)
+        widths = np.zeros(n_sections, dtype=np.int64)
+        for section_responses in respondents:
+            for s, responses in enumerate(section_responses):
+                widths[s] = max(widths[s], len(responses))
+        section_offsets = np.concatenate(([0], np.cumsum(widths)))
+        values = np.zeros((len(respondents), int(section_offsets[-1])), dtype=dtype)
+        answered = np.zeros(values.shape, dtype=bool)
+        ragged = False
+        for r, section_responses in enumerate(respondents):
+            for s, responses in enumerate(section_responses):
+                start = section_offsets[s]
+                values[r, start:start + len(responses)] = responses
+                answered[r, start:start + len(responses)] = True
+                ragged = ragged or len(responses) != widths[s]
+        batch = cls(ref_dict, values, section_offsets, answered, bitmaps)
+        if ragged:
+            rows = [[x for responses in section_responses for x in responses] for section_responses in respondents]
+            item_values = np.zeros(values.shape, dtype=dtype)
+            item_answered = np.zeros(values.shape, dtype=bool)
+            for r, row in enumerate(rows):
+                item_values[r, :len(row)] = row
+                item_answered[r, :len(row)] = True
+            batch._item_values, batch._item_answered = item_values, item_answered
+        return batch
+
+    def __len__(self) -> int:
+        return self.values.shape[0]
+
+    def _resolve(self, t: int | CisaIndexable) -> int:
+        return self.ref_dict[t.ref] if isinstance(t, CisaIndexable) else t
+
+    def _get_section_block(self, t: int | CisaIndexable) -> tuple[np.ndarray, np.ndarray | None]:
+        index = self._resolve(t)
+        start, end = self.section_offsets[index], self.section_offsets[index + 1]
+        mask = None if self.answered is None else self.answered[:, start:end]
+        return self.values[:, start:end], mask
+
+    def _get_item_column(self, t: int | CisaIndexable) -> tuple[np.ndarray, np.ndarray | None]:
+        index = self._resolve(t)
+        mask = None if self._item_answered is None else self._item_answered[:, index]
+        return self._item_values[:, index], mask
+
+    def _eval_section(self, logic: CisaSectionOperator) -> np.ndarray:
+        bitmap = self.bitmaps.get(self._resolve(logic.t)) if self.bitmaps else None
+        if bitmap is not None:
+            return bitmap.eval(logic)
+        block, mask = self._get_section_block(logic.t)
+        if isinstance(logic, IN):
+            hits = block == logic.x
+        elif isinstance(logic, SLT):
+            hits = block < logic.x
+        elif isinstance(logic, SLTE):
+            hits = block <= logic.x
+        elif isinstance(logic, SGT):
+            hits = block > logic.x
+        elif isinstance(logic, SGTE):
+            hits = block >= logic.x
+        else:
+            return self._constant(False)
+        if mask is not None:
+            hits &= mask
+        return hits.any(axis=1)
+
+    def _eval_item(self, logic: CisaItemOperator) -> np.ndarray:
+        column, mask = self._get_item_column(logic.t)
+        if isinstance(logic, EQ):
+            res = column == logic.x
+        elif isinstance(logic, LT):
+            res = column < logic.x
+        elif isinstance(logic, LTE):
+            res = column <= logic.x
+        elif isinstance(logic, GT):
+            res = column > logic.x
+        elif isinstance(logic, GTE):
+            res = column >= logic.x
+        else:
+            return self._constant(False)
+        if mask is not None:
+            res &= mask
+        return res
+
+    def _eval_any_bitmaps(self, children) -> tuple[np.ndarray, list[CisaLogic]]:
+        """
+        ANY over section operators of the same bitmap section is one 'any of these options' test.
+        Returns the result of those children and the children left to evaluate.
+        """
+        selected: dict[int, np.ndarray] = {}
+        rest = []
+        for x in children:
+            index = self._resolve(x.t) if isinstance(x, CisaSectionOperator) else None
+            bits = self.bitmaps[index].select(x) if index in self.bitmaps else None
+            if bits is None:
+                rest.append(x)
+            elif index in selected:
+                selected[index] |= bits
+            else:
+                selected[index] = bits
+        res = self._constant(False)
+        for index, bits in selected.items():
+            res |= self.bitmaps[index].any_of(bits)
+        return res, rest
+
+    def _constant(self, value: bool) -> np.ndarray:
+        return np.full(len(self), value, dtype=bool)
+
+    def eval(self, logic: CisaLogic) -> np.ndarray:
+        """
+        Evaluate the logic for every respondent. Returns a boolean vector with one entry per respondent.
+        """
+        if isinstance(logic, CisaRecursiveOperator):
+            if isinstance(logic, ANY) or isinstance(logic, ALL):
+                is_any = isinstance(logic, ANY)
+                res = self._constant(not is_any)
+                children = logic.v
+                if is_any and self.bitmaps:
+                    res, children = self._eval_any_bitmaps(children)
+                for x in children:
+                    if is_any:
+                        res |= self.eval(x)
+                    else:
+                        res &= self.eval(x)
+                return res
+        if isinstance(logic, CisaSectionOperator):
+            return self._eval_section(logic)
+        if isinstance(logic, CisaItemOperator):
+            return self._eval_item(logic)
+        if isinstance(logic, NOT):
+            return ~self.eval(logic.x)
+        return self._constant(False)
+
+
+class SparseCisaBatchEvaluator(CisaBatchEvaluator):
+    """
+    CisaBatchEvaluator over CSR arrays: the answers of respondent r are item_slots[row_pointers[r]:row_pointers[r + 1]]
+    (sorted) and their values. Unanswered cells are simply missing, with the same semantics as the answered mask.
+    Operators read a column index of the answers built once (proportional to the answers, not to the matrix),
+    so each operator costs the number of answers in its section or item. The first answer of a slot is the
+    response of the item.
+    """
+
+    def __init__(self, ref_dict: dict[str, int], row_pointers, item_slots, values, section_offsets,
+                 bitmaps: dict[int, SectionBitmap] | None = None):
+        row_pointers = np.asarray(row_pointers, dtype=np.int64)
+        item_slots = np.asarray(item_slots)
+        values = np.asarray(values)
+        section_offsets = np.asarray(section_offsets, dtype=np.int64)
+        if row_pointers.ndim != 1 or len(row_pointers) == 0 or row_pointers[0] != 0 \
+                or row_pointers[-1] != len(item_slots) or len(values) != len(item_slots):
+            raise ValueError("row_pointers must start at 0 and end at the number of answers")
+        if len(item_slots) and (item_slots.min() < 0 or item_slots.max() >= section_offsets[-1]):
+            raise ValueError("item slots must be inside the section offsets")
+        n = len(row_pointers) - 1
+        bitmaps = dict(bitmaps) if bitmaps else {}
+        if any(len(x) != n for x in bitmaps.values()):
+            raise ValueError("bitmaps must have one row per respondent")
+        self.ref_dict = ref_dict
+        self.section_offsets = section_offsets
+        self.bitmaps = bitmaps
+        self._n = n
+        # Column index: answers sorted by slot (stable, so by respondent within a slot)
+        rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(row_pointers))
+        order = np.argsort(item_slots, kind='stable')
+        slots = item_slots[order]
+        self._rows = rows[order]
+        self._values = values[order]
+        self._slot_pointers = np.searchsorted(slots, np.arange(section_offsets[-1] + 1))
+        self._first = np.ones(len(order), dtype=bool)  # First answer of its respondent in the slot
+        self._first[1:] = (self._rows[1:] != self._rows[:-1]) | (slots[1:] != slots[:-1])
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _hits(self, logic, values: np.ndarray) -> np.ndarray | None:
+        if isinstance(logic, (IN, EQ)):
+            return values == logic.x
+        if isinstance(logic, (SLT, LT)):
+            return values < logic.x
+        if isinstance(logic, (SLTE, LTE)):
+            return values <= logic.x
+        if isinstance(logic, (SGT, GT)):
+            return values > logic.x
+        if isinstance(logic, (SGTE, GTE)):
+            return values >= logic.x
+        return None
+
+    def _eval_answers(self, logic, start: int, end: int, first_only: bool) -> np.ndarray:
+        a, b = self._slot_pointers[start], self._slot_pointers[end]
+        res = self._constant(False)
+        hits = self._hits(logic, self._values[a:b])
+        if hits is not None:
+            if first_only:
+                hits &= self._first[a:b]
+            res[self._rows[a:b][hits]] = True
+        return res
+
+    def _eval_section(self, logic: CisaSectionOperator) -> np.ndarray:
+        index = self._resolve(logic.t)
+        bitmap = self.bitmaps.get(index)
+        if bitmap is not None:
+            return bitmap.eval(logic)
+        return self._eval_answers(logic, self.section_offsets[index], self.section_offsets[index + 1], False)
+
+    def _eval_item(self, logic: CisaItemOperator) -> np.ndarray:
+        index = self._resolve(logic.t)
+        return self._eval_answers(logic, index, index + 1, True)
@@ -0,0 +1,247 @@
+# ----------------------------------------
+# Turns a CisaLogic tree into a plain Python function.
+#
+# compiled = CisaLogicCompiler(ref_dict).compile(logic)
+# compiled(section_responses, item_responses) == CisaLogicEvaluator(ref_dict, section_responses).eval(logic)
+#
+# Refs are resolved to integer slots at compile time and every operator is emitted as
+# a direct expression, so evaluating the compiled form does no type checks nor dict lookups.
+#
+# CisaLogicBinder checks and resolves every ref once, up front:
+# bound = CisaLogicBinder(ref_dict).bind(logic)
+# bound(section_responses, item_responses)  # For every respondent sharing the layout
+# ----------------------------------------
+
+from surveylang.logicelements.logicparser import CisaLogic, CisaIndexable, CisaLogicEvaluator
+from surveylang.logicelements.logicparser import CisaElemBinaryOperator, CisaSectionOperator, CisaItemOperator
+from surveylang.logicelements.logicparser import CisaRecursiveOperator, CisaElemUnaryOperator
+from surveylang.logicelements.logicparser import IN, SLT, SLTE, SGT, SGTE
+from surveylang.logicelements.logicparser import EQ, LT, LTE, GT, GTE
+from surveylang.logicelements.logicparser import ANY, ALL, NOT
+
+
+class CompiledCisaLogic:
+    """
+    Callable produced by CisaLogicCompiler. Call it with the responses of one respondent.
+    """
+
+    def __init__(self, logic: CisaLogic, source: str, func, item_slots: list[int], section_slots: list[int]):
+        self._logic = logic
+        self._source = source
+        self._func = func
+        self._item_slots = item_slots
+        self._section_slots = section_slots
+
+    def get_cisa_logic(self) -> CisaLogic:
+        return self._logic
+
+    def get_source(self) -> str:
+        return self._source
+
+    def get_item_slots(self) -> list[int]:
+        return self._item_slots
+
+    def get_section_slots(self) -> list[int]:
+        return self._section_slots
+
+    def get_function(self):
+        return self._func
+
+    def eval(self, evaluator: CisaLogicEvaluator) -> bool:
+        return self._func(evaluator.section_responses, evaluator.item_responses)
+
+    def __call__(self, section_responses: list[list[int]], item_responses: list[int]) -> bool:
+        return self._func(section_responses, item_responses)
+
+    def __str__(self):
+        return self._source
+
+
+class CisaLogicCompiler:
+    """
+    Compiles CisaLogic trees into one generated function per expression.
+    The generated function receives the section responses (S) and the flattened item responses (I).
+    """
+
+    # SLT(x, S) is any(r < x for r in S), i.e. min(S) < x. The defaults make empty sections evaluate to False.
+    _SECTION_TEMPLATES = {
+        SLT: '(min(S[{i}], default={x}) < {x})',
+        SLTE: '(min(S[{i}], default={x} + 1) <= {x})',
+        SGT: '(max(S[{i}], default={x}) > {x})',
+        SGTE: '(max(S[{i}], default={x} - 1) >= {x})',
+        IN: '({x} in S[{i}])',
+    }
+    _ITEM_TEMPLATES = {
+        EQ: '(I[{i}] == {x})',
+        LT: '(I[{i}] < {x})',
+        LTE: '(I[{i}] <= {x})',
+        GT: '(I[{i}] > {x})',
+        GTE: '(I[{i}] >= {x})',
+    }
+
+    def __init__(self, ref_dict: dict[str, int] | None = None):
+        self.ref_dict = ref_dict if ref_dict is not None else {}
+
+    def _resolve(self, t: int | CisaIndexable) -> int:
+        return self.ref_dict[t.ref] if isinstance(t, CisaIndexable) else t
+
+    def _constant(self, x, constants: dict[str, object]) -> str:
+        if type(x) is int:
+            return repr(x)
+        name = '_c{}'.format(len(constants))
+        constants[name] = x
+        return name
+
+    @staticmethod
+    def _flatten(logic: CisaRecursiveOperator) -> list[CisaLogic]:
+        """
+        Children of an ANY/ALL, with the children of nested operators of the same kind spliced in.
+        The parsers nest 'a AND b AND c' to the right, which would otherwise nest the generated source too deeply.
+        """
+        kind = type(logic)
+        children: list[CisaLogic] = []
+        stack = [iter(logic.v)]
+        while stack:
+            x = next(stack[-1], None)
+            if x is None:
+                stack.pop()
+            elif type(x) is kind:
+                stack.append(iter(x.v))
+            else:
+                children.append(x)
+        return children
+
+    def _emit(self, logic: CisaLogic, constants: dict, item_slots: list[int], section_slots: list[int]) -> str:
+        if isinstance(logic, (ANY, ALL)):
+            is_any = isinstance(logic, ANY)
+            children = self._flatten(logic)
+            if len(children) == 0:
+                return 'False' if is_any else 'True'
+            joiner = ' or ' if is_any else ' and '
+            return '(' + joiner.join(self._emit(x, constants, item_slots, section_slots) for x in children) + ')'
+        if isinstance(logic, NOT):
+            return '(not {})'.format(self._emit(logic.x, constants, item_slots, section_slots))
+        for cls in type(logic).__mro__:
+            if cls in self._SECTION_TEMPLATES:
+                index = self._resolve(logic.t)
+                section_slots.append(index)
+                return self._SECTION_TEMPLATES[cls].format(i=index, x=self._constant(logic.x, constants))
+            if cls in self._ITEM_TEMPLATES:
+                index = self._resolve(logic.t)
+                item_slots.append(index)
+                return self._ITEM_TEMPLATES[cls].format(i=index, x=self._constant(logic.x, constants))
+        return 'False'  # Same fallback as CisaLogicEvaluator.eval
+
+    def compile(self, logic: CisaLogic) -> CompiledCisaLogic:
+        constants: dict[str, object] = {}
+        item_slots: list[int] = []
+        section_slots: list[int] = []
+        body = self._emit(logic, constants, item_slots, section_slots)
+        source = 'def _cisa_logic(S, I):\n    return {}\n'.format(body)
+        namespace = dict(constants)
+        exec(compile(source, '<cisa-logic>', 'exec'), namespace)
+        return CompiledCisaLogic(logic, source, namespace['_cisa_logic'],
+                                 sorted(set(item_slots)), sorted(set(section_slots)))
+
+
+class UnresolvedRefError(KeyError):
+    """
+    Raised when binding logic that references refs missing from the ref_dict (or slots outside the layout).
+    """
+
+    def __init__(self, refs: list[str]):
+        self.refs = refs
+        super().__init__('Unresolved refs: {}'.format(', '.join(refs)))
+
+    def __str__(self):
+        return self.args[0]
+
+
+class BoundCisaLogic:
+    """
+    A CisaLogic tree whose refs were all rewritten to integer slots. Reusable for every respondent with the same layout.
+    """
+
+    def __init__(self, logic: CisaLogic, bound_logic: CisaLogic):
+        self._logic = logic
+        self._bound_logic = bound_logic
+        self._compiled = CisaLogicCompiler().compile(bound_logic)
+
+    def get_cisa_logic(self) -> CisaLogic:
+        return self._logic
+
+    def get_bound_logic(self) -> CisaLogic:
+        return self._bound_logic
+
+    def get_compiled(self) -> CompiledCisaLogic:
+        return self._compiled
+
+    def get_item_slots(self) -> list[int]:
+        return self._compiled.get_item_slots()
+
+    def get_section_slots(self) -> list[int]:
+        return self._compiled.get_section_slots()
+
+    def eval(self, evaluator: CisaLogicEvaluator) -> bool:
+        return self._compiled.eval(evaluator)
+
+    def __call__(self, section_responses: list[list[int]], item_responses: list[int]) -> bool:
+        return self._compiled(section_responses, item_responses)
+
+    def __str__(self):
+        return str(self._bound_logic)
+
+
+class CisaLogicBinder:
+    """
+    Resolves the Item/Section refs of CisaLogic trees against a ref_dict.
+    When the layout size is known (n_sections, n_items), slots outside of it are reported as well.
+    """
+
+    def __init__(self, ref_dict: dict[str, int], n_sections: int | None = None, n_items: int | None = None):
+        self.ref_dict = ref_dict
+        self.n_sections = n_sections
+        self.n_items = n_items
+
+    def _check(self, t: int | CisaIndexable, size: int | None, unresolved: list[str]) -> int | None:
+        if isinstance(t, CisaIndexable):
+            index = self.ref_dict.get(t.ref)
+            if index is None:
+                unresolved.append(t.ref)
+                return None
+        else:
+            index = t
+        if size is not None and not 0 <= index < size:
+            unresolved.append(t.ref if isinstance(t, CisaIndexable) else str(t))
+            return None
+        return index
+
+    def _rewrite(self, logic: CisaLogic, unresolved: list[str]) -> CisaLogic:
+        if isinstance(logic, CisaRecursiveOperator):
+            return logic.__class__([self._rewrite(x, unresolved) for x in logic.v])
+        if isinstance(logic, CisaElemUnaryOperator):
+            return logic.__class__(self._rewrite(logic.x, unresolved))
+        if isinstance(logic, CisaElemBinaryOperator):
+            size = self.n_sections if isinstance(logic, CisaSectionOperator) else \
+                self.n_items if isinstance(logic, CisaItemOperator) else None
+            index = self._check(logic.t, size, unresolved)
+            return logic.__class__(logic.x, index)
+        return logic
+
+    def find_unresolved(self, logic: CisaLogic) -> list[str]:
+        unresolved: list[str] = []
+        self._rewrite(logic, unresolved)
+        return list(dict.fromkeys(unresolved))
+
+    def bind(self, logic: CisaLogic) -> BoundCisaLogic:
+        return self.bind_all([logic])[0]
+
+    def bind_all(self, logics: list[CisaLogic]) -> list[BoundCisaLogic]:
+        """
+        Bind several trees, reporting the unresolved refs of all of them at once.
+        """
+        unresolved: list[str] = []
+        rewritten = [self._rewrite(logic, unresolved) for logic in logics]
+        if unresolved:
+            raise UnresolvedRefError(list(dict.fromkeys(unresolved)))
+        return [BoundCisaLogic(logic, bound.freeze()) for logic, bound in zip(logics, rewritten)]
@@ -0,0 +1,162 @@
+# ----------------------------------------
+# Hash-consing of CisaLogic trees.
+#
+# CisaLogicInterner returns one canonical, frozen instance for every distinct (sub)expression, so
+# identical subtrees are stored once. CisaLogicDAG numbers the canonical nodes of many expressions
+# (children before parents) and CisaLogicDAGEvaluation evaluates each node at most once per respondent.
+# ----------------------------------------
+
+import copy
+
+from surveylang.logicelements.logicparser import CisaLogic, CisaIndexable, CisaLogicEvaluator
+from surveylang.logicelements.logicparser import CisaElemBinaryOperator, CisaRecursiveOperator, CisaElemUnaryOperator
+from surveylang.logicelements.logicparser import ANY, ALL, NOT
+
+
+class CisaLogicInterner:
+    def __init__(self):
+        # Keys use the id of canonical children, which the table keeps alive.
+        self._nodes: dict[tuple, CisaLogic] = {}
+        self._refs: dict[tuple, CisaIndexable] = {}
+        self._others: dict[int, tuple[CisaLogic, CisaLogic]] = {}  # id -> (caller's node, frozen copy)
+        self.hits = 0
+        self.misses = 0
+
+    def _intern_ref(self, t: int | CisaIndexable) -> int | CisaIndexable:
+        if not isinstance(t, CisaIndexable):
+            return t
+        key = (t.__class__, t.ref)
+        res = self._refs.get(key)
+        if res is None:
+            res = t if t.is_frozen() else t.__class__(t.ref)
+            self._refs[key] = res.freeze()
+        return res
+
+    def intern(self, logic: CisaLogic) -> CisaLogic:
+        """
+        Canonical frozen instance equal to logic
+        """
+        if isinstance(logic, CisaRecursiveOperator):
+            children = [self.intern(x) for x in logic.v]
+            key = (logic.__class__, tuple(id(x) for x in children))
+            build = lambda: logic.__class__(children)
+        elif isinstance(logic, CisaElemUnaryOperator):
+            child = self.intern(logic.x)
+            key = (logic.__class__, id(child))
+            build = lambda: logic.__class__(child)
+        elif isinstance(logic, CisaElemBinaryOperator):
+            t = self._intern_ref(logic.t)
+            key = (logic.__class__, logic.x, 'ref', id(t)) if isinstance(t, CisaIndexable) else \
+                (logic.__class__, logic.x, t)
+            build = lambda: logic.__class__(logic.x, t)
+        else:
+            # Other nodes compare by identity: each one is its own node. The caller's node is kept alive so its
+            # id stays valid, and frozen through a copy so the caller can still modify it.
+            other = self._others.get(id(logic))
+            if other is None:
+                other = self._others[id(logic)] = (logic, logic if logic.is_frozen() else copy.copy(logic))
+            key = (logic.__class__, id(other[1]))
+            build = lambda: other[1]
+        res = self._nodes.get(key)
+        if res is not None:
+            self.hits += 1
+            return res
+        self.misses += 1
+        res = build().freeze()
+        self._nodes[key] = res
+        return res
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+
+class CisaLogicDAG:
+    """
+    Shared DAG of the distinct subexpressions of many CisaLogic trees.
+    """
+    _LEAF, _ANY, _ALL, _NOT = range(4)
+
+    def __init__(self, interner: CisaLogicInterner | None = None):
+        self.interner = interner if interner is not None else CisaLogicInterner()
+        self._nodes: list[CisaLogic] = []
+        self._kinds: list[int] = []
+        self._children: list[tuple[int, ...]] = []
+        self._ids: dict[int, int] = {}  # id(canonical node) -> node id
+
+    def add(self, logic: CisaLogic) -> int:
+        """
+        Add a tree and return the node id of its root
+        """
+        return self._register(self.interner.intern(logic))
+
+    def _register(self, node: CisaLogic) -> int:
+        node_id = self._ids.get(id(node))
+        if node_id is not None:
+            return node_id
+        if isinstance(node, CisaRecursiveOperator) and isinstance(node, (ANY, ALL)):
+            kind = self._ANY if isinstance(node, ANY) else self._ALL
+            children = tuple(self._register(x) for x in node.v)
+        elif isinstance(node, NOT):
+            kind = self._NOT
+            children = (self._register(node.x),)
+        else:
+            kind = self._LEAF
+            children = ()
+        node_id = len(self._nodes)
+        self._nodes.append(node)
+        self._kinds.append(kind)
+        self._children.append(children)
+        self._ids[id(node)] = node_id
+        return node_id
+
+    def get_node(self, node_id: int) -> CisaLogic:
+        return self._nodes[node_id]
+
+    def get_node_id(self, logic: CisaLogic) -> int:
+        """
+        Node id of a tree already added to the DAG
+        """
+        return self._ids[id(self.interner.intern(logic))]
+
+    def get_children(self, node_id: int) -> tuple[int, ...]:
+        return self._children[node_id]
+
+    def evaluate(self, evaluator: CisaLogicEvaluator) -> 'CisaLogicDAGEvaluation':
+        return CisaLogicDAGEvaluation(self, evaluator)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+
+class CisaLogicDAGEvaluation:
+    """
+    Memoized evaluation of a CisaLogicDAG for one respondent. Nodes are evaluated lazily, at most once,
+    and ANY/ALL short-circuit.
+    """
+
+    def __init__(self, dag: CisaLogicDAG, evaluator: CisaLogicEvaluator):
+        self._dag = dag
+        self._evaluator = evaluator
+        self._memo: list[bool | None] = [None] * len(dag)
+        self.evaluations = 0
+
+    def eval_node(self, node_id: int) -> bool:
+        res = self._memo[node_id]
+        if res is not None:
+            return res
+        dag = self._dag
+        kind = dag._kinds[node_id]
+        if kind == CisaLogicDAG._ANY:
+            res = any(self.eval_node(x) for x in dag._children[node_id])
+        elif kind == CisaLogicDAG._ALL:
+            res = all(self.eval_node(x) for x in dag._children[node_id])
+        elif kind == CisaLogicDAG._NOT:
+            res = not self.eval_node(dag._children[node_id][0])
+        else:
+            res = bool(self._evaluator.eval(dag._nodes[node_id]))
+        self.evaluations += 1
+        self._memo[node_id] = res
+        return res
+
+    def eval(self, logic: CisaLogic) -> bool:
+        return self.eval_node(self._dag.get_node_id(logic))
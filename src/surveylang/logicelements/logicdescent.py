@@ -0,0 +1,185 @@
+# ----------------------------------------
+# Hand-written scanner and recursive-descent parser of the CISA logic expressions.
+#
+# Builds the same trees as the sly grammar in logicgrammar, without loading sly:
+#   CisaLogicParser(backend=DESCENT_BACKEND).parse(expr)
+#
+# The sly grammar declares no precedence, and sly resolves each of its conflicts by shifting. The parser
+# reproduces that resolution:
+#  - AND and OR share one precedence level and associate to the right:
+#    'a AND b OR c' is ALL(a, ANY(b, c))
+#  - A NOT without parentheses covers the rest of the expression: 'NOT a OR b' is NOT(ANY(a, b))
+#  - ';' may follow any operand and is dropped
+# Syntax errors raise CisaLogicSyntaxError with the position of the offending token. On the same errors,
+# sly prints a message and returns None, or whatever its error recovery produced.
+# ----------------------------------------
+
+import re
+
+from surveylang.logicelements.logicparser import CisaLogic, CisaLogicSyntaxError
+from surveylang.logicelements.logicparser import ItemIndexable, SectionIndexable
+from surveylang.logicelements.logicparser import LT, LTE, GT, GTE, EQ
+from surveylang.logicelements.logicparser import SLT, SLTE, SGT, SGTE, IN
+from surveylang.logicelements.logicparser import ANY, ALL, NOT
+
+# One token per match, keywords in the order of LogicLexer so that e.g. 'SLTE' is not read as 'SLT' 'E'.
+# Every position matches: '.' catches illegal characters and the empty match at the end is the EOF token.
+_TOKEN = re.compile(r'[ \t\n]*(SLTE|SGTE|SLT|SGT|LTE|GTE|ANY|ALL|AND|NOT|OR|LT|GT|EQ|IN'
+                    r'|[sSiI]?[0-9]+|[(),;]|.|\Z)')
+
+_KINDS = {x: x for x in ('SLTE', 'SGTE', 'SLT', 'SGT', 'LTE', 'GTE', 'ANY', 'ALL', 'AND', 'NOT', 'OR',
+                         'LT', 'GT', 'EQ', 'IN')}
+_KINDS.update({'(': 'LPAREN', ')': 'RPAREN', ',': 'COMMA', ';': 'END', '': 'EOF'})
+_FIRST_KINDS = {'s': 'SECTION', 'S': 'SECTION', 'i': 'ITEM', 'I': 'ITEM'}
+_FIRST_KINDS.update({x: 'NUMBER' for x in '0123456789'})
+
+_ITEM_OPERATORS = {'LT': LT, 'LTE': LTE, 'GT': GT, 'GTE': GTE, 'EQ': EQ}
+_SECTION_OPERATORS = {'SLT': SLT, 'SLTE': SLTE, 'SGT': SGT, 'SGTE': SGTE, 'IN': IN}
+_RECURSIVE_OPERATORS = {'ALL': ALL, 'ANY': ANY}
+_BINARY_OPERATORS = {'AND': ALL, 'OR': ANY}
+
+
+def _get_kind(text: str) -> str:
+    kind = _KINDS.get(text)
+    if kind is None:
+        # Numbers, refs and single illegal characters. A lone 's' or 'i' is illegal too.
+        kind = _FIRST_KINDS.get(text[0]) if len(text) > 1 or '0' <= text <= '9' else None
+    return kind or 'ILLEGAL'
+
+
+class LogicTokens:
+    """
+    Tokens of one expression, as the texts and kinds of the tokens. The last token is always EOF.
+    """
+
+    def __init__(self, expr: str, texts: list[str], kinds: list[str]):
+        self.expr = expr
+        self.texts = texts
+        self.kinds = kinds
+
+    def get_position(self, index: int) -> int:
+        """
+        Offset in the expression of the index-th token. Positions are only needed to report errors,
+        so they are found by scanning again.
+        """
+        for i, match in enumerate(_TOKEN.finditer(self.expr)):
+            if i == index:
+                return match.start(1)
+        return len(self.expr)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+
+class LogicScanner:
+    """
+    Single pass scanner, the counterpart of LogicLexer
+    """
+
+    def tokenize(self, expr: str) -> LogicTokens:
+        texts = _TOKEN.findall(expr)
+        return LogicTokens(expr, texts, [_get_kind(x) for x in texts])
+
+
+class _Reader:
+    """
+    State of one parse, so LogicDescentParser itself stays reentrant
+    """
+
+    def __init__(self, tokens: LogicTokens):
+        self.tokens = tokens
+        self.texts = tokens.texts
+        self.kinds = tokens.kinds
+        self.i = 0
+
+    def error(self, expected: str):
+        i = self.i
+        text = self.texts[i]
+        position = self.tokens.get_position(i)
+        if self.kinds[i] == 'ILLEGAL':
+            message = 'Illegal character {!r} at position {}'.format(text, position)
+        else:
+            found = repr(text) if text else 'end of input'
+            message = 'Expected {} at position {}, found {}'.format(expected, position, found)
+        raise CisaLogicSyntaxError(message, self.tokens.expr, position)
+
+    def expect(self, kind: str) -> str:
+        i = self.i
+        if self.kinds[i] != kind:
+            self.error(kind)
+        self.i = i + 1
+        return self.texts[i]
+
+    def is_bare_not(self) -> bool:
+        return self.kinds[self.i] == 'NOT' and self.kinds[self.i + 1] != 'LPAREN'
+
+    def op(self) -> CisaLogic:
+        """
+        op ::= NOT* primary END* ((AND | OR) op)?
+        Loops instead of recursing, so long AND/OR chains do not hit the recursion limit.
+        """
+        kinds = self.kinds
+        operands = []  # (NOTs before the operand, operand, operator after it)
+        while True:
+            nots = 0
+            while self.is_bare_not():
+                nots += 1
+                self.i += 1
+            operand = self.primary()
+            while kinds[self.i] == 'END':
+                self.i += 1
+            operator = _BINARY_OPERATORS.get(kinds[self.i])
+            operands.append((nots, operand, operator))
+            if operator is None:
+                break
+            self.i += 1
+        # Everything after an operator is its right operand, and a NOT covers everything after it
+        logic = None
+        for nots, operand, operator in reversed(operands):
+            logic = operand if operator is None else operator([operand, logic])
+            for _ in range(nots):
+                logic = NOT(logic)
+        return logic
+
+    def primary(self) -> CisaLogic:
+        kind = self.kinds[self.i]
+        if kind in _ITEM_OPERATORS or kind in _SECTION_OPERATORS:
+            self.i += 1
+            self.expect('LPAREN')
+            x = int(self.expect('NUMBER'))
+            self.expect('COMMA')
+            if kind in _ITEM_OPERATORS:
+                logic = _ITEM_OPERATORS[kind](x, ItemIndexable(self.expect('ITEM')))
+            else:
+                logic = _SECTION_OPERATORS[kind](x, SectionIndexable(self.expect('SECTION')))
+            self.expect('RPAREN')
+            return logic
+        if kind in _RECURSIVE_OPERATORS:
+            self.i += 1
+            self.expect('LPAREN')
+            v = [self.op()]
+            while self.kinds[self.i] == 'COMMA':
+                self.i += 1
+                v.append(self.op())
+            self.expect('RPAREN')
+            return _RECURSIVE_OPERATORS[kind](v)
+        if kind == 'NOT':  # Only NOT( reaches here, a bare NOT is handled by op()
+            self.i += 1
+            self.expect('LPAREN')
+            logic = NOT(self.op())
+            self.expect('RPAREN')
+            return logic
+        self.error('a logic operator')
+
+
+class LogicDescentParser:
+    """
+    Recursive-descent counterpart of LogicParser. It keeps no state between parses.
+    """
+
+    def parse(self, tokens: LogicTokens) -> CisaLogic:
+        reader = _Reader(tokens)
+        logic = reader.op()
+        if reader.kinds[reader.i] != 'EOF':
+            reader.error('AND, OR or end of input')
+        return logic
@@ -0,0 +1,237 @@
+# ----------------------------------------
+# sly grammar of the CISA logic expressions.
+#
+# Imported on the first parse, so importing surveylang does not load sly nor build the grammar.
+# The LALR tables are loaded from logicgrammar_tables.json (shipped with the package) or from the user cache
+# when their grammar signature matches, and only built (and cached) otherwise.
+# Regenerate the shipped tables after changing the grammar with:
+#   PYTHONPATH=src python -m surveylang.logicelements.logicgrammar
+# ----------------------------------------
+
+import hashlib
+import json
+import os
+
+import sly
+from sly import Lexer, Parser
+
+from surveylang.logicelements.logicparser import ItemIndexable, SectionIndexable
+from surveylang.logicelements.logicparser import LT, LTE, GT, GTE, EQ
+from surveylang.logicelements.logicparser import SLT, SLTE, SGT, SGTE, IN
+from surveylang.logicelements.logicparser import ANY, ALL, NOT
+
+TABLES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logicgrammar_tables.json')
+
+
+def get_cache_file() -> str:
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'surveylang', 'logicgrammar_tables.json')
+
+
+class CachedLRTable:
+    """
+    The parts of sly's LRTable used while parsing, restored from a tables file
+    """
+
+    def __init__(self, lr_action: dict[int, dict[str, int]], lr_goto: dict[int, dict[str, int]],
+                 defaulted_states: dict[int, int]):
+        self.lr_action = lr_action
+        self.lr_goto = lr_goto
+        self.defaulted_states = defaulted_states
+
+    @classmethod
+    def load(cls, path: str, signature: str) -> 'CachedLRTable | None':
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('signature') != signature:
+            return None
+        states = lambda table: {int(k): v for k, v in table.items()}
+        return cls(states(data['lr_action']), states(data['lr_goto']),
+                   {int(k): v for k, v in data['defaulted_states'].items()})
+
+
+def save_tables(path: str, signature: str, lrtable) -> bool:
+    """
+    Write the tables of an LRTable, returns False when the file cannot be written
+    """
+    data = {'signature': signature, 'lr_action': lrtable.lr_action, 'lr_goto': lrtable.lr_goto,
+            'defaulted_states': lrtable.defaulted_states}
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'), sort_keys=True)
+        os.replace(tmp, path)
+    except OSError:
+        return False
+    return True
+
+
+class LogicLexer(Lexer):
+    tokens = ('SLTE', 'SGTE', 'SLT', 'SGT', 'LTE', 'GTE', 'ANY', 'ALL', 'AND', 'OR', 'NOT', 'LT',
+              'GT', 'EQ', 'IN', 'LPAREN', 'RPAREN', 'COMMA', 'SECTION', 'ITEM', 'NUMBER', 'END')
+
+    # Operadores de logica
+    SLTE = r'SLTE'
+    SGTE = r'SGTE'
+    SLT = r'SLT'
+    SGT = r'SGT'
+    LTE = r'LTE'
+    GTE = r'GTE'
+    ANY = r'ANY'
+    ALL = r'ALL'
+    AND = r'AND'
+    NOT = r'NOT'
+    OR = r'OR'
+    LT = r'LT'
+    GT = r'GT'
+    EQ = r'EQ'
+    IN = r'IN'
+
+    # Cosas que no son logica.
+    LPAREN = r'\('
+    RPAREN = r'\)'
+    COMMA = r','
+    SECTION = r'[sS][0-9]+'
+    ITEM = r'[iI][0-9]+'
+    NUMBER = r'[0-9]+'
+    END = r';'
+
+    ignore_spaces = r'[\ \t\n]+'
+
+
+class LogicParser(Parser):
+    tokens = LogicLexer.tokens
+
+    @classmethod
+    def get_signature(cls) -> str:
+        """
+        Hash of the grammar the tables were built for
+        """
+        text = '{}\n{}'.format(sly.__version__, cls._grammar)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def _Parser__build_lrtables(cls):
+        # Replaces the table construction of sly's Parser metaclass
+        signature = cls.get_signature()
+        for path in (TABLES_FILE, get_cache_file()):
+            lrtable = CachedLRTable.load(path, signature)
+            if lrtable is not None:
+                cls._lrtable = lrtable
+                cls.tables_source = path
+                return True
+        Parser._Parser__build_lrtables.__func__(cls)
+        cls.tables_source = None
+        save_tables(get_cache_file(), signature, cls._lrtable)
+        return True
+
+    # Grammar rules
+    # LOGIC OPERATORS
+    @_('ALL LPAREN n_ops RPAREN')
+    def op(self, p):
+        v = p.n_ops
+        return ALL(v=v)
+
+    @_('ANY LPAREN n_ops RPAREN')
+    def op(self, p):
+        v = p.n_ops
+        return ANY(v)
+
+    @_('NOT LPAREN op RPAREN')
+    def op(self, p):
+        return NOT(p.op)
+
+    @_('op AND op')
+    def op(self, p):
+        v = [p.op0, p.op1]
+        return ALL(v)
+
+    @_('op OR op')
+    def op(self, p):
+        v = [p.op0, p.op1]
+        return ANY(v)
+
+    @_('NOT op')
+    def op(self, p):
+        return NOT(p.op)
+
+    # DUAL OPERATORS
+    @_('SLTE LPAREN number COMMA section RPAREN')
+    def op(self, p):
+        return SLTE(p.number, p.section)
+
+    @_('SGTE LPAREN number COMMA section RPAREN')
+    def op(self, p):
+        return SGTE(p.number, p.section)
+
+    @_('SLT LPAREN number COMMA section RPAREN')
+    def op(self, p):
+        return SLT(p.number, p.section)
+
+    @_('SGT LPAREN number COMMA section RPAREN')
+    def op(self, p):
+        return SGT(p.number, p.section)
+
+    @_('LTE LPAREN number COMMA item RPAREN')
+    def op(self, p):
+        return LTE(p.number, p.item)
+
+    @_('GTE LPAREN number COMMA item RPAREN')
+    def op(self, p):
+        return GTE(p.number, p.item)
+
+    @_('LT LPAREN number COMMA item RPAREN')
+    def op(self, p):
+        return LT(p.number, p.item)
+
+    @_('GT LPAREN number COMMA item RPAREN')
+    def op(self, p):
+        return GT(p.number, p.item)
+
+    @_('EQ LPAREN number COMMA item RPAREN')
+    def op(self, p):
+        return EQ(p.number, p.item)
+
+    @_('IN LPAREN number COMMA section RPAREN')
+    def op(self, p):
+        return IN(p.number, p.section)
+
+    @_('op END')
+    def op(self, p):
+        return p.op
+
+    # GENERIC OPERATIONS AND COMMA AGGRUPATOR
+    @_('op COMMA n_ops')
+    def n_ops(self, p):
+        res = [p.op]
+        res.extend(p.n_ops)
+        return res
+
+    @_('op')
+    def n_ops(self, p):
+        return [p.op]
+
+    # BASE ELEMS
+    @_('ITEM')
+    def item(self, p):
+        return ItemIndexable(p.ITEM)
+
+    @_('SECTION')
+    def section(self, p):
+        return SectionIndexable(p.SECTION)
+
+    @_('NUMBER')
+    def number(self, p):
+        res = int(p.NUMBER)
+        return res
+
+
+if __name__ == '__main__':
+    from sly.yacc import LRTable
+
+    if save_tables(TABLES_FILE, LogicParser.get_signature(), LRTable(LogicParser._grammar)):
+        print('Tables written to', TABLES_FILE)
@@ -0,0 +1,320 @@
+# ----------------------------------------
+# Rewrites CisaLogic trees into smaller, equivalent ones.
+#
+# optimized, report = CisaLogicOptimizer().optimize(logic)
+#
+# Rewrites:
+#  flatten          ALL(ALL(a, b), c) -> ALL(a, b, c)
+#  double_negation  NOT NOT a -> a
+#  push_not         NOT ANY(a, b) -> ALL(NOT a, NOT b), NOT LT(x, I) -> GTE(x, I)
+#  dedupe           ALL(a, a, b) -> ALL(a, b)
+#  fold_range       GT(3, I1) AND GT(5, I1) -> GT(5, I1), SLT(3, S1) OR SLT(5, S1) -> SLT(5, S1)
+#  contradiction    EQ(1, I1) AND EQ(2, I1), a AND NOT a -> always False
+#  tautology        a OR NOT a, GT(3, I1) OR LTE(5, I1) -> always True
+#  constant         Constants absorbed by their parent, ALL(a) -> a
+#
+# Constants are the empty operators, which CisaLogicEvaluator already evaluates as constants:
+# ALL() is always True and ANY() is always False.
+# Item comparisons assume an answered, integer response (the CisaLogicEvaluator semantics). Pass
+# complement_comparisons=False to keep NOT over item comparisons, e.g. for masked batch evaluation.
+# ----------------------------------------
+
+from surveylang.logicelements.logicparser import CisaLogic
+from surveylang.logicelements.logicparser import CisaRecursiveOperator, CisaElemUnaryOperator
+from surveylang.logicelements.logicparser import SLT, SLTE, SGT, SGTE
+from surveylang.logicelements.logicparser import EQ, LT, LTE, GT, GTE
+from surveylang.logicelements.logicparser import ANY, ALL, NOT
+
+_COMPLEMENTS = {LT: GTE, LTE: GT, GT: LTE, GTE: LT}
+
+
+def logic_size(logic: CisaLogic) -> int:
+    """
+    Number of nodes of a tree
+    """
+    if isinstance(logic, CisaRecursiveOperator):
+        return 1 + sum(logic_size(x) for x in logic.v)
+    if isinstance(logic, CisaElemUnaryOperator):
+        return 1 + logic_size(logic.x)
+    return 1
+
+
+def is_always_true(logic: CisaLogic) -> bool:
+    return type(logic) is ALL and len(logic.v) == 0
+
+
+def is_always_false(logic: CisaLogic) -> bool:
+    return type(logic) is ANY and len(logic.v) == 0
+
+
+class OptimizationReport:
+    """
+    What the optimizer changed: one (rule, before, after) entry per rewrite.
+    """
+
+    def __init__(self):
+        self.changes: list[tuple[str, str, str]] = []
+        self.size_before: int = 0
+        self.size_after: int = 0
+        self.constant: bool | None = None  # True/False when the whole condition is constant
+
+    def record(self, rule: str, before, after):
+        self.changes.append((rule, str(before), str(after)))
+
+    def get_counts(self) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for rule, _, _ in self.changes:
+            counts[rule] = counts.get(rule, 0) + 1
+        return counts
+
+    def is_changed(self) -> bool:
+        return len(self.changes) > 0
+
+    def __str__(self):
+        return 'size {} -> {}, {}'.format(self.size_before, self.size_after, self.get_counts())
+
+
+class CisaLogicOptimizer:
+    def __init__(self, complement_comparisons: bool = True):
+        self.complement_comparisons = complement_comparisons
+        self._memo: dict[tuple[int, bool], tuple] = {}  # (id(node), negate) -> (node, result, changes)
+
+    def optimize(self, logic: CisaLogic) -> tuple[CisaLogic, OptimizationReport]:
+        report = OptimizationReport()
+        report.size_before = logic_size(logic)
+        try:
+            res = self._optimize(logic, False, report)
+        finally:
+            self._memo = {}
+        report.size_after = logic_size(res)
+        if is_always_true(res):
+            report.constant = True
+        elif is_always_false(res):
+            report.constant = False
+        return res, report
+
+    # Negation
+
+    def _optimize(self, logic: CisaLogic, negate: bool, report: OptimizationReport) -> CisaLogic:
+        """
+        Optimized form of logic, or of NOT logic when negate is set
+        """
+        key = (id(logic), negate)
+        hit = self._memo.get(key)
+        if hit is None:
+            node_report = OptimizationReport()
+            hit = (logic, self._optimize_node(logic, negate, node_report), node_report.changes)
+            self._memo[key] = hit
+        report.changes.extend(hit[2])
+        return hit[1]
+
+    def _optimize_node(self, logic: CisaLogic, negate: bool, report: OptimizationReport) -> CisaLogic:
+        if isinstance(logic, NOT):
+            if negate:
+                report.record('double_negation', NOT(logic), logic.x)
+            return self._optimize(logic.x, not negate, report)
+        if isinstance(logic, (ANY, ALL)):
+            is_any = isinstance(logic, ANY)
+            if not negate:
+                return self._simplify(ANY if is_any else ALL, [self._optimize(x, False, report) for x in logic.v],
+                                      report)
+            # De Morgan only when it does not make the tree bigger
+            pushed_report = OptimizationReport()
+            if len(logic.v) > 0:
+                pushed_report.record('push_not', NOT(logic), '{}(NOT ...)'.format('ALL' if is_any else 'ANY'))
+            pushed = self._simplify(ALL if is_any else ANY, [self._optimize(x, True, pushed_report) for x in logic.v],
+                                    pushed_report)
+            kept_report = OptimizationReport()
+            kept = self._negate_result(self._optimize(logic, False, kept_report), kept_report)
+            if logic_size(pushed) <= logic_size(kept):
+                report.changes.extend(pushed_report.changes)
+                return pushed
+            report.changes.extend(kept_report.changes)
+            return kept
+        if negate:
+            return self._negate_leaf(logic, report)
+        return logic
+
+    def _negate_result(self, logic: CisaLogic, report: OptimizationReport) -> CisaLogic:
+        if is_always_true(logic) or is_always_false(logic):
+            res = ANY([]) if is_always_true(logic) else ALL([])
+            report.record('constant', NOT(logic), res)
+            return res
+        if isinstance(logic, NOT):
+            report.record('double_negation', NOT(logic), logic.x)
+            return logic.x
+        return self._negate_leaf(logic, report)
+
+    def _negate_leaf(self, logic: CisaLogic, report: OptimizationReport) -> CisaLogic:
+        complement = _COMPLEMENTS.get(type(logic))
+        if complement is not None and self.complement_comparisons:
+            res = complement(logic.x, logic.t)
+            report.record('push_not', NOT(logic), res)
+            return res
+        return NOT(logic)
+
+    def _negation_of(self, logic: CisaLogic) -> CisaLogic:
+        if isinstance(logic, NOT):
+            return logic.x
+        complement = _COMPLEMENTS.get(type(logic))
+        if complement is not None and self.complement_comparisons:
+            return complement(logic.x, logic.t)
+        return NOT(logic)
+
+    # ANY/ALL
+
+    def _simplify(self, kind, children: list[CisaLogic], report: OptimizationReport) -> CisaLogic:
+        is_any = kind is ANY
+        absorbing = ALL([]) if is_any else ANY([])  # ANY(.., True, ..) is True, ALL(.., False, ..) is False
+        flat: list[CisaLogic] = []
+        for child in children:
+            if type(child) is kind:
+                report.record('flatten' if len(child.v) > 0 else 'constant', kind(children), child)
+                flat.extend(child.v)
+            elif type(child) is type(absorbing) and len(child.v) == 0:
+                report.record('constant', kind(children), absorbing)
+                return absorbing
+            else:
+                flat.append(child)
+
+        unique = list(dict.fromkeys(flat))
+        if len(unique) < len(flat):
+            report.record('dedupe', kind(flat), kind(unique))
+
+        present = set(unique)
+        for child in unique:
+            if self._negation_of(child) in present:
+                report.record('tautology' if is_any else 'contradiction', kind(unique), absorbing)
+                return absorbing
+
+        folded = self._fold(is_any, unique, report)
+        if folded is None:
+            report.record('tautology' if is_any else 'contradiction', kind(unique), absorbing)
+            return absorbing
+        if len(folded) == 1:
+            report.record('constant', kind(folded), folded[0])
+            return folded[0]
+        return kind(folded)
+
+    # Range folding
+
+    def _fold(self, is_any: bool, children: list[CisaLogic], report: OptimizationReport) -> list[CisaLogic] | None:
+        """
+        Combine comparisons on the same item/section. Returns None when the group decides the whole operator.
+        """
+        groups: dict[object, list[CisaLogic]] = {}
+        for child in children:
+            key = self._fold_key(child)
+            if key is not None:
+                groups.setdefault(key, []).append(child)
+        replaced: dict[int, CisaLogic | None] = {}
+        for key, members in groups.items():
+            if len(members) < 2:
+                continue
+            if key[0] == 'item':
+                kept = self._fold_item_any(members) if is_any else self._fold_item_all(members)
+            else:
+                kept = self._fold_section(is_any, key[2], members)
+            if kept is None:
+                return None
+            if kept != members:
+                report.record('fold_range', (ANY if is_any else ALL)(members), (ANY if is_any else ALL)(kept))
+            replaced.update({id(x): None for x in members})
+            replaced[id(members[0])] = kept
+        if not replaced:
+            return children
+        res: list[CisaLogic] = []
+        for child in children:
+            if id(child) not in replaced:
+                res.append(child)
+            elif replaced[id(child)] is not None:
+                res.extend(replaced[id(child)])
+        return res
+
+    @staticmethod
+    def _fold_key(logic: CisaLogic):
+        if isinstance(logic, NOT) and type(logic.x) is EQ:
+            return 'item', logic.x.t
+        if type(logic) in (EQ, LT, LTE, GT, GTE):
+            return 'item', logic.t
+        if type(logic) in (SLT, SLTE):
+            return 'section', logic.t, 'lower'
+        if type(logic) in (SGT, SGTE):
+            return 'section', logic.t, 'upper'
+        return None
+
+    @staticmethod
+    def _bounds(members: list[CisaLogic]):
+        """
+        Integer bounds of the comparisons: response >= lower, response <= upper, == eq, != neq
+        """
+        lower, upper, eq, neq = [], [], [], []
+        for x in members:
+            cls = type(x)
+            if cls is GT:
+                lower.append((x.x + 1, x))
+            elif cls is GTE:
+                lower.append((x.x, x))
+            elif cls is LT:
+                upper.append((x.x - 1, x))
+            elif cls is LTE:
+                upper.append((x.x, x))
+            elif cls is EQ:
+                eq.append((x.x, x))
+            else:
+                neq.append((x.x.x, x))
+        return lower, upper, eq, neq
+
+    def _fold_item_all(self, members: list[CisaLogic]) -> list[CisaLogic] | None:
+        lower, upper, eq, neq = self._bounds(members)
+        lo, lo_node = max(lower, key=lambda b: b[0]) if lower else (None, None)
+        hi, hi_node = min(upper, key=lambda b: b[0]) if upper else (None, None)
+        excluded = {v for v, _ in neq}
+        if eq:
+            values = {v for v, _ in eq}
+            value = eq[0][0]
+            if len(values) > 1 or value in excluded or (lo is not None and value < lo) \
+                    or (hi is not None and value > hi):
+                return None
+            return [eq[0][1]]
+        if lo is not None and hi is not None:
+            if lo > hi:
+                return None
+            if lo == hi:
+                return None if lo in excluded else [EQ(lo, lo_node.t)]
+        kept = [x for x in (lo_node, hi_node) if x is not None]
+        kept.extend(x for v, x in neq if (lo is None or v >= lo) and (hi is None or v <= hi))
+        return kept
+
+    def _fold_item_any(self, members: list[CisaLogic]) -> list[CisaLogic] | None:
+        lower, upper, eq, neq = self._bounds(members)
+        lo, lo_node = min(lower, key=lambda b: b[0]) if lower else (None, None)
+        hi, hi_node = max(upper, key=lambda b: b[0]) if upper else (None, None)
+        if lo is not None and hi is not None and hi >= lo - 1:
+            return None
+
+        def covered(v: int) -> bool:
+            return (lo is not None and v >= lo) or (hi is not None and v <= hi)
+
+        if len({v for v, _ in neq}) > 1:
+            return None
+        if neq and (covered(neq[0][0]) or any(v == neq[0][0] for v, _ in eq)):
+            return None
+        kept = [x for x in (lo_node, hi_node) if x is not None]
+        kept.extend(x for v, x in eq if not covered(v))
+        kept.extend(x for _, x in neq)
+        return kept
+
+    @staticmethod
+    def _fold_section(is_any: bool, family: str, members: list[CisaLogic]) -> list[CisaLogic]:
+        # SLT(x, S) means some response <= x - 1, SGT(x, S) some response >= x + 1.
+        # A weaker condition is implied by a stronger one: ALL keeps the strongest, ANY the weakest.
+        def bound(x: CisaLogic) -> int:
+            cls = type(x)
+            return x.x - 1 if cls is SLT else x.x + 1 if cls is SGT else x.x
+
+        strongest_is_min = family == 'lower'
+        if is_any:
+            strongest_is_min = not strongest_is_min
+        pick = min if strongest_is_min else max
+        return [pick(members, key=bound)]
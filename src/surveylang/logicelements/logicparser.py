@@ -1,5 +1,9 @@
 # ----------------------------------------
 # Just make an instance of CisaLogicParser() and call the parse(expr) method.
+# Use parse_cached(expr) to share parsed trees across the whole process.
+# CisaLogicParser(backend=DESCENT_BACKEND) parses without sly and raises CisaLogicSyntaxError on errors.
+# FlatCisaLogicEvaluator(ref_dict, section_offsets).bind(item_responses) evaluates over one flat buffer.
+# SparseCisaLogicEvaluator evaluates the sparse answers of one respondent, unanswered items apart from 0.
 #
 # Operators:
 #  LT, LTE, GT, GTE and EQ work with Items
@@ -7,17 +11,52 @@
 #  ANY, ALL and NOT are logic operators
 # ----------------------------------------
 
-from sly import Lexer, Parser
+import re
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+
+class _Freezable:
+    """
+    Objects that become read-only once frozen, so they can be shared safely.
+    """
+    _frozen: bool = False
+
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError('{} is frozen and cannot be modified'.format(self.__class__.__name__))
+        super().__setattr__(name, value)
+
+    def freeze(self):
+        object.__setattr__(self, '_frozen', True)
+        return self
+
+    def is_frozen(self) -> bool:
+        return self._frozen
+
+    def __hash__(self):
+        """
+        Hash consistent with __eq__ for classes defining _hash_key, by identity for the others.
+        Only frozen objects cache it, mutable ones should not be used as keys.
+        """
+        h = self.__dict__.get('_hash')
+        if h is None:
+            hash_key = getattr(self, '_hash_key', None)
+            h = object.__hash__(self) if hash_key is None else hash(hash_key())
+            if self._frozen:
+                object.__setattr__(self, '_hash', h)
+        return h
 
 
 # Abstract CISA Logic classes
-class CisaLogic:
+class CisaLogic(_Freezable):
     pass
 
 
 # Abstract CISA Operators
 
-class CisaIndexable():
+class CisaIndexable(_Freezable):
     def __init__(self, ref: str):
         self.ref: str = ref
 
@@ -34,11 +73,21 @@ class CisaElemBinaryOperator(CisaLogic):
         self.x: int = x
         self.t: int | CisaIndexable = t
 
+    def freeze(self):
+        if isinstance(self.t, CisaIndexable):
+            self.t.freeze()
+        return super().freeze()
+
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
             return False
         return (self.x == other.x) and (self.t == other.t)
 
+    __hash__ = _Freezable.__hash__
+
+    def _hash_key(self):
+        return self.__class__, self.x, self.t
+
     def __str__(self):
         return '[{} x:{} t:{}]'.format(self.__class__.__name__, str(self.x), str(self.t))  # Force __str__ of elems.
 
@@ -60,11 +109,20 @@ class CisaElemUnaryOperator(CisaLogic):
     def __init__(self, x: CisaLogic):
         self.x = x
 
+    def freeze(self):
+        self.x.freeze()
+        return super().freeze()
+
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
             return False
         return self.x == other.x
 
+    __hash__ = _Freezable.__hash__
+
+    def _hash_key(self):
+        return self.__class__, self.x
+
     def __str__(self):
         return '[{} x:{}]'.format(self.__class__.__name__, str(self.x))
 
@@ -77,6 +135,11 @@ class CisaRecursiveOperator(CisaLogic):
     def __init__(self, v):
         self.v = v
 
+    def freeze(self):
+        if not self._frozen:
+            self.v = tuple(x.freeze() for x in self.v)
+        return super().freeze()
+
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
             return False
@@ -84,6 +147,11 @@ class CisaRecursiveOperator(CisaLogic):
             return False
         return all([sx == ox for (sx, ox) in zip(self.v, other.v)])
 
+    __hash__ = _Freezable.__hash__
+
+    def _hash_key(self):
+        return self.__class__, tuple(self.v)
+
     def __str__(self):
         return '[{} v:{}]'.format(self.__class__.__name__, [str(x) for x in self.v])
 
@@ -101,6 +169,11 @@ class ItemIndexable(CisaIndexable):
             return False
         return self.ref == other.ref
 
+    __hash__ = _Freezable.__hash__
+
+    def _hash_key(self):
+        return ItemIndexable, self.ref
+
     def __str__(self):
         return '<{}:{}>'.format(self.__class__.__name__, self.ref)
 
@@ -115,6 +188,11 @@ class SectionIndexable(CisaIndexable):
             return False
         return self.ref == other.ref
 
+    __hash__ = _Freezable.__hash__
+
+    def _hash_key(self):
+        return SectionIndexable, self.ref
+
     def __str__(self):
         return '<{}:{}>'.format(self.__class__.__name__, self.ref)
 
@@ -175,141 +253,43 @@ class NOT(CisaElemUnaryOperator):
     pass
 
 
-class LogicLexer(Lexer):
-    tokens = ('SLTE', 'SGTE', 'SLT', 'SGT', 'LTE', 'GTE', 'ANY', 'ALL', 'AND', 'OR', 'NOT', 'LT',
-              'GT', 'EQ', 'IN', 'LPAREN', 'RPAREN', 'COMMA', 'SECTION', 'ITEM', 'NUMBER', 'END')
-
-    # Operadores de logica
-    SLTE = r'SLTE'
-    SGTE = r'SGTE'
-    SLT = r'SLT'
-    SGT = r'SGT'
-    LTE = r'LTE'
-    GTE = r'GTE'
-    ANY = r'ANY'
-    ALL = r'ALL'
-    AND = r'AND'
-    NOT = r'NOT'
-    OR = r'OR'
-    LT = r'LT'
-    GT = r'GT'
-    EQ = r'EQ'
-    IN = r'IN'
-
-    # Cosas que no son logica.
-    LPAREN = r'\('
-    RPAREN = r'\)'
-    COMMA = r','
-    SECTION = r'[sS][0-9]+'
-    ITEM = r'[iI][0-9]+'
-    NUMBER = r'[0-9]+'
-    END = r';'
-
-    ignore_spaces = r'[\ \t\n]+'
-
-
-class LogicParser(Parser):
-    tokens = LogicLexer.tokens
-
-    # Grammar rules
-    # LOGIC OPERATORS
-    @_('ALL LPAREN n_ops RPAREN')
-    def op(self, p):
-        v = p.n_ops
-        return ALL(v=v)
-
-    @_('ANY LPAREN n_ops RPAREN')
-    def op(self, p):
-        v = p.n_ops
-        return ANY(v)
-
-    @_('NOT LPAREN op RPAREN')
-    def op(self, p):
-        return NOT(p.op)
-
-    @_('op AND op')
-    def op(self, p):
-        v = [p.op0, p.op1]
-        return ALL(v)
-
-    @_('op OR op')
-    def op(self, p):
-        v = [p.op0, p.op1]
-        return ANY(v)
-
-    @_('NOT op')
-    def op(self, p):
-        return NOT(p.op)
-
-    # DUAL OPERATORS
-    @_('SLTE LPAREN number COMMA section RPAREN')
-    def op(self, p):
-        return SLTE(p.number, p.section)
-
-    @_('SGTE LPAREN number COMMA section RPAREN')
-    def op(self, p):
-        return SGTE(p.number, p.section)
-
-    @_('SLT LPAREN number COMMA section RPAREN')
-    def op(self, p):
-        return SLT(p.number, p.section)
-
-    @_('SGT LPAREN number COMMA section RPAREN')
-    def op(self, p):
-        return SGT(p.number, p.section)
-
-    @_('LTE LPAREN number COMMA item RPAREN')
-    def op(self, p):
-        return LTE(p.number, p.item)
-
-    @_('GTE LPAREN number COMMA item RPAREN')
-    def op(self, p):
-        return GTE(p.number, p.item)
-
-    @_('LT LPAREN number COMMA item RPAREN')
-    def op(self, p):
-        return LT(p.number, p.item)
-
-    @_('GT LPAREN number COMMA item RPAREN')
-    def op(self, p):
-        return GT(p.number, p.item)
-
-    @_('EQ LPAREN number COMMA item RPAREN')
-    def op(self, p):
-        return EQ(p.number, p.item)
-
-    @_('IN LPAREN number COMMA section RPAREN')
-    def op(self, p):
-        return IN(p.number, p.section)
-
-    @_('op END')
-    def op(self, p):
-        return p.op
-
-    # GENERIC OPERATIONS AND COMMA AGGRUPATOR
-    @_('op COMMA n_ops')
-    def n_ops(self, p):
-        res = [p.op]
-        res.extend(p.n_ops)
-        return res
+def collect_refs(logic: CisaLogic, refs: set[str] | None = None) -> set[str]:
+    """
+    Refs (e.g. 'S3', 'I7') of every Item/Section referenced by the logic
+    """
+    if refs is None:
+        refs = set()
+    if isinstance(logic, CisaRecursiveOperator):
+        for x in logic.v:
+            collect_refs(x, refs)
+    elif isinstance(logic, CisaElemUnaryOperator):
+        collect_refs(logic.x, refs)
+    elif isinstance(logic, CisaElemBinaryOperator) and isinstance(logic.t, CisaIndexable):
+        refs.add(logic.t.ref)
+    return refs
 
-    @_('op')
-    def n_ops(self, p):
-        return [p.op]
 
-    # BASE ELEMS
-    @_('ITEM')
-    def item(self, p):
-        return ItemIndexable(p.ITEM)
+def __getattr__(name: str):
+    # The sly classes moved to logicgrammar, which is imported on demand
+    if name in ('LogicLexer', 'LogicParser'):
+        from surveylang.logicelements import logicgrammar
+        return getattr(logicgrammar, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    @_('SECTION')
-    def section(self, p):
-        return SectionIndexable(p.SECTION)
 
-    @_('NUMBER')
-    def number(self, p):
-        res = int(p.NUMBER)
-        return res
+SLY_BACKEND = 'sly'  # LALR parser of logicgrammar
+DESCENT_BACKEND = 'descent'  # Hand-written recursive-descent parser of logicdescent
+
+
+class CisaLogicSyntaxError(ValueError):
+    """
+    Syntax error found by the descent backend. position is the offset of the offending token in expr.
+    """
+
+    def __init__(self, message: str, expr: str, position: int):
+        super().__init__(message)
+        self.expr = expr
+        self.position = position
 
 
 class CisaLogicParser:
@@ -317,9 +297,38 @@ class CisaLogicParser:
     Just import this and use the parse method
     """
 
-    def __init__(self):
-        self.lexer = LogicLexer()
-        self.parser = LogicParser()
+    def __init__(self, backend: str = SLY_BACKEND):
+        if backend not in (SLY_BACKEND, DESCENT_BACKEND):
+            raise ValueError(f"Unknown parser backend {backend!r}")
+        self.backend = backend
+        self._lexer = None
+        self._parser = None
+
+    def _load(self):
+        # The backend is only loaded by the first parser that parses something
+        if self.backend == DESCENT_BACKEND:
+            from surveylang.logicelements.logicdescent import LogicScanner, LogicDescentParser
+            self._lexer = LogicScanner()
+            self._parser = LogicDescentParser()
+        else:
+            from surveylang.logicelements.logicgrammar import LogicLexer, LogicParser
+            self._lexer = LogicLexer()
+            self._parser = LogicParser()
+
+    def get_backend(self) -> str:
+        return self.backend
+
+    @property
+    def lexer(self):
+        if self._lexer is None:
+            self._load()
+        return self._lexer
+
+    @property
+    def parser(self):
+        if self._parser is None:
+            self._load()
+        return self._parser
 
     def parse(self, expr) -> CisaLogic:
         tokenized_lx = self.lexer.tokenize(expr)
@@ -327,11 +336,178 @@ class CisaLogicParser:
         return res
 
 
+class CisaLogicParseCache:
+    """
+    Bounded LRU cache of parsed expressions, keyed by the normalized expression text.
+    The trees handed out are frozen, so the same instance can be shared by every expression that uses it.
+    """
+    _WHITESPACE = re.compile(r'[\ \t\n]+')  # Same characters the lexer ignores
+    _PUNCTUATION = re.compile(r' ?([(),;]) ?')
+
+    def __init__(self, maxsize: int = 4096, parser: CisaLogicParser | None = None):
+        if maxsize < 1:
+            raise ValueError("maxsize must be a positive integer")
+        self.maxsize = maxsize
+        self._parser = parser if parser is not None else CisaLogicParser()
+        self._entries: OrderedDict[str, CisaLogic] = OrderedDict()
+        self._lock = threading.Lock()  # sly parsers keep their state on the instance
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def normalize(cls, expr: str) -> str:
+        return cls._PUNCTUATION.sub(r'\1', cls._WHITESPACE.sub(' ', expr)).strip(' ')
+
+    def parse(self, expr: str) -> CisaLogic:
+        key = self.normalize(expr)
+        with self._lock:
+            logic = self._entries.get(key)
+            if logic is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return logic
+            self.misses += 1
+            logic = self._parser.parse(key)
+            if logic is None:  # Syntax errors are not cached
+                return logic
+            logic.freeze()
+            self._entries[key] = logic
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return logic
+
+    def get_stats(self) -> dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self._entries), 'maxsize': self.maxsize}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, expr: str) -> bool:
+        return self.normalize(expr) in self._entries
+
+
+_shared_lock = threading.Lock()
+_shared_parse_cache: CisaLogicParseCache | None = None
+
+
+def get_parse_cache() -> CisaLogicParseCache:
+    """
+    Process-wide parse cache used by InstrumentLogicExpression
+    """
+    global _shared_parse_cache
+    if _shared_parse_cache is None:
+        with _shared_lock:
+            if _shared_parse_cache is None:
+                _shared_parse_cache = CisaLogicParseCache()
+    return _shared_parse_cache
+
+
+def get_shared_parser() -> CisaLogicParser:
+    """
+    Process-wide parser. Not reentrant: prefer parse_cached() unless you hold your own lock.
+    """
+    return get_parse_cache()._parser
+
+
+def parse_cached(expr: str) -> CisaLogic:
+    return get_parse_cache().parse(expr)
+
+
+_UNHASHABLE = frozenset()  # Marks the sections whose answers cannot go in a set
+
+
+class SectionSummary:
+    """
+    Count, min, max and set of answers of the sections of one respondent, so section operators become O(1) lookups.
+    Each part is computed once per section, the first time an operator needs it. Sections whose answers cannot be
+    ordered (or hashed) get no min/max (or set) and are scanned as before.
+    """
+
+    def __init__(self, section_responses):
+        self.section_responses = section_responses
+        self._bounds: list[tuple | None] = [None] * len(section_responses)
+        self._members: list[frozenset | None] = [None] * len(section_responses)
+
+    def get_bounds(self, section: int) -> tuple:
+        """
+        (count, min, max) of the answers of a section. min and max are None when they cannot be ordered.
+        """
+        bounds = self._bounds[section]
+        if bounds is None:
+            responses = self.section_responses[section]
+            try:
+                lo, hi = min(responses, default=None), max(responses, default=None)
+            except TypeError:
+                lo = hi = None
+            bounds = self._bounds[section] = (len(responses), lo, hi)
+        return bounds
+
+    def get_members(self, section: int) -> frozenset | None:
+        """
+        Set of the answers of a section, None when they cannot be hashed
+        """
+        members = self._members[section]
+        if members is None:
+            try:
+                members = frozenset(self.section_responses[section])
+            except TypeError:
+                members = _UNHASHABLE
+            self._members[section] = members
+        return None if members is _UNHASHABLE else members
+
+    def eval(self, logic: CisaSectionOperator, section: int) -> bool | None:
+        """
+        Result of a section operator on a section, None when the section has to be scanned
+        """
+        kind = type(logic)
+        if kind is IN:
+            members = self._members[section]
+            if members is None:
+                self.get_members(section)
+                members = self._members[section]
+            return None if members is _UNHASHABLE else logic.x in members
+        if kind is SLT or kind is SLTE or kind is SGT or kind is SGTE:
+            count, lo, hi = self._bounds[section] or self.get_bounds(section)
+            if count == 0:
+                return False  # Nothing answered
+            if lo is None:
+                return None
+            if kind is SLT:
+                return lo < logic.x
+            if kind is SLTE:
+                return lo <= logic.x
+            return hi > logic.x if kind is SGT else hi >= logic.x
+        return None
+
+    def __len__(self) -> int:
+        return len(self._bounds)
+
+
 class CisaLogicEvaluator():
-    def __init__(self, ref_dict: dict[str, int], section_responses: list[list[int]]):
+    def __init__(self, ref_dict: dict[str, int], section_responses: list[list[int]], summarize: bool = False):
         self.ref_dict = ref_dict
         self.section_responses = section_responses
         self.item_responses = [item for row in self.section_responses for item in row]
+        self.summary: SectionSummary | None = None
+        if summarize:
+            self.summarize()
+
+    def summarize(self) -> SectionSummary:
+        """
+        Summarize the sections of the responses, after which section operators no longer scan them
+        """
+        self.summary = SectionSummary(self.section_responses)
+        return self.summary
 
     def _get_responses_roi_for_section(self, t: int | CisaIndexable) -> list[int]:
         index = self.ref_dict[t.ref] if isinstance(t, CisaIndexable) else t
@@ -420,10 +596,15 @@ class CisaLogicEvaluator():
     def eval(self, logic: CisaLogic) -> bool:
         if isinstance(logic, CisaRecursiveOperator):
             if isinstance(logic, ANY):
-                return any([self.eval(x) for x in logic.v])
+                return any(self.eval(x) for x in logic.v)
             if isinstance(logic, ALL):
-                return all([self.eval(x) for x in logic.v])
+                return all(self.eval(x) for x in logic.v)
         if isinstance(logic, CisaSectionOperator):
+            if self.summary is not None:
+                t = logic.t
+                res = self.summary.eval(logic, self.ref_dict[t.ref] if isinstance(t, CisaIndexable) else t)
+                if res is not None:
+                    return res
             if isinstance(logic, IN):
                 return self._eval_in(logic)
             if isinstance(logic, SLT):
@@ -450,3 +631,194 @@ class CisaLogicEvaluator():
                 return self._eval_not(logic)
         else:
             return False
+
+
+class SectionSlices:
+    """
+    section_responses over a flat buffer of item responses: section s is items[offsets[s]:offsets[s + 1]].
+    Slices of a memoryview share its memory, so reading a section copies nothing.
+    """
+
+    def __init__(self, items, offsets: list[int]):
+        self.items = items
+        self.offsets = offsets
+
+    def __getitem__(self, index: int):
+        if index < 0:
+            index += len(self)
+        return self.items[self.offsets[index]:self.offsets[index + 1]]
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+def as_flat_view(item_responses):
+    """
+    memoryview of a 1-D buffer (array.array, numpy array, bytes, memoryview), other sequences as they are.
+    Buffers in formats memoryview cannot read (object or non-native byte order numpy arrays) are used as they are.
+    """
+    try:
+        view = memoryview(item_responses)
+    except TypeError:  # Lists, tuples and buffers of Python objects
+        return item_responses
+    if view.ndim != 1:
+        raise ValueError(f"Expected a 1-D buffer of item responses, got {view.ndim} dimensions")
+    try:
+        view[:1].tolist()
+    except (NotImplementedError, TypeError, ValueError):  # e.g. 'O' or '>i' formats
+        return item_responses
+    return view
+
+
+class FlatCisaLogicEvaluator(CisaLogicEvaluator):
+    """
+    CisaLogicEvaluator over one flat buffer of item responses and a section offset table: section s holds the items
+    section_offsets[s]:section_offsets[s + 1] (see ResponseLayout.get_section_offsets). Buffers are read through a
+    memoryview, so item operators index the buffer and section operators read slices of it, without copies.
+    bind() moves the evaluator to the responses of the next respondent, and with summarize also summarizes them.
+    """
+
+    def __init__(self, ref_dict: dict[str, int], section_offsets: list[int], item_responses=None,
+                 summarize: bool = False):
+        self.ref_dict = ref_dict
+        self.section_offsets = [int(x) for x in section_offsets]
+        self.item_responses = ()
+        self.section_responses = SectionSlices(self.item_responses, self.section_offsets)
+        self.summary: SectionSummary | None = None
+        self._summarize = summarize
+        if item_responses is not None:
+            self.bind(item_responses)
+
+    def bind(self, item_responses, section_offsets: list[int] | None = None) -> 'FlatCisaLogicEvaluator':
+        """
+        Evaluate the next responses, with the same section offsets unless new ones are given
+        """
+        if section_offsets is not None:
+            self.section_offsets = [int(x) for x in section_offsets]
+            self.section_responses.offsets = self.section_offsets
+        view = as_flat_view(item_responses)
+        if len(view) < self.section_offsets[-1]:
+            raise ValueError(f"Expected {self.section_offsets[-1]} item responses, got {len(view)}")
+        self.item_responses = view
+        self.section_responses.items = view
+        self.summary = SectionSummary(self.section_responses) if self._summarize else None
+        return self
+
+    def _get_responses_roi_for_section(self, t: int | CisaIndexable):
+        index = self.ref_dict[t.ref] if isinstance(t, CisaIndexable) else t
+        return self.item_responses[self.section_offsets[index]:self.section_offsets[index + 1]]
+
+    # Section comparisons as min/max of the slice, as in CisaLogicCompiler. Empty sections are False.
+
+    def _eval_slt(self, logic: SLT) -> bool:
+        return min(self._get_responses_roi_for_section(logic.t), default=logic.x) < logic.x
+
+    def _eval_slte(self, logic: SLTE) -> bool:
+        return min(self._get_responses_roi_for_section(logic.t), default=logic.x + 1) <= logic.x
+
+    def _eval_sgt(self, logic: SGT) -> bool:
+        return max(self._get_responses_roi_for_section(logic.t), default=logic.x) > logic.x
+
+    def _eval_sgte(self, logic: SGTE) -> bool:
+        return max(self._get_responses_roi_for_section(logic.t), default=logic.x - 1) >= logic.x
+
+
+class _Unanswered:
+    """
+    Response of an item that was not answered: it is not equal, lower or greater than anything, so item operators
+    on it are False (and NOT of them True), which keeps it apart from an answer of 0.
+    """
+    __slots__ = ()
+
+    def __eq__(self, other):
+        return False
+
+    def __ne__(self, other):
+        return True
+
+    __lt__ = __le__ = __gt__ = __ge__ = __eq__
+    __hash__ = object.__hash__
+
+    def __repr__(self):
+        return 'UNANSWERED'
+
+
+UNANSWERED = _Unanswered()
+
+
+class SparseItems:
+    """
+    item_responses of one sparse row: the answers of the items in slots (sorted), UNANSWERED for the others.
+    With several answers in a slot, the first one is the response of the item.
+    """
+
+    def __init__(self, slots, values):
+        self.slots = slots
+        self.values = values
+
+    def __getitem__(self, slot: int):
+        k = bisect_left(self.slots, slot)
+        if k < len(self.slots) and self.slots[k] == slot:
+            return self.values[k]
+        return UNANSWERED
+
+    def get_range(self, start: int, end: int):
+        """
+        Answers of the slots start:end, as a slice of the values
+        """
+        return self.values[bisect_left(self.slots, start):bisect_left(self.slots, end)]
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+
+class SparseSections:
+    """
+    section_responses of one sparse row: the answers given in each section, unanswered items left out
+    """
+
+    def __init__(self, items: SparseItems, offsets: list[int]):
+        self.items = items
+        self.offsets = offsets
+
+    def __getitem__(self, index: int):
+        if index < 0:
+            index += len(self)
+        return self.items.get_range(self.offsets[index], self.offsets[index + 1])
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class SparseCisaLogicEvaluator(CisaLogicEvaluator):
+    """
+    CisaLogicEvaluator over the sparse answers of one respondent: the item slots answered (sorted) and their values,
+    e.g. a row of SparseResponseStore. Section operators only see the answers given, and item operators on items
+    without answer are False. bind() moves the evaluator to the next respondent.
+    """
+
+    def __init__(self, ref_dict: dict[str, int], section_offsets: list[int], slots=(), values=(),
+                 summarize: bool = False):
+        self.ref_dict = ref_dict
+        self.section_offsets = [int(x) for x in section_offsets]
+        self.item_responses = SparseItems((), ())
+        self.section_responses = SparseSections(self.item_responses, self.section_offsets)
+        self.summary: SectionSummary | None = None
+        self._summarize = summarize
+        self.bind(slots, values)
+
+    def bind(self, slots, values) -> 'SparseCisaLogicEvaluator':
+        if len(slots) != len(values):
+            raise ValueError("slots and values must have the same length")
+        self.item_responses.slots = as_flat_view(slots)
+        self.item_responses.values = as_flat_view(values)
+        self.summary = SectionSummary(self.section_responses) if self._summarize else None
+        return self
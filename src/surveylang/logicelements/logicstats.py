@@ -0,0 +1,141 @@
+# ----------------------------------------
+# Adaptive evaluation of ANY/ALL children.
+#
+# stats = CisaLogicStats()
+# AdaptiveCisaLogicEvaluator(ref_dict, section_responses, stats).eval(logic)
+# stats.save('stats.json')  # Later: CisaLogicStats.load('stats.json')
+#
+# For every child the stats keep how many times it was evaluated, how many times it was True and
+# its cost (operators evaluated). ANY runs first the children most likely to be True per unit of cost,
+# ALL the ones most likely to be False. Children are keyed by their text, so the same condition
+# shares its statistics across expressions and the stats can be persisted between runs.
+# ----------------------------------------
+
+import json
+from weakref import finalize
+
+from surveylang.logicelements.logicparser import CisaLogic, CisaLogicEvaluator
+from surveylang.logicelements.logicparser import CisaRecursiveOperator, CisaElemUnaryOperator
+from surveylang.logicelements.logicparser import CisaSectionOperator, CisaItemOperator
+from surveylang.logicelements.logicparser import ANY, ALL
+
+
+class CisaLogicStats:
+    def __init__(self, reorder_interval: int = 64):
+        self.reorder_interval = reorder_interval
+        self._stats: dict[str, list[int]] = {}  # key -> [evaluations, true_count, cost]
+        # id(node) -> [key, ordered children, calls until reorder]. Keyed by identity, since hashing a node that
+        # is not frozen walks its whole subtree, and dropped with the node.
+        self._nodes: dict[int, list] = {}
+
+    def _entry(self, logic: CisaLogic) -> list:
+        entry = self._nodes.get(id(logic))
+        if entry is None:
+            entry = self._nodes[id(logic)] = [None, None, 0]
+            finalize(logic, self._nodes.pop, id(logic), None)
+        return entry
+
+    def key(self, logic: CisaLogic) -> str:
+        entry = self._entry(logic)
+        if entry[0] is None:
+            entry[0] = str(logic)
+        return entry[0]
+
+    def record(self, logic: CisaLogic, result: bool, cost: int):
+        stats = self._stats.get(self.key(logic))
+        if stats is None:
+            stats = self._stats[self.key(logic)] = [0, 0, 0]
+        stats[0] += 1
+        stats[1] += 1 if result else 0
+        stats[2] += cost
+
+    def get(self, logic: CisaLogic) -> dict[str, float] | None:
+        """
+        Evaluations, probability of being True and mean cost of a child, or None if never evaluated.
+        """
+        stats = self._stats.get(self.key(logic))
+        if stats is None or stats[0] == 0:
+            return None
+        evaluations, true_count, cost = stats
+        return {'evaluations': evaluations, 'p_true': true_count / evaluations, 'cost': cost / evaluations}
+
+    def _score(self, logic: CisaLogic, decisive: bool) -> float:
+        stats = self._stats.get(self.key(logic))
+        if stats is None or stats[0] == 0:
+            p_true, cost = 0.5, _static_cost(logic)
+        else:
+            p_true, cost = stats[1] / stats[0], max(stats[2] / stats[0], 1)
+        return (p_true if decisive else 1 - p_true) / cost
+
+    def order(self, logic: CisaRecursiveOperator) -> list[CisaLogic]:
+        """
+        Children of an ANY/ALL sorted so the cheap, decisive ones come first. Recomputed every reorder_interval calls.
+        """
+        entry = self._entry(logic)
+        if entry[1] is None or entry[2] <= 0:
+            decisive = isinstance(logic, ANY)
+            entry[1] = sorted(logic.v, key=lambda x: self._score(x, decisive), reverse=True)
+            entry[2] = self.reorder_interval
+        entry[2] -= 1
+        return entry[1]
+
+    def clear(self):
+        self._stats.clear()
+        for entry in self._nodes.values():
+            entry[1] = None
+
+    def to_dict(self) -> dict:
+        return {'reorder_interval': self.reorder_interval, 'stats': {k: list(v) for k, v in self._stats.items()}}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'CisaLogicStats':
+        res = cls(reorder_interval=data.get('reorder_interval', 64))
+        res._stats = {k: list(v) for k, v in data.get('stats', {}).items()}
+        return res
+
+    def save(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> 'CisaLogicStats':
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+
+def _static_cost(logic: CisaLogic) -> int:
+    if isinstance(logic, CisaRecursiveOperator):
+        return max(sum(_static_cost(x) for x in logic.v), 1)
+    if isinstance(logic, CisaElemUnaryOperator):
+        return _static_cost(logic.x)
+    return 1
+
+
+class AdaptiveCisaLogicEvaluator(CisaLogicEvaluator):
+    """
+    CisaLogicEvaluator that records statistics for every ANY/ALL child and evaluates them in adaptive order.
+    Share the same CisaLogicStats between the evaluators of every respondent.
+    """
+
+    def __init__(self, ref_dict: dict[str, int], section_responses: list[list[int]],
+                 stats: CisaLogicStats | None = None):
+        super().__init__(ref_dict, section_responses)
+        self.stats = stats if stats is not None else CisaLogicStats()
+        self._operator_count = 0
+
+    def eval(self, logic: CisaLogic) -> bool:
+        if isinstance(logic, (ANY, ALL)):
+            decisive = isinstance(logic, ANY)
+            for x in self.stats.order(logic):
+                before = self._operator_count
+                res = bool(self.eval(x))
+                self.stats.record(x, res, self._operator_count - before)
+                if res == decisive:
+                    return decisive
+            return not decisive
+        if isinstance(logic, (CisaSectionOperator, CisaItemOperator)):
+            self._operator_count += 1
+        return super().eval(logic)
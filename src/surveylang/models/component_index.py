@@ -0,0 +1,103 @@
+from typing import Iterator
+from surveylang.common.enumerators import ComponentType
+from surveylang.models.instrument_component_base import InstrumentComponentBase, InstrumentComponentBaseWithChildren, \
+    InstrumentComponentListener
+from surveylang.models.instrument_logic import get_component_names
+from surveylang.models.traversal import iter_preorder
+
+
+class ComponentIndex(InstrumentComponentListener):
+    """
+    ComponentIndex maps the uid, shortname, alias and qnid of every component of a tree (options included)
+    to the component. It listens to the root, so it stays current as children are added, removed, replaced
+    or renamed, and lookups do not walk the tree.
+
+    Names are not required to be unique: find returns the component indexed first with the name and
+    find_all returns all of them.
+    """
+
+    def __init__(self, root: InstrumentComponentBaseWithChildren):
+        self._root = root
+        self._by_name: dict[str, dict[int, InstrumentComponentBase]] = {}
+        self._names: dict[int, list[str]] = {}  # id(component) -> names indexed for it
+        self._index_subtree(root)
+        root.add_listener(self)
+
+    def close(self):
+        """
+        Stop following the changes of the tree
+        """
+        self._root.remove_listener(self)
+
+    # Maintenance
+
+    def _index_component(self, component: InstrumentComponentBase):
+        names = get_component_names(component)
+        for name in names:
+            self._by_name.setdefault(name, {})[id(component)] = component
+        self._names[id(component)] = names
+
+    def _unindex_component(self, component: InstrumentComponentBase):
+        for name in self._names.pop(id(component), []):
+            components = self._by_name.get(name)
+            if components is not None:
+                components.pop(id(component), None)
+                if not components:
+                    del self._by_name[name]
+
+    @staticmethod
+    def _iter_owned(component: InstrumentComponentBase) -> Iterator[InstrumentComponentBase]:
+        # The options of a shared OptionSet belong to no item of the tree
+        return iter_preorder(component, descend=lambda x: x.get_type() != ComponentType.ITEM
+                             or x.get_option_set() is None)
+
+    def _index_subtree(self, component: InstrumentComponentBase):
+        for x in self._iter_owned(component):
+            self._index_component(x)
+
+    def child_added(self, parent: InstrumentComponentBaseWithChildren, child: InstrumentComponentBase):
+        self._index_subtree(child)
+
+    def child_removed(self, parent: InstrumentComponentBaseWithChildren, child: InstrumentComponentBase):
+        for x in self._iter_owned(child):
+            self._unindex_component(x)
+
+    def name_changed(self, component: InstrumentComponentBase, previous: str | None, name: str | None):
+        self._unindex_component(component)
+        self._index_component(component)
+
+    # Queries
+
+    def find(self, name: str) -> InstrumentComponentBase:
+        """
+        Component with the uid, shortname, alias or qnid. Raises KeyError when there is none.
+        """
+        components = self._by_name.get(name)
+        if not components:
+            raise KeyError(f"Component {name} not found")
+        return next(iter(components.values()))
+
+    def find_all(self, name: str) -> list[InstrumentComponentBase]:
+        return list(self._by_name.get(name, {}).values())
+
+    def get_path(self, component: InstrumentComponentBase) -> tuple[int, ...]:
+        """
+        Child positions leading from the root to the component (section, question, battery, segment, item, option).
+        """
+        if id(component) not in self._names:
+            raise KeyError(f"{component} is not in the index")
+        path = []
+        while component is not self._root:
+            parent = component.get_parent()
+            path.append(parent.get_child_index(component))  # Scans the children only while positions are stale
+            component = parent
+        return tuple(reversed(path))
+
+    def find_path(self, name: str) -> tuple[int, ...]:
+        return self.get_path(self.find(name))
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._by_name
+
+    def __len__(self) -> int:
+        return len(self._names)
@@ -1,7 +1,29 @@
-import uuid
 from surveylang.common.enumerators import ComponentType
 from typing import Generic, TypeVar, Mapping, Iterator
-from surveylang.logicelements.logicparser import CisaLogicParser
+from surveylang.logicelements.logicparser import parse_cached
+
+
+class InstrumentComponentListener:
+    """
+    InstrumentComponentListener receives the changes made to a component tree.
+    Register it with add_listener on any component: it is notified of the changes made to that component
+    and to all of its descendants.
+    """
+
+    def child_added(self, parent: 'InstrumentComponentBaseWithChildren', child: 'InstrumentComponentBase'):
+        pass
+
+    def child_removed(self, parent: 'InstrumentComponentBaseWithChildren', child: 'InstrumentComponentBase'):
+        pass
+
+    def children_moved(self, parent: 'InstrumentComponentBaseWithChildren'):
+        pass
+
+    def logic_changed(self, component: 'InstrumentComponentBaseWithLogic'):
+        pass
+
+    def name_changed(self, component: 'InstrumentComponentBase', previous: str | None, name: str | None):
+        pass
 
 
 class InstrumentComponentBase:
@@ -9,29 +31,65 @@ class InstrumentComponentBase:
     InstrumentComponentBase is the base class that allows a survey component to be traceable.
     The class is used to generate a unique identifier for each survey component.
     """
+    __slots__ = ('_uid', '_position', '_component_type', '_ref', '_shortname', '_alias', '_parent', '_listeners')
 
     def __init__(self):
-        self._uid: str = str(uuid.uuid4())
+        self._uid: str | None = None  # Generated on first use
         self._position: int = 0
         self._component_type: ComponentType = ComponentType.BASE
         self._ref: str | None = None  # Bibliographic reference of the component
         self._shortname: str | None = None  # Short name of the component
         self._alias: str | None = None  # Alias of the component
+        self._parent: InstrumentComponentBaseWithChildren | None = None
+        self._listeners: list[InstrumentComponentListener] | None = None
 
     def get_uid(self) -> str:
+        if self._uid is None:
+            import uuid  # Imported with the first uid: loading uuid is a large part of the import time
+            self._uid = str(uuid.uuid4())
         return self._uid
 
+    def get_parent(self) -> 'InstrumentComponentBaseWithChildren | None':
+        return self._parent
+
+    def get_root(self) -> 'InstrumentComponentBase':
+        component = self
+        while component._parent is not None:
+            component = component._parent
+        return component
+
+    def add_listener(self, listener: InstrumentComponentListener):
+        if self._listeners is None:
+            self._listeners = []
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: InstrumentComponentListener):
+        self._listeners.remove(listener)
+
+    def _notify(self, event: str, *args):
+        """
+        Call the event method of the listeners registered on this component and on its ancestors
+        """
+        component = self
+        while component is not None:
+            if component._listeners:
+                for listener in component._listeners:
+                    getattr(listener, event)(*args)
+            component = component._parent
+
     def get_shortname(self) -> str:
         return self._shortname
 
     def set_shortname(self, shortname: str):
-        self._shortname = shortname
+        previous, self._shortname = self._shortname, shortname
+        self._notify('name_changed', self, previous, shortname)
 
     def get_alias(self) -> str:
         return self._alias
 
     def set_alias(self, alias: str):
-        self._alias = alias
+        previous, self._alias = self._alias, alias
+        self._notify('name_changed', self, previous, alias)
 
     def get_type(self) -> ComponentType:
         return self._component_type
@@ -49,7 +107,10 @@ class InstrumentComponentBase:
         return self._position
 
     def set_position(self, position: int):
-        self._position = position
+        previous, self._position = self._position, position
+        if self._parent is not None:
+            # The child sits at its previous position or inside the stale range: build() corrects both
+            self._parent._mark_dirty(max(min(previous, position), 0), max(previous, position) + 1)
 
     def build(self):
         return self
@@ -58,7 +119,7 @@ class InstrumentComponentBase:
         raise NotImplementedError()
 
     def __str__(self):
-        return f"{self.__class__.__name__}({self._component_type})({self._uid})"
+        return f"{self.__class__.__name__}({self._component_type})({self.get_uid()})"
 
     def __repr__(self):
         return self.__str__()
@@ -68,8 +129,7 @@ class InstrumentLogicExpression():
     def __init__(self, expr: str, target: str):
         self._expr = expr
         self.target = target
-        parser = CisaLogicParser()
-        self._parsed_expr = parser.parse(expr)
+        self._parsed_expr = parse_cached(expr)  # Shared and frozen, do not modify
 
     def get_expr(self) -> str:
         return self._expr
@@ -86,28 +146,42 @@ class InstrumentLogicExpression():
 
 class InstrumentLogicBlock():
     def __init__(self, expressions: list[InstrumentLogicExpression] | None = None, target: str = '@NEXT'):
-        if expressions is None:
-            expressions = []
-        self._expressions: list[InstrumentLogicExpression] = expressions
+        # A copy: the expressions only change through the methods below, which notify the owner
+        self._expressions: list[InstrumentLogicExpression] = [] if expressions is None else list(expressions)
         self._target = target
+        self._owner: InstrumentComponentBaseWithLogic | None = None  # Component using this block
 
     def get_target(self) -> str:
         return self._target
 
-    def get_expressions(self) -> list[InstrumentLogicExpression]:
-        return self._expressions
+    def get_owner(self) -> 'InstrumentComponentBaseWithLogic | None':
+        return self._owner
+
+    def _changed(self):
+        if self._owner is not None:
+            self._owner._notify('logic_changed', self._owner)
+
+    def get_expressions(self) -> tuple[InstrumentLogicExpression, ...]:
+        """
+        Read-only snapshot: add, remove and move expressions through the block, so the owner is notified
+        """
+        return tuple(self._expressions)
 
     def add_expression(self, expression: InstrumentLogicExpression):
         self._expressions.append(expression)
+        self._changed()
 
     def remove_expression(self, expression: InstrumentLogicExpression):
         self._expressions.remove(expression)
+        self._changed()
 
     def clear_expressions(self):
         self._expressions.clear()
+        self._changed()
 
     def insert_expression_at(self, position: int, expression: InstrumentLogicExpression):
         self._expressions.insert(position, expression)
+        self._changed()
 
     def move_expression(self, position: int, expression: InstrumentLogicExpression):
         self._expressions.remove(expression)
@@ -145,23 +219,44 @@ class InstrumentComponentBaseWithChildren(Generic[T], InstrumentComponentBase):
     InstrumentComponentBaseWithChildren is the base class that allows a survey component to have children.
     The class is used to generate a unique identifier for each survey component.
     """
+    __slots__ = ('_children', '_dirty_lo', '_dirty_hi', '_dirty_children')
 
     def __init__(self):
         super().__init__()
         self._children: list[T] = []
+        # Children whose position may be stale: range(_dirty_lo, _dirty_hi). Renumbered by build().
+        self._dirty_lo: int | None = None
+        self._dirty_hi: int = 0
+        self._dirty_children: dict[int, InstrumentComponentBaseWithChildren] = {}  # Children with stale descendants
 
     def get_children(self) -> list[T]:
+        """
+        The children themselves, not a copy: change them through the child methods, which keep the positions
+        """
         return self._children
 
+    def get_child_index(self, child: T) -> int:
+        """
+        Position of a child, from its stored position when it is current (no scan of the children)
+        """
+        return self._index_of(child)
+
     def add_child(self, child: T):
         self.insert_child_at(len(self._children), child)
 
     def remove_child(self, child: T):
-        self._children.remove(child)
-        child.set_position(-1)
+        position = self._index_of(child)
+        del self._children[position]
+        child._position = -1
+        self._mark_dirty(position, len(self._children))
+        self._detach(child)
 
     def clear_children(self):
+        children = list(self._children)
         self._children.clear()
+        self._dirty_lo = None
+        for child in children:
+            self._detach(child)
 
     def get_child_by_uid(self, uid: str) -> T:
         for child in self._children:
@@ -170,51 +265,120 @@ class InstrumentComponentBaseWithChildren(Generic[T], InstrumentComponentBase):
         raise ValueError(f"Child with id {uid} not found")
 
     def insert_child_at(self, position: int, child: T):
+        if child._parent is not None:
+            child._parent.remove_child(child)  # A child has a single parent; position is taken after the removal
+        n = len(self._children)
+        position = min(max(position + n if position < 0 else position, 0), n)  # Same clamping as list.insert
         self._children.insert(position, child)
-        child.set_position(position)
+        child._position = position
+        self._mark_dirty(position + 1, n + 1)
+        self._attach(child)
+
+    def _index_of(self, child: T) -> int:
+        position = child._position
+        if 0 <= position < len(self._children) and self._children[position] is child:
+            return position
+        return self._children.index(child)
+
+    def _mark_dirty(self, lo: int, hi: int):
+        if lo >= hi:
+            return
+        if self._dirty_lo is None:
+            self._dirty_lo, self._dirty_hi = lo, hi
+        else:
+            self._dirty_lo, self._dirty_hi = min(self._dirty_lo, lo), max(self._dirty_hi, hi)
+        self._flag_dirty()
+
+    def _flag_dirty(self):
+        """
+        Register this component with its ancestors as having stale positions in its subtree
+        """
+        component, parent = self, self._parent
+        while parent is not None and id(component) not in parent._dirty_children:
+            parent._dirty_children[id(component)] = component
+            component, parent = parent, parent._parent
+
+    def _has_stale_positions(self) -> bool:
+        return self._dirty_lo is not None or bool(self._dirty_children)
+
+    def _renumber(self):
+        if self._dirty_lo is not None:
+            children = self._children
+            for i in range(self._dirty_lo, min(self._dirty_hi, len(children))):
+                children[i]._position = i
+            self._dirty_lo = None
+
+    def _attach(self, child: T):
+        child._parent = self
+        if isinstance(child, InstrumentComponentBaseWithChildren) and child._has_stale_positions():
+            child._flag_dirty()
+        self._notify('child_added', self, child)
+
+    def _detach(self, child: T):
+        child._parent = None
+        self._dirty_children.pop(id(child), None)
+        self._notify('child_removed', self, child)
+
+    def _place_child(self, position: int, child: T):
+        previous = self._index_of(child)
+        n = len(self._children)
+        position = min(max(position + n if position < 0 else position, 0), n - 1)
+        if abs(previous - position) == 1:
+            neighbour = self._children[position]
+            self._children[previous], self._children[position] = neighbour, child
+            neighbour._position = previous
+        elif previous != position:
+            del self._children[previous]
+            self._children.insert(position, child)
+            self._mark_dirty(min(previous, position), max(previous, position) + 1)
+        child._position = position
 
     def move_child(self, position: int, child: T):
-        self._children.remove(child)
-        self.insert_child_at(position, child)
+        self._place_child(position, child)
+        self._notify('children_moved', self)
 
     def move_child_to_end(self, child: T):
-        self._children.remove(child)
-        self.add_child(child)
+        self.move_child(len(self._children) - 1, child)
 
     def move_child_to_start(self, child: T):
-        self._children.remove(child)
-        self.insert_child_at(0, child)
+        self.move_child(0, child)
 
     def move_child_up(self, child: T):
-        position = self._children.index(child)
+        position = self._index_of(child)
         if position == 0:
             raise ValueError("Cannot move child up")
         self.move_child(position - 1, child)
-        child.set_position(position - 1)
 
     def move_child_down(self, child: T):
-        position = self._children.index(child)
+        position = self._index_of(child)
         if position == len(self._children) - 1:
             raise ValueError("Cannot move child down")
         self.move_child(position + 1, child)
-        child.set_position(position + 1)
 
     def build(self):
-        for i in range(len(self._children)):
-            self._children[i].set_position(i)
-            self._children[i].build()
+        """
+        Renumber the children positions changed since the last build, in this component and its descendants
+        """
+        self._renumber()
+        dirty, self._dirty_children = self._dirty_children, {}
+        for child in dirty.values():
+            child.build()
         return self
 
     def verify(self) -> bool:
         return self.verify_children()
 
     def verify_children(self) -> bool:
-        for i in range(len(self._children)):
-            if not self._children[i].get_position() == i:
-                return False
-            if isinstance(self._children[i], InstrumentComponentBaseWithChildren):
-                if not self._children[i].verify_children():
+        """
+        Check the positions changed since the last build (the others are kept consistent by the child methods)
+        """
+        if self._dirty_lo is not None:
+            for i in range(self._dirty_lo, min(self._dirty_hi, len(self._children))):
+                if not self._children[i].get_position() == i:
                     return False
+        for child in self._dirty_children.values():
+            if not child.verify_children():
+                return False
         return True
 
     def __iter__(self) -> Iterator[T]:
@@ -226,11 +390,32 @@ class InstrumentComponentBaseWithChildren(Generic[T], InstrumentComponentBase):
     def __getitem__(self, index: int) -> T:
         return self._children[index]
 
+    def _normalize_index(self, index: int) -> int:
+        if isinstance(index, slice):
+            raise TypeError("Children cannot be replaced or deleted by slice")
+        return range(len(self._children))[index]
+
     def __setitem__(self, index: int, value: T):
+        index = self._normalize_index(index)
+        previous = self._children[index]
+        if value is previous:
+            return
+        if value._parent is self:
+            raise ValueError("Child already in this component, use move_child")
+        if value._parent is not None:
+            value._parent.remove_child(value)
         self._children[index] = value
+        previous._position = -1
+        value._position = index
+        self._detach(previous)
+        self._attach(value)
 
     def __delitem__(self, index: int):
-        del self._children[index]
+        index = self._normalize_index(index)
+        child = self._children.pop(index)
+        child._position = -1
+        self._mark_dirty(index, len(self._children))
+        self._detach(child)
 
     def __contains__(self, item: T) -> bool:
         return item in self._children
@@ -240,6 +425,8 @@ class InstrumentComponentBaseWithChildren(Generic[T], InstrumentComponentBase):
 
 
 class InstrumentComponentBaseWithLogic(Generic[T], InstrumentComponentBaseWithChildren[T]):
+    __slots__ = ('_entry_logic', '_exit_logic', '_title', '_subtitle', '_qnid')
+
     def __init__(self):
         super().__init__()
         self._entry_logic: InstrumentLogicBlock | None = None
@@ -252,13 +439,23 @@ class InstrumentComponentBaseWithLogic(Generic[T], InstrumentComponentBaseWithCh
         return self._entry_logic
 
     def set_entry_logic(self, entry_logic: InstrumentLogicBlock):
+        self._set_logic_owner(self._entry_logic, entry_logic)
         self._entry_logic = entry_logic
+        self._notify('logic_changed', self)
+
+    def _set_logic_owner(self, previous: InstrumentLogicBlock | None, block: InstrumentLogicBlock | None):
+        if previous is not None and previous is not block:
+            previous._owner = None
+        if block is not None:
+            block._owner = self
 
     def get_exit_logic(self) -> InstrumentLogicBlock:
         return self._exit_logic
 
     def set_exit_logic(self, exit_logic: InstrumentLogicBlock):
+        self._set_logic_owner(self._exit_logic, exit_logic)
         self._exit_logic = exit_logic
+        self._notify('logic_changed', self)
 
     def get_title(self) -> str:
         return self._title
@@ -276,4 +473,5 @@ class InstrumentComponentBaseWithLogic(Generic[T], InstrumentComponentBaseWithCh
         return self._qnid
 
     def set_qnid(self, qnid: str):
-        self._qnid = qnid
+        previous, self._qnid = self._qnid, qnid
+        self._notify('name_changed', self, previous, qnid)
@@ -1,10 +1,18 @@
 from surveylang.models.instrument_component_base import InstrumentComponentBase, InstrumentComponentBaseWithChildren, \
     InstrumentComponentBaseWithLogic
+from surveylang.models.component_index import ComponentIndex
+from surveylang.models.response_layout import LayoutPlanner, ResponseLayout
+from surveylang.models.traversal import iter_preorder
 from surveylang.common.enumerators import ComponentType, ItemType
-from typing import Generic, TypeVar, Mapping, Iterator
+from typing import Generic, TypeVar, Mapping, Iterator, TYPE_CHECKING
+
+if TYPE_CHECKING:  # response_coding needs numpy, imported on the first get_coding
+    from surveylang.models.response_coding import OptionCoding
 
 
 class Option(InstrumentComponentBase):
+    __slots__ = ('_raw_value', '_value', '_text', '_exclusive')
+
     def __init__(self):
         super().__init__()
         self._component_type = ComponentType.OPTION
@@ -18,6 +26,7 @@ class Option(InstrumentComponentBase):
 
     def set_raw_value(self, raw_value: str):
         self._raw_value = raw_value
+        self._coding_changed()
 
     def get_value(self) -> int:
         return self._value
@@ -25,12 +34,18 @@ class Option(InstrumentComponentBase):
     def set_value(self, value: int):
         self._value = value
         self._raw_value = str(value)
+        self._coding_changed()
 
     def get_text(self) -> str:
         return self._text
 
     def set_text(self, text: str):
         self._text = text
+        self._coding_changed()
+
+    def _coding_changed(self):
+        if isinstance(self._parent, Item):
+            self._parent._codings = None
 
     def get_exclusive(self) -> bool:
         return self._exclusive
@@ -41,6 +56,22 @@ class Option(InstrumentComponentBase):
     def verify(self) -> bool:
         return True
 
+    def copy(self) -> 'Option':
+        """
+        Detached copy of the option, with a new uid
+        """
+        option = Option()
+        option._raw_value, option._value, option._text = self._raw_value, self._value, self._text
+        option._exclusive, option._ref = self._exclusive, self._ref
+        option._shortname, option._alias = self._shortname, self._alias
+        return option
+
+    def get_key(self) -> tuple:
+        """
+        Every field of the option except its uid, as compared by OptionSet
+        """
+        return self._raw_value, self._value, self._text, self._exclusive, self._ref, self._shortname, self._alias
+
     def __int__(self):
         return self._value
 
@@ -48,7 +79,92 @@ class Option(InstrumentComponentBase):
         return self._raw_value
 
 
+class SharedOption(Option):
+    """
+    Option of an OptionSet. It is shared by many items, so it cannot be modified and has no parent:
+    get_parent() is None and get_root() is the option itself. Walk from the item whose options are being read
+    instead (Item.get_options), or call Item.own_options to get options attached to the item.
+    """
+    __slots__ = ()
+    FIELDS = ('_raw_value', '_value', '_text', '_exclusive', '_ref', '_shortname', '_alias')  # Order of get_key
+
+    def __init__(self, option: Option, position: int):
+        for name, value in zip(self.FIELDS, option.get_key()):
+            object.__setattr__(self, name, value)
+        for name, value in (('_uid', None), ('_position', position), ('_component_type', ComponentType.OPTION),
+                            ('_parent', None), ('_listeners', None)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        if name != '_uid':
+            raise AttributeError("Shared options cannot be modified, modify the options of the item instead")
+        object.__setattr__(self, name, value)
+
+
+class OptionSet:
+    """
+    OptionSet is an immutable scale (e.g. a 5 point Likert scale) that many items can reference with
+    Item.set_option_set. Items copy the options the first time they modify them (copy-on-write).
+    """
+
+    def __init__(self, options: list[Option]):
+        self._options: tuple[SharedOption, ...] = tuple(SharedOption(x, i) for i, x in enumerate(options))
+        self._key: tuple = tuple(x.get_key() for x in self._options)
+        self._hash = hash(self._key)
+        self._codings: dict[bool, 'OptionCoding'] = {}
+
+    @classmethod
+    def from_values(cls, values: list[int], texts: list[str] | None = None) -> 'OptionSet':
+        options = []
+        for i, value in enumerate(values):
+            option = Option()
+            option.set_value(value)
+            if texts is not None:
+                option.set_text(texts[i])
+            options.append(option)
+        return cls(options)
+
+    def get_options(self) -> tuple[SharedOption, ...]:
+        return self._options
+
+    def get_key(self) -> tuple:
+        return self._key
+
+    def get_coding(self, match_text: bool = False) -> 'OptionCoding':
+        """
+        Coding of raw answers, built once per set
+        """
+        coding = self._codings.get(match_text)
+        if coding is None:
+            from surveylang.models.response_coding import OptionCoding
+            coding = self._codings[match_text] = OptionCoding(self._options, match_text)
+        return coding
+
+    def get_index(self, raw_value: str) -> int:
+        """
+        Position of the option with the raw value. Raises KeyError when there is none.
+        """
+        return self.get_coding().get_option_index(raw_value)
+
+    def __len__(self) -> int:
+        return len(self._options)
+
+    def __iter__(self) -> Iterator[SharedOption]:
+        return iter(self._options)
+
+    def __getitem__(self, index: int) -> SharedOption:
+        return self._options[index]
+
+    def __eq__(self, other):
+        return isinstance(other, OptionSet) and self._key == other._key
+
+    def __hash__(self):
+        return self._hash
+
+
 class Item(InstrumentComponentBaseWithChildren[Option]):
+    __slots__ = ('_item_type', '_text', '_display_logic_string', '_deal_breaker', '_option_set', '_codings')
+
     def __init__(self):
         super().__init__()
         self._component_type = ComponentType.ITEM
@@ -56,10 +172,100 @@ class Item(InstrumentComponentBaseWithChildren[Option]):
         self._text: str | None = None  # Text of the item
         self._display_logic_string: str | None = None  # Display logic of the item
         self._deal_breaker: bool = False  # Specifies if the item is a deal-breaker
+        self._option_set: OptionSet | None = None  # Shared options, copied on the first change
+        self._codings: dict[bool, 'OptionCoding'] | None = None  # Codings of owned options, by match_text
 
     def get_options(self) -> list[Option]:
+        """
+        The options themselves, not a copy (the tuple of the OptionSet while they are shared)
+        """
         return self._children
 
+    def get_option_set(self) -> OptionSet | None:
+        return self._option_set
+
+    def get_coding(self, match_text: bool = False) -> 'OptionCoding':
+        """
+        Coding of raw answers into the options of the item. Shared option sets keep theirs; for options owned by
+        the item it is kept until the options change.
+        """
+        if self._option_set is not None:
+            return self._option_set.get_coding(match_text)
+        if self._codings is None:
+            self._codings = {}
+        coding = self._codings.get(match_text)
+        if coding is None:
+            from surveylang.models.response_coding import OptionCoding
+            coding = self._codings[match_text] = OptionCoding(self._children, match_text)
+        return coding
+
+    def _notify(self, event: str, *args):
+        if event in ('child_added', 'child_removed', 'children_moved'):
+            self._codings = None
+        super()._notify(event, *args)
+
+    def set_option_set(self, option_set: OptionSet):
+        """
+        Use the options of a shared OptionSet instead of the options of the item
+        """
+        if self._option_set is None:
+            super().clear_children()
+        self._option_set = option_set
+        self._children = option_set.get_options()
+        self._dirty_lo = None
+        self._notify('children_moved', self)
+
+    def own_options(self):
+        """
+        Replace the shared options by copies owned by the item
+        """
+        if self._option_set is not None:
+            shared = self._option_set.get_options()
+            self._option_set = None
+            self._children = []
+            for option in shared:
+                super().insert_child_at(len(self._children), option.copy())
+
+    def _owned(self, child: Option) -> Option:
+        if self._option_set is None:
+            return child
+        position = self._index_of(child)
+        self.own_options()
+        return self._children[position]
+
+    def insert_child_at(self, position: int, child: Option):
+        self.own_options()
+        super().insert_child_at(position, child)
+
+    def remove_child(self, child: Option):
+        super().remove_child(self._owned(child))
+
+    def clear_children(self):
+        if self._option_set is not None:
+            self._option_set = None
+            self._children = []
+            self._notify('children_moved', self)
+        super().clear_children()
+
+    def move_child(self, position: int, child: Option):
+        super().move_child(position, self._owned(child))
+
+    def __setitem__(self, index: int, value: Option):
+        index = self._normalize_index(index)
+        self.own_options()
+        super().__setitem__(index, value)
+
+    def __delitem__(self, index: int):
+        index = self._normalize_index(index)
+        self.own_options()
+        super().__delitem__(index)
+
+    def get_item_type(self) -> ItemType:
+        return self._item_type
+
+    def set_item_type(self, item_type: ItemType):
+        self._item_type = item_type
+
     def get_text(self) -> str:
         return self._text
 
@@ -86,12 +292,16 @@ ITM = TypeVar('ITM', bound=InstrumentComponentBase)
 
 
 class ItemText(Item):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self._item_type = ItemType.TEXT
 
 
 class ItemNumeric(Item):
+    __slots__ = ('_max_value', '_min_value')
+
     def __init__(self):
         super().__init__()
         self._item_type = ItemType.NUMERIC
@@ -112,6 +322,8 @@ class ItemNumeric(Item):
 
 
 class ItemDate(Item):
+    __slots__ = ('_max_date', '_min_date')
+
     def __init__(self):
         super().__init__()
         self._item_type = ItemType.DATE
@@ -132,30 +344,40 @@ class ItemDate(Item):
 
 
 class ItemCheckbox(Item):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self._item_type = ItemType.CHECKBOX
 
 
 class ItemList(Item):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self._item_type = ItemType.LIST
 
 
 class ItemLikertN(Item):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self._item_type = ItemType.LIKERT_N
 
 
 class ItemInfoText(Item):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self._item_type = ItemType.INFO_TEXT
 
 
 class ItemDoesNotKnow(Item):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self._item_type = ItemType.DOES_NOT_KNOW
@@ -163,6 +385,8 @@ class ItemDoesNotKnow(Item):
 
 
 class ItemDoesNotApply(Item):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self._item_type = ItemType.DOES_NOT_APPLY
@@ -170,6 +394,8 @@ class ItemDoesNotApply(Item):
 
 
 class ItemRefusedToAnswer(Item):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self._item_type = ItemType.REFUSED_TO_ANSWER
@@ -177,6 +403,8 @@ class ItemRefusedToAnswer(Item):
 
 
 class Segment(InstrumentComponentBaseWithLogic[Item]):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self._component_type = ComponentType.SEGMENT
@@ -186,6 +414,8 @@ class Segment(InstrumentComponentBaseWithLogic[Item]):
 
 
 class Battery(InstrumentComponentBaseWithLogic[Segment]):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self._component_type = ComponentType.BATTERY
@@ -195,6 +425,8 @@ class Battery(InstrumentComponentBaseWithLogic[Segment]):
 
 
 class Question(InstrumentComponentBaseWithLogic[Battery]):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self._component_type = ComponentType.QUESTION
@@ -204,6 +436,8 @@ class Question(InstrumentComponentBaseWithLogic[Battery]):
 
 
 class Section(InstrumentComponentBaseWithLogic[Question]):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self._component_type = ComponentType.SECTION
@@ -213,9 +447,52 @@ class Section(InstrumentComponentBaseWithLogic[Question]):
 
 
 class Questionnaire(InstrumentComponentBaseWithLogic[Section]):
+    __slots__ = ('_component_index', '_layout_planner')
+
     def __init__(self):
         super().__init__()
         self._component_type = ComponentType.QUESTIONNAIRE
+        self._component_index: ComponentIndex | None = None
+        self._layout_planner: LayoutPlanner | None = None
 
     def get_sections(self) -> list[Section]:
         return self._children
+
+    def get_component_index(self) -> ComponentIndex:
+        """
+        Index of the components by uid, shortname, alias and qnid, created on first use and kept current
+        """
+        if self._component_index is None:
+            self._component_index = ComponentIndex(self)
+        return self._component_index
+
+    def get_component(self, name: str) -> InstrumentComponentBase:
+        return self.get_component_index().find(name)
+
+    def get_response_layout(self) -> ResponseLayout:
+        """
+        Ref namespace and item slots of the responses, planned on first use and kept current
+        """
+        if self._layout_planner is None:
+            self._layout_planner = LayoutPlanner(self)
+        return self._layout_planner.get_layout()
+
+
+def share_option_sets(root: InstrumentComponentBase, option_sets: dict[tuple, OptionSet] | None = None) \
+        -> dict[tuple, OptionSet]:
+    """
+    Make the items of a tree with the same options reference one shared OptionSet. Options must match in every
+    field (Option.get_key), so no item loses the shortnames, aliases or refs of its own options.
+    Returns the option sets by content, which can be passed again to share them with other trees.
+    """
+    if option_sets is None:
+        option_sets = {}
+    for item in iter_preorder(root, ComponentType.ITEM, descend=lambda x: x.get_type() != ComponentType.ITEM):
+        if item.get_option_set() is not None or len(item) == 0:
+            continue
+        key = tuple(x.get_key() for x in item.get_options())
+        option_set = option_sets.get(key)
+        if option_set is None:
+            option_set = option_sets[key] = OptionSet(item.get_options())
+        item.set_option_set(option_set)
+    return option_sets
@@ -0,0 +1,122 @@
+from typing import Iterator, Mapping
+from surveylang.models.instrument_component_base import InstrumentComponentBase, InstrumentComponentBaseWithChildren, \
+    InstrumentComponentBaseWithLogic, InstrumentLogicExpression, InstrumentLogicBlock
+from surveylang.models.traversal import iter_preorder
+from surveylang.logicelements.logicparser import CisaLogicEvaluator
+from surveylang.logicelements.logicdag import CisaLogicDAG, CisaLogicDAGEvaluation
+
+ENTRY_LOGIC = 'entry'
+EXIT_LOGIC = 'exit'
+
+# Routing targets. Any other target is the uid, shortname, qnid or alias of a component.
+HERE_TARGET = '@HERE'  # The component owning the logic block
+NEXT_TARGET = '@NEXT'  # The component following the owner (skipping its descendants)
+
+
+def iter_logic_components(component: InstrumentComponentBase) -> Iterator[InstrumentComponentBaseWithLogic]:
+    """
+    Yields the component and its descendants that can hold entry/exit logic, in document order.
+    """
+    is_logic = lambda x: isinstance(x, InstrumentComponentBaseWithLogic)
+    return filter(is_logic, iter_preorder(component, descend=is_logic))
+
+
+def iter_own_logic_expressions(component: InstrumentComponentBaseWithLogic) \
+        -> Iterator[tuple[str, InstrumentLogicExpression]]:
+    """
+    Yields (ENTRY_LOGIC | EXIT_LOGIC, expression) for the entry/exit logic blocks of the component itself.
+    """
+    for kind, block in ((ENTRY_LOGIC, component.get_entry_logic()), (EXIT_LOGIC, component.get_exit_logic())):
+        if block is not None:
+            for expression in block.get_expressions():
+                yield kind, expression
+
+
+def iter_logic_expressions(component: InstrumentComponentBase) \
+        -> Iterator[tuple[InstrumentComponentBaseWithLogic, str, InstrumentLogicExpression]]:
+    """
+    Yields (owner, ENTRY_LOGIC | EXIT_LOGIC, expression) for every expression of the entry/exit logic blocks
+    of the component and its descendants, in document order.
+    """
+    for owner in iter_logic_components(component):
+        for kind, expression in iter_own_logic_expressions(owner):
+            yield owner, kind, expression
+
+
+def get_logic_block(component: InstrumentComponentBaseWithLogic, kind: str) -> InstrumentLogicBlock | None:
+    return component.get_entry_logic() if kind == ENTRY_LOGIC else component.get_exit_logic()
+
+
+def get_next_step(component: InstrumentComponentBase) -> tuple[InstrumentComponentBaseWithLogic | None, str]:
+    """
+    Where '@NEXT' continues after a component, as RoutingTable routes it: (next logic sibling, ENTRY_LOGIC), or
+    (parent, EXIT_LOGIC) after the last one, where the exit block of the parent is evaluated. (None, EXIT_LOGIC)
+    is the end of the questionnaire.
+    """
+    parent = component.get_parent()
+    if parent is None:
+        return None, EXIT_LOGIC
+    for position in range(parent.get_child_index(component) + 1, len(parent)):
+        if isinstance(parent[position], InstrumentComponentBaseWithLogic):
+            return parent[position], ENTRY_LOGIC
+    return parent, EXIT_LOGIC
+
+
+def get_component_names(component: InstrumentComponentBase) -> list[str]:
+    """
+    Names a routing target can use to refer to the component
+    """
+    names = [component.get_uid()]
+    for name in (component.get_shortname(), component.get_alias()):
+        if name is not None:
+            names.append(name)
+    if isinstance(component, InstrumentComponentBaseWithLogic) and component.get_qnid() is not None:
+        names.append(component.get_qnid())
+    return names
+
+
+def resolve_target(owner: InstrumentComponentBaseWithLogic, target: str,
+                   names: Mapping[str, InstrumentComponentBase]) -> tuple[InstrumentComponentBase | None, str]:
+    """
+    Where a routing target leads: (component, ENTRY_LOGIC) when the routing enters the component, or
+    (component, EXIT_LOGIC) when only its exit block is evaluated (see get_next_step). None is the end of the
+    questionnaire. Raises KeyError for names missing from the names mapping.
+    """
+    if target == HERE_TARGET:
+        return owner, ENTRY_LOGIC
+    if target == NEXT_TARGET:
+        return get_next_step(owner)
+    return names[target], ENTRY_LOGIC
+
+
+class QuestionnaireLogicDAG(CisaLogicDAG):
+    """
+    Every InstrumentLogicExpression of a questionnaire folded into one CisaLogicDAG, so that
+    a subexpression shared by many blocks is stored once and evaluated at most once per respondent.
+    """
+
+    def __init__(self, questionnaire: InstrumentComponentBaseWithChildren):
+        super().__init__()
+        self._questionnaire = questionnaire
+        self._expression_nodes: dict[int, int] = {}  # id(expression) -> root node id
+        self._expressions: list[tuple[InstrumentComponentBaseWithLogic, str, InstrumentLogicExpression]] = []
+        for owner, kind, expression in iter_logic_expressions(questionnaire):
+            self._expression_nodes[id(expression)] = self.add(expression.get_cisa_logic())
+            self._expressions.append((owner, kind, expression))
+
+    def get_expressions(self) -> list[tuple[InstrumentComponentBaseWithLogic, str, InstrumentLogicExpression]]:
+        return self._expressions
+
+    def get_expression_node(self, expression: InstrumentLogicExpression) -> int:
+        return self._expression_nodes[id(expression)]
+
+    def evaluate(self, evaluator: CisaLogicEvaluator) -> 'QuestionnaireLogicEvaluation':
+        return QuestionnaireLogicEvaluation(self, evaluator)
+
+
+class QuestionnaireLogicEvaluation(CisaLogicDAGEvaluation):
+    def eval_expression(self, expression: InstrumentLogicExpression) -> bool:
+        return self.eval_node(self._dag.get_expression_node(expression))
+
+    def eval_all(self) -> dict[InstrumentLogicExpression, bool]:
+        return {expression: self.eval_expression(expression) for _, _, expression in self._dag.get_expressions()}
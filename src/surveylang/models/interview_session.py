@@ -0,0 +1,360 @@
+from bisect import bisect_right
+from numbers import Integral
+from typing import Iterable
+from surveylang.models.instrument_component_base import InstrumentComponentBase, InstrumentComponentBaseWithChildren, \
+    InstrumentComponentBaseWithLogic, InstrumentComponentListener, InstrumentLogicExpression
+from surveylang.models.instrument_logic import iter_logic_components, iter_logic_expressions, \
+    iter_own_logic_expressions
+from surveylang.models.logic_dependency_index import LogicDependencyIndex
+from surveylang.models.response_layout import ResponseLayout
+from surveylang.models.routing import RoutingTable
+from surveylang.logicelements.logiccompiler import CisaLogicBinder, BoundCisaLogic, UnresolvedRefError
+from surveylang.logicelements.logicparser import UNANSWERED
+
+
+class InterviewSession(InstrumentComponentListener):
+    """
+    InterviewSession follows one respondent through a questionnaire.
+    Answers arrive as set/clear events on Item ('I7') or Section ('S3') refs. Only the entry/exit expressions
+    that read the changed refs are re-evaluated; every other result stays cached.
+
+    Responses use the CisaLogicEvaluator layout: one list of answers per section. Without a ref_dict, the refs and
+    section offsets of the Questionnaire response layout are used, and followed when items or sections are added,
+    removed or moved (answers stay with their items; refs are positions, so they are bound again). With section_offsets, item refs are the item
+    slots of that layout: items can be answered one by one in any order, and unanswered slots are UNANSWERED
+    (item operators on them are False, section operators skip them). Without section_offsets, item refs index
+    the flattened answers, so an item can only be set once its section holds that many answers.
+    Conditions that read answers not given yet evaluate to False.
+    The refs of the questionnaire are checked up front. Logic added later with refs outside ref_dict is recorded
+    (get_unresolved) and evaluates to False, so the change to the questionnaire is never refused.
+
+    Routing: the entry block of a component is evaluated when the flow reaches it and its exit block when it is
+    finished. The first expression that holds gives the target, otherwise the block target applies. '@HERE' is the
+    owner (enter it, or enter it again from its exit block), '@NEXT' continues after the owner, any other target
+    is the uid/shortname/qnid/alias of the component to jump to. Components without entry logic are entered,
+    and components without exit logic continue with the next one. Segments are the components presented.
+    """
+
+    def __init__(self, questionnaire: InstrumentComponentBaseWithLogic, ref_dict: dict[str, int] | None = None,
+                 section_responses: list[list[int]] | None = None, section_offsets: list[int] | None = None):
+        self._questionnaire = questionnaire
+        self._layout: ResponseLayout | None = None  # Followed when both the refs and the offsets come from it
+        if ref_dict is None:
+            layout = questionnaire.get_response_layout()
+            ref_dict = layout.get_ref_dict()
+            if section_offsets is None:
+                section_offsets = layout.get_section_offsets()
+                self._layout = layout
+        self.section_offsets: list[int] | None = None if section_offsets is None else list(section_offsets)
+        self._set_refs(ref_dict)
+        if section_responses is None:
+            n_sections = max(self._section_refs, default=-1) + 1
+            if self.section_offsets is not None:
+                n_sections = max(n_sections, len(self.section_offsets) - 1)
+            section_responses = [[] for _ in range(n_sections)]
+        self.section_responses: list[list[int]] = [list(x) for x in section_responses]
+        self.item_responses: list[int] = []
+        self._offsets: list[int] = []
+        self._rebuild_items()
+
+        self._index = LogicDependencyIndex(questionnaire)
+        self._bound: dict[int, BoundCisaLogic] = {}
+        self._results: dict[int, bool] = {}
+        self._owned: dict[int, list[int]] = {}  # id(owner) -> id(expression)
+        self._unresolved: dict[int, tuple[InstrumentLogicExpression, list[str]]] = {}  # id(expression) -> refs
+        self._bind_expressions((owner, expression) for owner, _, expression in iter_logic_expressions(questionnaire))
+        if self._unresolved:
+            self._index.close()
+            raise UnresolvedRefError(list(dict.fromkeys(ref for _, refs in self._unresolved.values() for ref in refs)))
+        questionnaire.add_listener(self)
+
+        self._current: InstrumentComponentBaseWithLogic | None = None
+        self._routing: RoutingTable | None = None
+        self.last_event_evaluations = 0
+
+    def close(self):
+        """
+        Stop following the changes of the questionnaire
+        """
+        self._questionnaire.remove_listener(self)
+        self._index.close()
+
+    # Refs and responses
+
+    @staticmethod
+    def _is_section_ref(ref: str) -> bool:
+        return ref[:1] in ('S', 's')
+
+    @staticmethod
+    def _is_item_ref(ref: str) -> bool:
+        return ref[:1] in ('I', 'i')
+
+    def _set_refs(self, ref_dict: dict[str, int]):
+        self.ref_dict = ref_dict
+        self._binder = CisaLogicBinder(ref_dict)
+        self._section_refs: dict[int, list[str]] = {}
+        self._item_refs: dict[int, list[str]] = {}
+        for ref, index in ref_dict.items():
+            if self._is_section_ref(ref):
+                self._section_refs.setdefault(index, []).append(ref)
+            elif self._is_item_ref(ref):
+                self._item_refs.setdefault(index, []).append(ref)
+
+    def _resolve_ref(self, ref: str) -> tuple[bool, int]:
+        """
+        (is a section ref, index) of a ref of ref_dict
+        """
+        index = self.ref_dict.get(ref)
+        if index is None:
+            raise KeyError(f"Unknown ref {ref!r}")
+        if self._is_section_ref(ref):
+            return True, index
+        if self._is_item_ref(ref):
+            return False, index
+        raise ValueError(f"{ref!r} is neither a Section nor an Item ref")
+
+    def _rebuild_items(self):
+        if self.section_offsets is not None:
+            self._offsets = self.section_offsets[:-1]
+            self.item_responses = [UNANSWERED] * self.section_offsets[-1]
+            for section, responses in enumerate(self.section_responses):
+                self._place_section(section, responses)
+            return
+        self._offsets = []
+        self.item_responses = []
+        for responses in self.section_responses:
+            self._offsets.append(len(self.item_responses))
+            self.item_responses.extend(responses)
+
+    def _place_section(self, section: int, values: list[int]) -> list[int]:
+        """
+        Write the answers of a section into its item slots (layout mode). Returns the slots that changed.
+        """
+        start, end = self.section_offsets[section], self.section_offsets[section + 1]
+        if len(values) > end - start:
+            raise ValueError(f"Section {section} has {end - start} items, got {len(values)} answers")
+        changed = []
+        for slot, value in zip(range(start, end), list(values) + [UNANSWERED] * (end - start - len(values))):
+            previous = self.item_responses[slot]
+            if not (previous is value or previous == value):
+                self.item_responses[slot] = value
+                changed.append(slot)
+        return changed
+
+    def _given(self, section: int) -> list[int]:
+        start, end = self.section_offsets[section], self.section_offsets[section + 1]
+        return [x for x in self.item_responses[start:end] if x is not UNANSWERED]
+
+    def _locate_item(self, index: int) -> tuple[int, int]:
+        if self.section_offsets is not None:
+            if not 0 <= index < self.section_offsets[-1]:
+                raise IndexError(f"Item slot {index} is not in the section offsets")
+        elif not 0 <= index < len(self.item_responses):
+            raise IndexError(f"Item slot {index} has no answer; give section_offsets to answer items one by one")
+        section = bisect_right(self._offsets, index) - 1  # Empty sections share the offset of the next one
+        return section, index - self._offsets[section]
+
+    def _set_item(self, index: int, value) -> set[str]:
+        section, position = self._locate_item(index)
+        previous = self.item_responses[index]
+        if previous is value or previous == value:
+            return set()
+        self.item_responses[index] = value
+        if self.section_offsets is not None:
+            self.section_responses[section] = self._given(section)
+        else:
+            self.section_responses[section][position] = value
+        return set(self._item_refs.get(index, [])) | set(self._section_refs.get(section, []))
+
+    def _replace_section(self, section: int, values: list[int]) -> set[str]:
+        dirty = set(self._section_refs.get(section, []))
+        if self.section_offsets is not None:
+            for slot in self._place_section(section, values):
+                dirty.update(self._item_refs.get(slot, []))
+            self.section_responses[section] = self._given(section)
+            return dirty
+        previous = self.section_responses[section]
+        self.section_responses[section] = values
+        start = self._offsets[section]
+        if len(previous) == len(values):
+            self.item_responses[start:start + len(values)] = values
+            for i, (old, new) in enumerate(zip(previous, values)):
+                if old != new:
+                    dirty.update(self._item_refs.get(start + i, []))
+        else:
+            # Every item slot after the section start moves
+            self._rebuild_items()
+            for index, refs in self._item_refs.items():
+                if index >= start:
+                    dirty.update(refs)
+        return dirty
+
+    # Events
+
+    def set_answer(self, ref: str, value: int | Iterable[int]):
+        """
+        Set the answers of a section ('S3', a list of values) or the answer of an item ('I7').
+        With section_offsets, the answers of a section fill its first item slots and clear the others.
+        """
+        is_section, index = self._resolve_ref(ref)
+        if is_section:
+            values = [value] if isinstance(value, Integral) else list(value)
+            dirty = self._replace_section(index, values)
+        else:
+            dirty = self._set_item(index, value)
+        self._reevaluate(dirty)
+
+    def clear_answer(self, ref: str):
+        """
+        Clear the answers of a section, or remove the answer of an item from its section.
+        """
+        is_section, index = self._resolve_ref(ref)
+        if is_section:
+            dirty = self._replace_section(index, [])
+        elif self.section_offsets is not None:
+            dirty = self._set_item(index, UNANSWERED)
+        else:
+            section, position = self._locate_item(index)
+            values = list(self.section_responses[section])
+            del values[position]
+            dirty = self._replace_section(section, values)
+        self._reevaluate(dirty)
+
+    def _reevaluate(self, refs: set[str]):
+        evaluated = 0
+        done: set[int] = set()
+        for ref in refs:
+            for _, _, expression in self._index.get_expressions(ref):
+                key = id(expression)
+                if key not in done and key in self._bound:
+                    done.add(key)
+                    self._results[key] = self._evaluate(self._bound[key])
+                    evaluated += 1
+        self.last_event_evaluations = evaluated
+
+    def _evaluate(self, bound: BoundCisaLogic) -> bool:
+        try:
+            return bool(bound(self.section_responses, self.item_responses))
+        except IndexError:  # Reads answers not given yet
+            return False
+
+    def get_result(self, expression: InstrumentLogicExpression) -> bool:
+        return self._results[id(expression)]
+
+    def get_condition_count(self) -> int:
+        return len(self._bound)
+
+    def get_unresolved(self) -> list[tuple[InstrumentLogicExpression, list[str]]]:
+        """
+        Expressions added to the questionnaire with refs outside ref_dict, and those refs. They evaluate to False.
+        """
+        return list(self._unresolved.values())
+
+    # Questionnaire changes
+
+    def _bind_expressions(self, entries: Iterable[tuple[InstrumentComponentBase, InstrumentLogicExpression]]):
+        for owner, expression in entries:
+            key = id(expression)
+            try:
+                bound = self._bound[key] = self._binder.bind(expression.get_cisa_logic())
+                self._results[key] = self._evaluate(bound)
+            except UnresolvedRefError as e:
+                self._unresolved[key] = (expression, e.refs)
+                self._results[key] = False
+            self._owned.setdefault(id(owner), []).append(key)
+
+    def _unbind_component(self, component: InstrumentComponentBase):
+        for key in self._owned.pop(id(component), []):
+            self._bound.pop(key, None)
+            self._results.pop(key, None)
+            self._unresolved.pop(key, None)
+
+    def _replan(self) -> bool:
+        """
+        Follow the response layout after a structure change: the answers stay with their items, the refs and
+        offsets are those of the new layout and every expression is bound again. False if the layout is the same.
+        """
+        if self._layout is None:
+            return False
+        layout = self._questionnaire.get_response_layout()
+        if layout is self._layout:
+            return False
+        previous, self._layout = self._layout, layout
+        item_responses = [UNANSWERED] * layout.get_item_count()
+        for slot, value in enumerate(self.item_responses):
+            if value is not UNANSWERED:
+                try:
+                    item_responses[layout.get_item_slot(previous.get_item(slot))] = value
+                except KeyError:  # The item was removed
+                    pass
+        self.section_offsets = list(layout.get_section_offsets())
+        self._offsets = self.section_offsets[:-1]
+        self.item_responses = item_responses
+        self.section_responses = [self._given(section) for section in range(layout.get_section_count())]
+        self._set_refs(layout.get_ref_dict())
+        self._bound.clear()
+        self._results.clear()
+        self._owned.clear()
+        self._unresolved.clear()
+        entries = iter_logic_expressions(self._questionnaire)
+        self._bind_expressions((owner, expression) for owner, _, expression in entries)
+        return True
+
+    def child_added(self, parent: InstrumentComponentBaseWithChildren, child: InstrumentComponentBase):
+        if not self._replan():
+            self._bind_expressions((owner, expression) for owner, _, expression in iter_logic_expressions(child))
+        self._routing = None
+
+    def child_removed(self, parent: InstrumentComponentBaseWithChildren, child: InstrumentComponentBase):
+        for component in iter_logic_components(child):
+            self._unbind_component(component)
+        self._replan()
+        self._routing = None
+        if self._current is not None and self._current.get_root() is not self._questionnaire:
+            self._current = None
+
+    def children_moved(self, parent: InstrumentComponentBaseWithChildren):
+        self._replan()
+        self._routing = None
+
+    def name_changed(self, component: InstrumentComponentBase, previous: str | None, name: str | None):
+        self._routing = None
+
+    def logic_changed(self, component: InstrumentComponentBaseWithLogic):
+        self._unbind_component(component)
+        self._routing = None
+        self._bind_expressions((component, expression) for _, expression in iter_own_logic_expressions(component))
+
+    # Routing
+
+    def get_routing_table(self) -> RoutingTable:
+        """
+        Routing table of the questionnaire, compiled again after structure or logic changes
+        """
+        if self._routing is None:
+            self._routing = RoutingTable(self._questionnaire)
+        return self._routing
+
+    def _is_true(self, expression: InstrumentLogicExpression) -> bool:
+        return self._results[id(expression)]
+
+    def get_current_component(self) -> InstrumentComponentBaseWithLogic | None:
+        return self._current
+
+    def get_next_component(self) -> InstrumentComponentBaseWithLogic | None:
+        """
+        Component presented after the current one with the answers given so far (the first one before start).
+        None when the questionnaire is finished.
+        """
+        table = self.get_routing_table()
+        if self._current is None:
+            return table.first(self._is_true)
+        return table.after(self._current, self._is_true)
+
+    def start(self) -> InstrumentComponentBaseWithLogic | None:
+        self._current = self.get_routing_table().first(self._is_true)
+        return self._current
+
+    def advance(self) -> InstrumentComponentBaseWithLogic | None:
+        self._current = self.get_next_component()
+        return self._current
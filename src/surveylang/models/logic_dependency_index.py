@@ -0,0 +1,155 @@
+from typing import Iterator
+from surveylang.models.instrument_component_base import InstrumentComponentBase, InstrumentComponentBaseWithChildren, \
+    InstrumentComponentBaseWithLogic, InstrumentComponentListener, InstrumentLogicExpression
+from surveylang.models.instrument_logic import ENTRY_LOGIC, EXIT_LOGIC, iter_logic_components, \
+    iter_own_logic_expressions, get_logic_block, get_component_names, get_next_step, resolve_target
+from surveylang.logicelements.logicparser import collect_refs
+
+LogicEntry = tuple[InstrumentComponentBaseWithLogic, str, InstrumentLogicExpression]
+
+
+class LogicDependencyIndex(InstrumentComponentListener):
+    """
+    LogicDependencyIndex maps every Item/Section ref (e.g. 'I7', 'S3') to the entry/exit logic expressions
+    of a questionnaire that read it. It listens to the questionnaire, so it stays current as children and
+    logic blocks are added or removed.
+    """
+
+    def __init__(self, root: InstrumentComponentBaseWithChildren):
+        self._root = root
+        self._by_ref: dict[str, dict[int, LogicEntry]] = {}
+        self._by_owner: dict[int, list[tuple[LogicEntry, set[str]]]] = {}
+        self._names: dict[str, InstrumentComponentBase] | None = None
+        self._index_subtree(root)
+        root.add_listener(self)
+
+    def close(self):
+        """
+        Stop following the changes of the questionnaire
+        """
+        self._root.remove_listener(self)
+
+    # Maintenance
+
+    def _index_component(self, component: InstrumentComponentBaseWithLogic):
+        entries = []
+        for kind, expression in iter_own_logic_expressions(component):
+            entry = (component, kind, expression)
+            refs = collect_refs(expression.get_cisa_logic())
+            for ref in refs:
+                self._by_ref.setdefault(ref, {})[id(expression)] = entry
+            entries.append((entry, refs))
+        if entries:
+            self._by_owner[id(component)] = entries
+
+    def _unindex_component(self, component: InstrumentComponentBaseWithLogic):
+        for (_, _, expression), refs in self._by_owner.pop(id(component), []):
+            for ref in refs:
+                readers = self._by_ref.get(ref)
+                if readers is not None:
+                    readers.pop(id(expression), None)
+                    if not readers:
+                        del self._by_ref[ref]
+
+    def _index_subtree(self, component: InstrumentComponentBase):
+        for owner in iter_logic_components(component):
+            self._index_component(owner)
+
+    def child_added(self, parent: InstrumentComponentBaseWithChildren, child: InstrumentComponentBase):
+        self._index_subtree(child)
+        self._names = None
+
+    def child_removed(self, parent: InstrumentComponentBaseWithChildren, child: InstrumentComponentBase):
+        for owner in iter_logic_components(child):
+            self._unindex_component(owner)
+        self._names = None
+
+    def children_moved(self, parent: InstrumentComponentBaseWithChildren):
+        pass
+
+    def name_changed(self, component: InstrumentComponentBase, previous: str | None, name: str | None):
+        self._names = None
+
+    def logic_changed(self, component: InstrumentComponentBaseWithLogic):
+        self._unindex_component(component)
+        self._index_component(component)
+
+    # Queries
+
+    def get_refs(self) -> list[str]:
+        return list(self._by_ref)
+
+    def get_expressions(self, ref: str) -> list[LogicEntry]:
+        """
+        (owner, ENTRY_LOGIC | EXIT_LOGIC, expression) of the expressions reading the ref directly
+        """
+        return list(self._by_ref.get(ref, {}).values())
+
+    def get_components(self, ref: str) -> list[InstrumentComponentBaseWithLogic]:
+        return list({id(owner): owner for owner, _, _ in self.get_expressions(ref)}.values())
+
+    def _get_names(self) -> dict[str, InstrumentComponentBase]:
+        if self._names is None:
+            self._names = {}
+            for component in iter_logic_components(self._root):
+                for name in get_component_names(component):
+                    self._names.setdefault(name, component)
+        return self._names
+
+    def _targets(self, entry: LogicEntry) -> Iterator[tuple[InstrumentComponentBaseWithLogic, str]]:
+        """
+        Where the routing may continue depending on the result of the expression: its own target and, when no
+        expression of the block holds, the target of the block. (component, ENTRY_LOGIC) enters the component,
+        (component, EXIT_LOGIC) only evaluates its exit block, as RoutingTable does after its last child.
+        """
+        owner, kind, expression = entry
+        names = self._get_names()
+        block = get_logic_block(owner, kind)
+        targets = [expression.get_target()] + ([block.get_target()] if block is not None else [])
+        for target in targets:
+            try:
+                component, phase = resolve_target(owner, target, names)
+            except KeyError:  # Unknown target: nothing to follow
+                continue
+            # A component without exit block continues after itself
+            while component is not None and phase == EXIT_LOGIC and component.get_exit_logic() is None:
+                component, phase = get_next_step(component)
+            if component is not None:
+                yield component, phase
+
+    def get_affected(self, ref: str, transitive: bool = True) -> list[LogicEntry]:
+        """
+        Expressions whose result, or whose reachability, depends on the ref. With transitive, the logic the routing
+        of an affected expression can reach is included, recursively: every block of the components it enters
+        (and of their descendants), and the exit block of the parent it leaves with '@NEXT'.
+        """
+        found: dict[int, LogicEntry] = {}
+        pending = self.get_expressions(ref)
+        visited: set[tuple[int, str]] = set()  # (id(component), ENTRY_LOGIC | EXIT_LOGIC)
+        while pending:
+            entry = pending.pop()
+            if id(entry[2]) in found:
+                continue
+            found[id(entry[2])] = entry
+            if not transitive:
+                continue
+            for target, phase in self._targets(entry):
+                if (id(target), phase) in visited:
+                    continue
+                if phase == EXIT_LOGIC:
+                    visited.add((id(target), EXIT_LOGIC))
+                    pending.extend(x for x, _ in self._by_owner.get(id(target), []) if x[1] == EXIT_LOGIC)
+                    continue
+                for component in iter_logic_components(target):
+                    visited.update(((id(component), ENTRY_LOGIC), (id(component), EXIT_LOGIC)))
+                    pending.extend(x for x, _ in self._by_owner.get(id(component), []))
+        return list(found.values())
+
+    def get_affected_components(self, ref: str, transitive: bool = True) -> list[InstrumentComponentBaseWithLogic]:
+        return list({id(owner): owner for owner, _, _ in self.get_affected(ref, transitive)}.values())
+
+    def __contains__(self, ref: str) -> bool:
+        return ref in self._by_ref
+
+    def __len__(self) -> int:
+        return len(self._by_ref)
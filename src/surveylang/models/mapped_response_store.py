@@ -0,0 +1,338 @@
+import json
+import os
+import numpy as np
+from typing import Callable, Iterable, Iterator
+from surveylang.models.responses import ResponseInstance, ResponseGroup, ResponseMatrix
+from surveylang.models.sparse_response_store import get_item_idx
+from surveylang.logicelements.logicparser import CisaLogic, SparseCisaLogicEvaluator
+from surveylang.logicelements.batchevaluator import SparseCisaBatchEvaluator
+
+HEADER_FILE = 'store.json'
+FORMAT_NAME = 'surveylang-responses'
+FORMAT_VERSION = 1
+
+
+class MappedResponseStore:
+    """
+    MappedResponseStore keeps the responses of a wave on disk, as a directory of column files mapped with
+    numpy.memmap, so waves larger than memory can be evaluated and tabulated in chunks of respondents.
+    Each response is one row of the columns item_idx, val, option_idx, raw_start and raw_len. The responses of
+    respondent r are the rows offsets[r]:offsets[r + 1], sorted by item_idx as in SparseResponseStore.
+    Raw strings are stored as utf-8 in a heap file: raw[raw_start:raw_start + raw_len], raw_len -1 for None.
+    store.json holds the dtypes and the number of respondents, responses and heap bytes. Opening reads only that
+    file and maps the columns, whatever their size.
+    Appended respondents are buffered and written by flush(), which extends each column file in place and then
+    replaces store.json. Bytes past the counts of store.json (an interrupted flush) are ignored and overwritten.
+    """
+    COLUMNS = ('item_idx', 'val', 'option_idx', 'raw_start', 'raw_len')
+
+    def __init__(self, path: str, mode: str = 'r', buffer_size: int = 1024):
+        if mode not in ('r', 'r+'):
+            raise ValueError("mode must be 'r' or 'r+'")
+        self.path = path
+        self.mode = mode
+        self.buffer_size = max(int(buffer_size), 1)
+        with open(os.path.join(path, HEADER_FILE)) as f:
+            header = json.load(f)
+        if header.get('format') != FORMAT_NAME or header.get('version') != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a response store of version {FORMAT_VERSION}")
+        self._dtypes: dict[str, np.dtype] = {name: np.dtype(x) for name, x in header['dtypes'].items()}
+        self._n_rows: int = header['respondents']
+        self._size: int = header['responses']
+        self._heap_size: int = header['heap_bytes']
+        self._pending: list[tuple[np.ndarray, np.ndarray, np.ndarray, list[bytes | None]]] = []  # Raw as utf-8
+        self._map()
+
+    @classmethod
+    def create(cls, path: str, value_dtype=np.int64, index_dtype=np.int32,
+               buffer_size: int = 1024) -> 'MappedResponseStore':
+        """
+        Create an empty store in the directory path and open it for appending
+        """
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(os.path.join(path, HEADER_FILE)):
+            raise FileExistsError(f"{path} already holds a response store")
+        dtypes = {'offsets': np.int64, 'item_idx': index_dtype, 'val': value_dtype, 'option_idx': index_dtype,
+                  'raw_start': np.int64, 'raw_len': np.int32, 'raw': np.uint8}
+        dtypes = {name: np.dtype(x).newbyteorder('<') for name, x in dtypes.items()}
+        for name, dtype in dtypes.items():
+            with open(cls._column_file(path, name), 'wb') as f:
+                if name == 'offsets':
+                    f.write(np.zeros(1, dtype=dtype).tobytes())
+        cls._write_header(path, dtypes, 0, 0, 0)
+        return cls(path, 'r+', buffer_size)
+
+    # Files
+
+    @staticmethod
+    def _column_file(path: str, name: str) -> str:
+        return os.path.join(path, name + '.bin')
+
+    @staticmethod
+    def _write_header(path: str, dtypes: dict[str, np.dtype], n_rows: int, size: int, heap_size: int):
+        header = {'format': FORMAT_NAME, 'version': FORMAT_VERSION, 'respondents': n_rows, 'responses': size,
+                  'heap_bytes': heap_size, 'dtypes': {name: dtype.str for name, dtype in dtypes.items()}}
+        tmp = os.path.join(path, HEADER_FILE + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(header, f)
+        os.replace(tmp, os.path.join(path, HEADER_FILE))
+
+    def _map_column(self, name: str, count: int) -> np.ndarray:
+        if count == 0:  # numpy.memmap cannot map an empty range
+            return np.empty(0, dtype=self._dtypes[name])
+        return np.memmap(self._column_file(self.path, name), dtype=self._dtypes[name], mode='r', shape=(count,))
+
+    def _map(self):
+        self._offsets = self._map_column('offsets', self._n_rows + 1)
+        self._columns = {name: self._map_column(name, self._size) for name in self.COLUMNS}
+        self._heap = self._map_column('raw', self._heap_size)
+
+    def _write_column(self, name: str, at: int, data: np.ndarray):
+        dtype = self._dtypes[name]
+        with open(self._column_file(self.path, name), 'r+b') as f:
+            f.seek(at * dtype.itemsize)
+            f.write(np.ascontiguousarray(data, dtype=dtype).tobytes())
+            f.truncate()
+
+    # Appending
+
+    def append_answers(self, item_idx, values, option_idx=None, raw: Iterable[str | None] | None = None) -> int:
+        """
+        Append the responses of one respondent, in any order. Returns its index in the store.
+        Option indices not given are filled with -1. The respondent is readable once flushed.
+        """
+        if self.mode != 'r+':
+            raise ValueError("store is opened read-only")
+        item_idx = np.asarray(item_idx, dtype=self._dtypes['item_idx'])
+        values = np.asarray(values, dtype=self._dtypes['val'])
+        if option_idx is None:
+            option_idx = np.full(len(values), -1, dtype=self._dtypes['option_idx'])
+        else:
+            option_idx = np.asarray(option_idx, dtype=self._dtypes['option_idx'])
+        raw = [None] * len(values) if raw is None else [self._encode_raw(x) for x in raw]
+        if values.ndim != 1 or item_idx.shape != values.shape or option_idx.shape != values.shape \
+                or len(raw) != len(values):
+            raise ValueError("item_idx, values, option_idx and raw must be 1-D and have the same length")
+        if len(item_idx) and item_idx.min() < 0:
+            raise ValueError("item indices must not be negative")
+        order = np.argsort(item_idx, kind='stable')  # Several answers of one item keep their order
+        self._pending.append((item_idx[order], values[order], option_idx[order], [raw[k] for k in order]))
+        index = self._n_rows + len(self._pending) - 1
+        if len(self._pending) >= self.buffer_size:
+            self.flush()
+        return index
+
+    @staticmethod
+    def _encode_raw(raw: str | None) -> bytes | None:
+        if raw is None:
+            return None
+        if not isinstance(raw, str):
+            raise TypeError(f"raw values must be str or None, not {type(raw).__name__}")
+        try:
+            return raw.encode('utf-8')
+        except UnicodeEncodeError as e:
+            raise ValueError(f"raw value {raw!r} cannot be stored as utf-8") from e
+
+    def append_groups(self, groups: ResponseMatrix | Iterable[ResponseGroup],
+                      slot_of: Callable[[ResponseInstance], int] = get_item_idx) -> int:
+        """
+        Append the responses of one respondent, straight from its ResponseGroups
+        """
+        responses = [ri for group in groups for ri in group]
+        return self.append_answers([slot_of(ri) for ri in responses], [ri.val for ri in responses],
+                                   [ri.option_idx for ri in responses], [ri.raw for ri in responses])
+
+    def get_pending_count(self) -> int:
+        return len(self._pending)
+
+    def flush(self):
+        """
+        Write the buffered respondents to the column files and publish them in store.json.
+        The buffer is kept until store.json is replaced, so a failed flush can be retried.
+        """
+        if not self._pending:
+            return
+        pending = self._pending
+        sizes = np.array([len(x[1]) for x in pending], dtype=np.int64)
+        encoded = [b for x in pending for b in x[3]]
+        raw_len = np.array([-1 if b is None else len(b) for b in encoded], dtype=np.int64)
+        raw_ends = np.cumsum(np.maximum(raw_len, 0))
+        raw_start = self._heap_size + raw_ends - np.maximum(raw_len, 0)
+        columns = {'item_idx': np.concatenate([x[0] for x in pending]),
+                   'val': np.concatenate([x[1] for x in pending]),
+                   'option_idx': np.concatenate([x[2] for x in pending]),
+                   'raw_start': raw_start, 'raw_len': raw_len}
+        self._write_column('offsets', self._n_rows + 1, self._size + np.cumsum(sizes))
+        for name, data in columns.items():
+            self._write_column(name, self._size, data)
+        self._write_column('raw', self._heap_size, np.frombuffer(b''.join(b for b in encoded if b), dtype=np.uint8))
+        n_rows = self._n_rows + len(pending)
+        size = self._size + int(sizes.sum())
+        heap_size = self._heap_size + (int(raw_ends[-1]) if len(raw_ends) else 0)
+        self._write_header(self.path, self._dtypes, n_rows, size, heap_size)
+        self._n_rows, self._size, self._heap_size = n_rows, size, heap_size
+        self._pending = []
+        self._map()
+
+    def close(self):
+        if self.mode == 'r+':
+            self.flush()
+        self._offsets = self._heap = None
+        self._columns = {}
+
+    def __enter__(self) -> 'MappedResponseStore':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # Access
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Map of a column: 'item_idx', 'val', 'option_idx', 'raw_start' or 'raw_len'
+        """
+        return self._columns[name]
+
+    def get_offsets(self) -> np.ndarray:
+        return self._offsets
+
+    def get_response_count(self) -> int:
+        return self._size
+
+    def get_heap_size(self) -> int:
+        return self._heap_size
+
+    def _get_range(self, index: int) -> tuple[int, int]:
+        if index < 0:
+            index += self._n_rows
+        if not 0 <= index < self._n_rows:
+            raise IndexError("respondent index out of range")
+        return int(self._offsets[index]), int(self._offsets[index + 1])
+
+    def get_row(self, index: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (item indices, values) of one respondent, as views of the maps
+        """
+        start, end = self._get_range(index)
+        return self._columns['item_idx'][start:end], self._columns['val'][start:end]
+
+    def get_value(self, index: int, item_idx: int, default=None):
+        """
+        First answer of an item, default when it was not answered
+        """
+        items, values = self.get_row(index)
+        k = int(np.searchsorted(items, item_idx))
+        if k < len(items) and items[k] == item_idx:
+            return values[k].item()
+        return default
+
+    def get_raw(self, position: int) -> str | None:
+        length = int(self._columns['raw_len'][position])
+        if length < 0:
+            return None
+        start = int(self._columns['raw_start'][position])
+        return self._heap[start:start + length].tobytes().decode('utf-8')
+
+    def get_response_instance(self, position: int) -> ResponseInstance:
+        """
+        ResponseInstance of one response. Indices not stored in the file are -1.
+        """
+        columns = self._columns
+        return ResponseInstance(columns['val'][position].item(), self.get_raw(position), -1, -1, -1, -1,
+                                int(columns['item_idx'][position]), int(columns['option_idx'][position]))
+
+    def get_group(self, index: int) -> ResponseGroup:
+        start, end = self._get_range(index)
+        return ResponseGroup([self.get_response_instance(position) for position in range(start, end)])
+
+    def get_evaluator(self, ref_dict: dict[str, int], section_offsets: list[int], index: int = 0,
+                      summarize: bool = False) -> SparseCisaLogicEvaluator:
+        """
+        Evaluator of one respondent, moved to the others with evaluator.bind(*store.get_row(index))
+        """
+        return SparseCisaLogicEvaluator(ref_dict, section_offsets, *self.get_row(index), summarize=summarize)
+
+    # Streaming
+
+    def iter_chunks(self, chunk_size: int = 65536) -> Iterator['ResponseChunk']:
+        """
+        Consecutive chunks of at most chunk_size respondents. Only the chunk being used is read from disk.
+        """
+        chunk_size = max(int(chunk_size), 1)
+        for start in range(0, self._n_rows, chunk_size):
+            yield ResponseChunk(self, start, min(start + chunk_size, self._n_rows))
+
+    def eval_all(self, logics: list[CisaLogic], ref_dict: dict[str, int], section_offsets,
+                 chunk_size: int = 65536) -> np.ndarray:
+        """
+        len(logics) x respondents boolean array, evaluated chunk by chunk
+        """
+        res = np.empty((len(logics), self._n_rows), dtype=bool)
+        for chunk in self.iter_chunks(chunk_size):
+            evaluator = chunk.get_batch_evaluator(ref_dict, section_offsets)
+            for k, logic in enumerate(logics):
+                res[k, chunk.start:chunk.end] = evaluator.eval(logic)
+        return res
+
+    def eval(self, logic: CisaLogic, ref_dict: dict[str, int], section_offsets, chunk_size: int = 65536) -> np.ndarray:
+        return self.eval_all([logic], ref_dict, section_offsets, chunk_size)[0]
+
+    def tabulate(self, item_idx: int, where: np.ndarray | None = None, chunk_size: int = 65536) -> dict[int, int]:
+        """
+        Number of answers of each value of an item, over the respondents selected by where (a boolean array
+        with one entry per respondent, e.g. from eval). Multi-select items count each option selected.
+        """
+        counts: dict[int, int] = {}
+        for chunk in self.iter_chunks(chunk_size):
+            selected = None if where is None else where[chunk.start:chunk.end]
+            values, n = chunk.count_values(item_idx, selected)
+            for value, count in zip(values.tolist(), n.tolist()):
+                counts[value] = counts.get(value, 0) + count
+        return counts
+
+    def nbytes(self) -> int:
+        """
+        Size of the data on disk
+        """
+        return self._offsets.nbytes + sum(column.nbytes for column in self._columns.values()) + self._heap.nbytes
+
+    def __len__(self) -> int:
+        return self._n_rows
+
+
+class ResponseChunk:
+    """
+    Respondents start:end of a MappedResponseStore. Its columns are slices of the maps, read from disk when used;
+    row_pointers is the chunk's own CSR index.
+    """
+
+    def __init__(self, store: MappedResponseStore, start: int, end: int):
+        self._store = store
+        self.start = start
+        self.end = end
+        offsets = np.asarray(store.get_offsets()[start:end + 1])
+        self._first = int(offsets[0])
+        self._last = int(offsets[-1])
+        self.row_pointers = offsets - self._first
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def column(self, name: str) -> np.ndarray:
+        return self._store.column(name)[self._first:self._last]
+
+    def get_batch_evaluator(self, ref_dict: dict[str, int], section_offsets) -> SparseCisaBatchEvaluator:
+        return SparseCisaBatchEvaluator(ref_dict, self.row_pointers, self.column('item_idx'), self.column('val'),
+                                        section_offsets)
+
+    def count_values(self, item_idx: int, where: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (values, counts) of the answers of an item in the chunk, optionally only of the respondents in where
+        """
+        mask = self.column('item_idx') == item_idx
+        values = self.column('val')[mask]
+        if where is not None:
+            rows = np.repeat(np.arange(len(self)), np.diff(self.row_pointers))[mask]
+            values = values[np.asarray(where, dtype=bool)[rows]]
+        return np.unique(np.asarray(values), return_counts=True)
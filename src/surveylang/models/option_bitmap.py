@@ -0,0 +1,106 @@
+from typing import Iterable
+import numpy as np
+
+from surveylang.models.instrument_components import Item
+from surveylang.models.responses import ResponseInstance, ResponseGroup
+from surveylang.logicelements.batchevaluator import SectionBitmap, words_for
+
+
+class OptionBitmap:
+    """
+    OptionBitmap codes the answers of a multi-select section (its ItemCheckbox items) as one bit per option.
+    The options of the k-th item take the bits offsets[k]:offsets[k + 1], keyed by option index, so the answer
+    (item_indices[k], option_idx) is bit offsets[k] + option_idx.
+    The other indices of the ResponseInstances of the section are given once and restored when decoding.
+    """
+
+    def __init__(self, items: list[Item], item_indices: list[int] | None = None, section_idx: int = -1,
+                 question_idx: int = -1, battery_idx: int = -1, segment_idx: int = -1):
+        if item_indices is None:
+            item_indices = list(range(len(items)))
+        if len(item_indices) != len(items):
+            raise ValueError("item_indices must give one index per item")
+        self.item_indices = list(item_indices)
+        self.section_idx = section_idx
+        self.question_idx = question_idx
+        self.battery_idx = battery_idx
+        self.segment_idx = segment_idx
+        self._offsets: dict[int, int] = {}  # item_idx -> first bit
+        self._sizes: dict[int, int] = {}
+        self._options = []
+        self._bit_items: list[int] = []
+        self._bit_options: list[int] = []
+        for item, item_idx in zip(items, self.item_indices):
+            options = item.get_options()
+            self._offsets[item_idx] = len(self._options)
+            self._sizes[item_idx] = len(options)
+            self._options.extend(options)
+            self._bit_items.extend([item_idx] * len(options))
+            self._bit_options.extend(range(len(options)))
+        values = [x.get_value() for x in self._options]
+        if None in values:  # Options without value never satisfy a comparison
+            self.bit_values = np.array([np.nan if x is None else x for x in values], dtype=np.float64)
+        else:
+            self.bit_values = np.array(values, dtype=np.int64)
+
+    def get_bit_count(self) -> int:
+        return len(self._options)
+
+    def get_word_count(self) -> int:
+        return words_for(len(self._options))
+
+    def get_bit(self, item_idx: int, option_idx: int) -> int:
+        offset = self._offsets.get(item_idx)
+        if offset is None or not 0 <= option_idx < self._sizes[item_idx]:
+            raise ValueError(f"No option {option_idx} in item {item_idx}")
+        return offset + option_idx
+
+    def get_bit_key(self, bit: int) -> tuple[int, int]:
+        """
+        (item_idx, option_idx) of a bit
+        """
+        return self._bit_items[bit], self._bit_options[bit]
+
+    def encode(self, group: Iterable[ResponseInstance]) -> int:
+        """
+        Bits of one respondent, as a single integer
+        """
+        bits = 0
+        for ri in group:
+            bits |= 1 << self.get_bit(ri.item_idx, ri.option_idx)
+        return bits
+
+    def decode(self, bits: int) -> ResponseGroup:
+        """
+        ResponseGroup of the selected options, in option order
+        """
+        responses = []
+        while bits:
+            low = bits & -bits
+            bit = low.bit_length() - 1
+            bits ^= low
+            if bit >= len(self._options):
+                raise ValueError(f"Bit {bit} is not an option")
+            option = self._options[bit]
+            responses.append(ResponseInstance(option.get_value(), option.get_raw_value(), self.section_idx,
+                                              self.question_idx, self.battery_idx, self.segment_idx,
+                                              *self.get_bit_key(bit)))
+        return ResponseGroup(responses)
+
+    def encode_groups(self, groups: Iterable[Iterable[ResponseInstance]]) -> SectionBitmap:
+        """
+        SectionBitmap of a batch of respondents, one group each
+        """
+        rows, bits = [], []
+        n = 0
+        for r, group in enumerate(groups):
+            n = r + 1
+            for ri in group:
+                rows.append(r)
+                bits.append(self.get_bit(ri.item_idx, ri.option_idx))
+        selected = np.zeros((n, self.get_bit_count()), dtype=bool)
+        selected[rows, bits] = True
+        return SectionBitmap.from_selected(selected, self.bit_values)
+
+    def decode_groups(self, bitmap: SectionBitmap) -> list[ResponseGroup]:
+        return [self.decode(bitmap.get_bits(r)) for r in range(len(bitmap))]
@@ -0,0 +1,114 @@
+from typing import Iterable
+import numpy as np
+
+from surveylang.models.instrument_component_base import InstrumentComponentBase
+
+
+def normalize_text(text: str) -> str:
+    """
+    Case and white space insensitive form of an option text or raw answer
+    """
+    return ' '.join(text.split()).casefold()
+
+
+class CodedColumn:
+    """
+    Result of coding a column of raw answers for one item.
+    option_indices hold -1 where known is False. valued marks the rows whose option has a value; values is only
+    meaningful there (-1 can be the value of an option). unknown maps every raw answer that matches no option
+    to the rows where it appears. Missing answers (None) are not known and not reported as unknown.
+    """
+
+    def __init__(self, values: np.ndarray, option_indices: np.ndarray, known: np.ndarray,
+                 unknown: dict[str, list[int]], valued: np.ndarray | None = None):
+        self.values = values
+        self.option_indices = option_indices
+        self.known = known
+        self.unknown = unknown
+        self.valued = known if valued is None else valued
+
+    def get_unknown_count(self) -> int:
+        return sum(len(x) for x in self.unknown.values())
+
+    def is_complete(self) -> bool:
+        return not self.unknown
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class OptionCoding:
+    """
+    OptionCoding maps the raw answers of an item to the index and value of its options in O(1).
+    With match_text, answers that match no raw value are also compared with the normalized texts
+    and raw values of the options. The value of options without one is None.
+    """
+
+    def __init__(self, options: list[InstrumentComponentBase], match_text: bool = False):
+        self.match_text = match_text
+        self._codes: dict[str, tuple[int, int]] = {}  # raw value -> (value, option index)
+        self._texts: dict[str, tuple[int, int]] = {}
+        for i, option in enumerate(options):
+            code = (option.get_value(), i)
+            if option.get_raw_value() is not None:
+                self._codes.setdefault(option.get_raw_value(), code)
+            if match_text:
+                for text in (option.get_text(), option.get_raw_value()):
+                    if text is not None:
+                        self._texts.setdefault(normalize_text(text), code)
+
+    def code(self, raw: str) -> tuple[int, int] | None:
+        """
+        (value, option index) of a raw answer, or None when it matches no option
+        """
+        code = self._codes.get(raw)
+        if code is None and self.match_text:
+            code = self._texts.get(normalize_text(raw))
+        return code
+
+    def get_option_index(self, raw: str) -> int:
+        """
+        Raises KeyError for raw answers matching no option
+        """
+        code = self.code(raw)
+        if code is None:
+            raise KeyError(f"No option for raw value {raw!r}")
+        return code[1]
+
+    def get_value(self, raw: str) -> int | None:
+        code = self.code(raw)
+        if code is None:
+            raise KeyError(f"No option for raw value {raw!r}")
+        return code[0]
+
+    def code_column(self, raws: Iterable[str | None]) -> CodedColumn:
+        """
+        Code a column of raw answers in one pass. Every distinct raw answer is looked up once.
+        """
+        raws = list(raws)
+        # Each distinct answer gets an id; row codes are then gathered from per-id tables
+        ids: dict[str | None, int] = {None: 0}
+        for raw in raws:
+            if raw not in ids:
+                ids[raw] = len(ids)
+        table_values = np.full(len(ids), -1, dtype=np.int64)
+        table_indices = np.full(len(ids), -1, dtype=np.int64)
+        table_valued = np.zeros(len(ids), dtype=bool)
+        unknown_ids: dict[str, int] = {}
+        for raw, i in ids.items():
+            if raw is None:
+                continue
+            code = self.code(raw)
+            if code is None:
+                unknown_ids[raw] = i
+            else:
+                value, table_indices[i] = code
+                if value is not None:
+                    table_values[i], table_valued[i] = value, True
+        row_ids = np.fromiter(map(ids.__getitem__, raws), dtype=np.int64, count=len(raws))
+        option_indices = table_indices[row_ids]
+        unknown: dict[str, list[int]] = {raw: [] for raw in unknown_ids}
+        if unknown:
+            for row in np.flatnonzero(np.isin(row_ids, list(unknown_ids.values()))).tolist():
+                unknown[raws[row]].append(row)
+        return CodedColumn(table_values[row_ids], option_indices, option_indices >= 0, unknown, table_valued[row_ids])
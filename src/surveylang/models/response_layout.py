@@ -0,0 +1,183 @@
+from bisect import bisect_right
+from typing import Iterator
+from surveylang.common.enumerators import ComponentType
+from surveylang.logicelements.logicparser import FlatCisaLogicEvaluator
+from surveylang.models.instrument_component_base import InstrumentComponentBase, InstrumentComponentBaseWithChildren, \
+    InstrumentComponentListener
+from surveylang.models.traversal import iter_preorder
+
+
+def iter_sections(component: InstrumentComponentBase) -> Iterator[InstrumentComponentBaseWithChildren]:
+    """
+    Yields the sections of a tree in document order (sections are not searched for nested sections).
+    """
+    return iter_preorder(component, ComponentType.SECTION,
+                         descend=lambda x: x.get_type() not in (ComponentType.SECTION, ComponentType.ITEM))
+
+
+def iter_items(component: InstrumentComponentBase) -> Iterator[InstrumentComponentBase]:
+    """
+    Yields the items of a tree in document order.
+    """
+    return iter_preorder(component, ComponentType.ITEM, descend=lambda x: x.get_type() != ComponentType.ITEM)
+
+
+class ResponseLayout:
+    """
+    ResponseLayout is the response layout of a questionnaire, as used by CisaLogicEvaluator and the batch evaluators:
+    one list of answers per Section, with one slot per Item of the section, in document order.
+    'S<k>' refers to the k-th Section and 'I<k>' to the k-th Item of the questionnaire (1-based), and
+    section s spans the item slots section_offsets[s]:section_offsets[s + 1].
+    Layouts are snapshots: LayoutPlanner returns a new one when the questionnaire changes.
+    """
+
+    def __init__(self, sections: list[InstrumentComponentBaseWithChildren],
+                 section_items: list[list[InstrumentComponentBase]]):
+        self._sections = sections
+        self._section_items = section_items
+        self._section_offsets: list[int] = [0]
+        for items in section_items:
+            self._section_offsets.append(self._section_offsets[-1] + len(items))
+        self._ref_dict: dict[str, int] | None = None
+        self._section_positions: dict[int, int] | None = None
+        self._item_slots: dict[int, int] | None = None
+
+    @staticmethod
+    def section_ref(section: int) -> str:
+        return f'S{section + 1}'
+
+    @staticmethod
+    def item_ref(slot: int) -> str:
+        return f'I{slot + 1}'
+
+    def get_section_count(self) -> int:
+        return len(self._sections)
+
+    def get_item_count(self) -> int:
+        return self._section_offsets[-1]
+
+    def get_ref_dict(self) -> dict[str, int]:
+        """
+        Section and Item refs of the questionnaire and the index each one has in the responses
+        """
+        if self._ref_dict is None:
+            self._ref_dict = {self.section_ref(s): s for s in range(self.get_section_count())}
+            self._ref_dict.update({self.item_ref(i): i for i in range(self.get_item_count())})
+        return self._ref_dict
+
+    def get_section_offsets(self) -> list[int]:
+        return self._section_offsets
+
+    def get_evaluator(self, item_responses=None, summarize: bool = False) -> FlatCisaLogicEvaluator:
+        """
+        Evaluator over one flat buffer of item responses in this layout, rebindable with bind()
+        """
+        return FlatCisaLogicEvaluator(self.get_ref_dict(), self._section_offsets, item_responses, summarize)
+
+    def get_section_range(self, section: int) -> tuple[int, int]:
+        return self._section_offsets[section], self._section_offsets[section + 1]
+
+    def get_section(self, section: int) -> InstrumentComponentBaseWithChildren:
+        return self._sections[section]
+
+    def get_item(self, slot: int) -> InstrumentComponentBase:
+        section = self.get_section_of_slot(slot)
+        return self._section_items[section][slot - self._section_offsets[section]]
+
+    def get_section_items(self, section: int) -> list[InstrumentComponentBase]:
+        return self._section_items[section]
+
+    def get_section_of_slot(self, slot: int) -> int:
+        if not 0 <= slot < self.get_item_count():
+            raise IndexError(f"Item slot {slot} out of range")
+        return bisect_right(self._section_offsets, slot) - 1
+
+    def get_section_index(self, section: InstrumentComponentBase) -> int:
+        if self._section_positions is None:
+            self._section_positions = {id(x): s for s, x in enumerate(self._sections)}
+        return self._section_positions[id(section)]
+
+    def get_item_slot(self, item: InstrumentComponentBase) -> int:
+        if self._item_slots is None:
+            self._item_slots = {id(x): self._section_offsets[s] + i
+                                for s, items in enumerate(self._section_items) for i, x in enumerate(items)}
+        return self._item_slots[id(item)]
+
+    def split(self, item_responses: list[int]) -> list[list[int]]:
+        """
+        section_responses for one answer per item slot
+        """
+        if len(item_responses) != self.get_item_count():
+            raise ValueError(f"Expected {self.get_item_count()} item responses, got {len(item_responses)}")
+        return [list(item_responses[a:b]) for a, b in zip(self._section_offsets, self._section_offsets[1:])]
+
+
+class LayoutPlanner(InstrumentComponentListener):
+    """
+    LayoutPlanner keeps the ResponseLayout of a questionnaire. It listens to the tree and only collects again
+    the items of the sections that changed; the layout is rebuilt on the next get_layout call.
+    Items that are not inside a Section have no slot.
+    """
+
+    def __init__(self, root: InstrumentComponentBaseWithChildren):
+        self._root = root
+        self._sections: list[InstrumentComponentBaseWithChildren] = []
+        self._section_items: dict[int, list[InstrumentComponentBase]] = {}  # id(section) -> items
+        self._sections_changed = True
+        self._dirty: set[int] = set()  # id of the sections whose items changed
+        self._layout: ResponseLayout | None = None
+        self.rebuilt_sections = 0  # Sections whose items were collected again, for diagnostics
+        root.add_listener(self)
+
+    def close(self):
+        """
+        Stop following the changes of the questionnaire
+        """
+        self._root.remove_listener(self)
+
+    def get_layout(self) -> ResponseLayout:
+        if self._layout is not None:
+            return self._layout
+        if self._sections_changed:
+            self._sections = list(iter_sections(self._root))
+            section_ids = {id(x) for x in self._sections}
+            self._section_items = {k: v for k, v in self._section_items.items() if k in section_ids}
+            self._sections_changed = False
+        for section in self._sections:
+            if id(section) in self._dirty or id(section) not in self._section_items:
+                self._section_items[id(section)] = list(iter_items(section))
+                self.rebuilt_sections += 1
+        self._dirty.clear()
+        self._layout = ResponseLayout(list(self._sections), [self._section_items[id(x)] for x in self._sections])
+        return self._layout
+
+    # Changes
+
+    @staticmethod
+    def _enclosing_section(component: InstrumentComponentBase) -> InstrumentComponentBase | None:
+        while component is not None:
+            if component.get_type() == ComponentType.SECTION:
+                return component
+            component = component.get_parent()
+        return None
+
+    def _changed(self, parent: InstrumentComponentBaseWithChildren, child: InstrumentComponentBase | None):
+        if parent.get_type() == ComponentType.ITEM:
+            return  # Options do not take slots
+        section = self._enclosing_section(parent)
+        if section is None:
+            if child is not None and next(iter_sections(child), None) is None:
+                return  # No section was added or removed
+            self._sections_changed = True
+        else:
+            self._dirty.add(id(section))
+        self._layout = None
+
+    def child_added(self, parent: InstrumentComponentBaseWithChildren, child: InstrumentComponentBase):
+        self._changed(parent, child)
+
+    def child_removed(self, parent: InstrumentComponentBaseWithChildren, child: InstrumentComponentBase):
+        self._changed(parent, child)
+
+    def children_moved(self, parent: InstrumentComponentBaseWithChildren):
+        self._changed(parent, None)
@@ -0,0 +1,250 @@
+import numpy as np
+from typing import Iterator, Iterable
+from surveylang.models.responses import ResponseInstance, ResponseGroup, ResponseMatrix
+
+
+class ResponseStore:
+    """
+    ResponseStore keeps the responses of many respondents in typed NumPy columns instead of ResponseInstance objects.
+    Each respondent is a ragged list of groups (the ResponseGroups of its ResponseMatrix), described by two offset
+    arrays: matrix_offsets (respondent -> groups) and group_offsets (group -> responses).
+    Raw strings are interned in a side table and stored as integer ids (-1 for None).
+    """
+    INDEX_COLUMNS = ('section_idx', 'question_idx', 'battery_idx', 'segment_idx', 'item_idx', 'option_idx')
+
+    def __init__(self, capacity: int = 1024, value_dtype=np.int64, index_dtype=np.int32):
+        capacity = max(int(capacity), 1)
+        self._size = 0
+        self._columns: dict[str, np.ndarray] = {'val': np.empty(capacity, dtype=value_dtype)}
+        for name in self.INDEX_COLUMNS:
+            self._columns[name] = np.empty(capacity, dtype=index_dtype)
+        self._columns['raw_id'] = np.empty(capacity, dtype=np.int32)
+        self._group_offsets: np.ndarray = np.zeros(1, dtype=np.int64)
+        self._n_groups = 0
+        self._matrix_offsets: np.ndarray = np.zeros(1, dtype=np.int64)
+        self._n_matrices = 0
+        self._raw_table: list[str] = []
+        self._raw_index: dict[str, int] = {}
+
+    # Storage management
+
+    def _reserve(self, n_responses: int, n_groups: int, n_matrices: int):
+        needed = self._size + n_responses
+        capacity = len(self._columns['val'])
+        if needed > capacity:
+            new_capacity = max(needed, 2 * capacity)
+            for name, column in self._columns.items():
+                grown = np.empty(new_capacity, dtype=column.dtype)
+                grown[:self._size] = column[:self._size]
+                self._columns[name] = grown
+        self._group_offsets = self._grow(self._group_offsets, self._n_groups + 1 + n_groups)
+        self._matrix_offsets = self._grow(self._matrix_offsets, self._n_matrices + 1 + n_matrices)
+
+    @staticmethod
+    def _grow(offsets: np.ndarray, needed: int) -> np.ndarray:
+        if needed <= len(offsets):
+            return offsets
+        grown = np.empty(max(needed, 2 * len(offsets)), dtype=offsets.dtype)
+        grown[:len(offsets)] = offsets
+        return grown
+
+    def intern_raw(self, raw: str | None) -> int:
+        if raw is None:
+            return -1
+        raw_id = self._raw_index.get(raw)
+        if raw_id is None:
+            raw_id = len(self._raw_table)
+            self._raw_table.append(raw)
+            self._raw_index[raw] = raw_id
+        return raw_id
+
+    def get_raw(self, raw_id: int) -> str | None:
+        return None if raw_id < 0 else self._raw_table[raw_id]
+
+    def get_raw_table(self) -> list[str]:
+        return self._raw_table
+
+    # Appending
+
+    def append_matrix(self, matrix: ResponseMatrix | Iterable[ResponseGroup]) -> int:
+        """
+        Append the responses of one respondent. Returns its index in the store.
+        """
+        groups = [list(group.get_iterator()) if isinstance(group, ResponseGroup) else list(group) for group in matrix]
+        responses = [ri for group in groups for ri in group]
+        self._reserve(len(responses), len(groups), 1)
+        start = self._size
+        end = start + len(responses)
+        self._columns['val'][start:end] = [ri.val for ri in responses]
+        for name in self.INDEX_COLUMNS:
+            self._columns[name][start:end] = [getattr(ri, name) for ri in responses]
+        self._columns['raw_id'][start:end] = [self.intern_raw(ri.raw) for ri in responses]
+        self._size = end
+        return self._close_matrix([len(group) for group in groups])
+
+    def append_arrays(self, values, group_sizes, raw: Iterable[str | None] | None = None, **index_columns) -> int:
+        """
+        Append the responses of one respondent straight from arrays, without building ResponseInstance objects.
+        Index columns not given are filled with -1.
+        """
+        values = np.asarray(values)
+        group_sizes = np.asarray(group_sizes, dtype=np.int64)
+        if group_sizes.sum() != len(values):
+            raise ValueError("group_sizes must add up to the number of values")
+        unknown = set(index_columns) - set(self.INDEX_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown index columns: {sorted(unknown)}")
+        self._reserve(len(values), len(group_sizes), 1)
+        start = self._size
+        end = start + len(values)
+        self._columns['val'][start:end] = values
+        for name in self.INDEX_COLUMNS:
+            self._columns[name][start:end] = index_columns.get(name, -1)
+        if raw is None:
+            self._columns['raw_id'][start:end] = -1
+        else:
+            self._columns['raw_id'][start:end] = [self.intern_raw(x) for x in raw]
+        self._size = end
+        return self._close_matrix(group_sizes)
+
+    def _close_matrix(self, group_sizes) -> int:
+        n = len(group_sizes)
+        first = self._n_groups
+        self._group_offsets[first + 1:first + 1 + n] = self._group_offsets[first] + np.cumsum(group_sizes)
+        self._n_groups += n
+        self._matrix_offsets[self._n_matrices + 1] = self._n_groups
+        self._n_matrices += 1
+        return self._n_matrices - 1
+
+    @classmethod
+    def from_response_matrices(cls, matrices: Iterable[ResponseMatrix]) -> 'ResponseStore':
+        store = cls()
+        for matrix in matrices:
+            store.append_matrix(matrix)
+        return store
+
+    # Access
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        View over the used part of a column: 'val', 'raw_id' or one of INDEX_COLUMNS.
+        """
+        return self._columns[name][:self._size]
+
+    def get_group_offsets(self) -> np.ndarray:
+        return self._group_offsets[:self._n_groups + 1]
+
+    def get_matrix_offsets(self) -> np.ndarray:
+        return self._matrix_offsets[:self._n_matrices + 1]
+
+    def get_response_count(self) -> int:
+        return self._size
+
+    def get_group_count(self) -> int:
+        return self._n_groups
+
+    def get_matrix(self, index: int) -> 'ResponseMatrixView':
+        if index < 0:
+            index += self._n_matrices
+        if not 0 <= index < self._n_matrices:
+            raise IndexError("respondent index out of range")
+        return ResponseMatrixView(self, index)
+
+    def get_response_matrix(self, index: int) -> list[np.ndarray]:
+        return self.get_matrix(index).get_response_matrix()
+
+    def get_response_instance(self, position: int) -> ResponseInstance:
+        columns = self._columns
+        return ResponseInstance(columns['val'][position].item(), self.get_raw(int(columns['raw_id'][position])),
+                                *(int(columns[name][position]) for name in self.INDEX_COLUMNS))
+
+    def nbytes(self) -> int:
+        return sum(column[:self._size].nbytes for column in self._columns.values()) \
+            + self.get_group_offsets().nbytes + self.get_matrix_offsets().nbytes
+
+    def __len__(self) -> int:
+        return self._n_matrices
+
+    def __getitem__(self, index: int) -> 'ResponseMatrixView':
+        return self.get_matrix(index)
+
+    def __iter__(self) -> Iterator['ResponseMatrixView']:
+        for i in range(self._n_matrices):
+            yield ResponseMatrixView(self, i)
+
+
+class ResponseGroupView:
+    """
+    Read-only ResponseGroup over a slice of a ResponseStore. ResponseInstance objects are built on demand.
+    """
+
+    def __init__(self, store: ResponseStore, start: int, end: int):
+        self._store = store
+        self._start = start
+        self._end = end
+
+    def get_values(self) -> np.ndarray:
+        return self._store.column('val')[self._start:self._end]
+
+    def column(self, name: str) -> np.ndarray:
+        return self._store.column(name)[self._start:self._end]
+
+    def get_iterator(self) -> Iterator[ResponseInstance]:
+        for position in range(self._start, self._end):
+            yield self._store.get_response_instance(position)
+
+    def __iter__(self) -> Iterator[ResponseInstance]:
+        return self.get_iterator()
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def __getitem__(self, idx: int) -> ResponseInstance:
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("response index out of range")
+        return self._store.get_response_instance(self._start + idx)
+
+
+class ResponseMatrixView:
+    """
+    Read-only ResponseMatrix for one respondent of a ResponseStore.
+    """
+
+    def __init__(self, store: ResponseStore, index: int):
+        self._store = store
+        self._index = index
+        matrix_offsets = store.get_matrix_offsets()
+        self._first_group = int(matrix_offsets[index])
+        self._n_groups = int(matrix_offsets[index + 1]) - self._first_group
+
+    def _group(self, idx: int) -> ResponseGroupView:
+        group_offsets = self._store.get_group_offsets()
+        g = self._first_group + idx
+        return ResponseGroupView(self._store, int(group_offsets[g]), int(group_offsets[g + 1]))
+
+    def get_iterator(self) -> Iterator[ResponseGroupView]:
+        for idx in range(self._n_groups):
+            yield self._group(idx)
+
+    def __iter__(self) -> Iterator[ResponseGroupView]:
+        return self.get_iterator()
+
+    def __len__(self) -> int:
+        return self._n_groups
+
+    def __getitem__(self, idx: int) -> ResponseGroupView:
+        if idx < 0:
+            idx += self._n_groups
+        if not 0 <= idx < self._n_groups:
+            raise IndexError("group index out of range")
+        return self._group(idx)
+
+    def get_response_matrix(self) -> list[np.ndarray]:
+        """
+        Same layout as ResponseMatrix.get_response_matrix, as views over the value column (no copies).
+        """
+        values = self._store.column('val')
+        offsets = self._store.get_group_offsets()[self._first_group:self._first_group + self._n_groups + 1].tolist()
+        return [values[offsets[i]:offsets[i + 1]] for i in range(self._n_groups)]
@@ -0,0 +1,173 @@
+# ----------------------------------------
+# Precompiled routing.
+#
+# RoutingTable resolves every entry/exit target of a questionnaire to a state index once, so moving
+# through the questionnaire is a sequence of table lookups instead of tree walks and name searches.
+# State of the component at position p: 3p (ENTER), 3p + 1 (EXIT), 3p + 2 (PRESENT); END is -1.
+# ----------------------------------------
+
+from typing import Callable
+from surveylang.common.enumerators import ComponentType
+from surveylang.models.instrument_component_base import InstrumentComponentBase, InstrumentComponentBaseWithLogic, \
+    InstrumentLogicExpression
+from surveylang.models.instrument_logic import ENTRY_LOGIC, EXIT_LOGIC, HERE_TARGET, NEXT_TARGET, \
+    iter_logic_components, get_logic_block, get_component_names
+
+END = -1  # State reached when the questionnaire is finished
+
+
+class RoutingError(ValueError):
+    """
+    Raised when routing targets do not match any component
+    """
+
+    def __init__(self, targets: list[str]):
+        self.targets = targets
+        super().__init__('Unresolved routing targets: {}'.format(', '.join(targets)))
+
+
+def is_presented(component: InstrumentComponentBase) -> bool:
+    """
+    Components shown to the respondent when the routing enters them
+    """
+    return component.get_type() == ComponentType.SEGMENT
+
+
+class RoutingTable:
+    """
+    RoutingTable compiles the entry/exit logic blocks of a questionnaire into flat rows of
+    (condition, destination) pairs, so a runtime can route without walking the tree or matching target strings.
+
+    Every logic component gets a position (document order) and three states: ENTER (its entry block is evaluated),
+    EXIT (its exit block is evaluated) and PRESENT (it is shown). The row of a state holds the expressions of the
+    block in order and their destination states, plus the default destination when no expression holds.
+    Targets follow the InterviewSession rules: '@HERE' enters the owner (from an exit block, again),
+    '@NEXT' continues after the owner and other targets jump to the named component.
+    """
+    ENTER, EXIT, PRESENT = 0, 1, 2
+
+    def __init__(self, questionnaire: InstrumentComponentBaseWithLogic):
+        self._components: list[InstrumentComponentBaseWithLogic] = list(iter_logic_components(questionnaire))
+        self._positions: dict[int, int] = {id(x): i for i, x in enumerate(self._components)}
+        names: dict[str, int] = {}
+        for position, component in enumerate(self._components):
+            for name in get_component_names(component):
+                names.setdefault(name, position)
+        # State that continues after each component ('@NEXT'): next logic sibling, otherwise the parent exit.
+        # Same rule as get_next_step, which the dependency index follows.
+        self._next: list[int] = [END] * len(self._components)
+        for position, component in enumerate(self._components):
+            children = [self._positions[id(x)] for x in component.get_children()
+                        if isinstance(x, InstrumentComponentBaseWithLogic)]
+            for child, following in zip(children, children[1:]):
+                self._next[child] = 3 * following + self.ENTER
+            if children:
+                self._next[children[-1]] = 3 * position + self.EXIT
+
+        n_states = 3 * len(self._components)
+        self._row_start: list[int] = [0] * (n_states + 1)
+        self._pair_conditions: list[InstrumentLogicExpression] = []
+        self._pair_destinations: list[int] = []
+        self._default: list[int] = [END] * n_states
+        unresolved: list[str] = []
+
+        for position, component in enumerate(self._components):
+            for phase, kind in ((self.ENTER, ENTRY_LOGIC), (self.EXIT, EXIT_LOGIC)):
+                state = 3 * position + phase
+                self._row_start[state] = len(self._pair_conditions)
+                block = get_logic_block(component, kind)
+                if block is None:
+                    self._default[state] = self._destination(position, phase, HERE_TARGET if phase == self.ENTER
+                                                             else NEXT_TARGET, names, unresolved)
+                    continue
+                for expression in block.get_expressions():
+                    self._pair_conditions.append(expression)
+                    self._pair_destinations.append(
+                        self._destination(position, phase, expression.get_target(), names, unresolved))
+                self._default[state] = self._destination(position, phase, block.get_target(), names, unresolved)
+            present = 3 * position + self.PRESENT
+            self._row_start[present] = len(self._pair_conditions)
+            self._default[present] = 3 * position + self.EXIT
+        self._row_start[n_states] = len(self._pair_conditions)
+        if unresolved:
+            raise RoutingError(list(dict.fromkeys(unresolved)))
+
+    # Compilation
+
+    def _inside(self, position: int) -> int:
+        component = self._components[position]
+        if is_presented(component):
+            return 3 * position + self.PRESENT
+        for child in component.get_children():
+            if isinstance(child, InstrumentComponentBaseWithLogic):
+                return 3 * self._positions[id(child)] + self.ENTER
+        return 3 * position + self.EXIT
+
+    def _destination(self, position: int, phase: int, target: str, names: dict[str, int],
+                     unresolved: list[str]) -> int:
+        if target == NEXT_TARGET:
+            return self._next[position]
+        if target == HERE_TARGET:
+            return self._inside(position) if phase == self.ENTER else 3 * position + self.ENTER
+        destination = names.get(target)
+        if destination is None:
+            unresolved.append(target)
+            return END
+        return 3 * destination + self.ENTER
+
+    # Runtime
+
+    def __len__(self) -> int:
+        return len(self._components)
+
+    def get_components(self) -> list[InstrumentComponentBaseWithLogic]:
+        return self._components
+
+    def get_position(self, component: InstrumentComponentBaseWithLogic) -> int:
+        return self._positions[id(component)]
+
+    def get_component(self, state: int) -> InstrumentComponentBaseWithLogic | None:
+        return None if state == END else self._components[state // 3]
+
+    def get_state(self, component: InstrumentComponentBaseWithLogic, phase: int) -> int:
+        return 3 * self._positions[id(component)] + phase
+
+    def get_row(self, state: int) -> tuple[list[tuple[InstrumentLogicExpression, int]], int]:
+        """
+        (condition, destination) pairs of a state, and its default destination
+        """
+        start, end = self._row_start[state], self._row_start[state + 1]
+        return list(zip(self._pair_conditions[start:end], self._pair_destinations[start:end])), self._default[state]
+
+    def step(self, state: int, is_true: Callable[[InstrumentLogicExpression], bool]) -> int:
+        """
+        One hop: destination of the first condition of the row that holds, or the default one
+        """
+        for i in range(self._row_start[state], self._row_start[state + 1]):
+            if is_true(self._pair_conditions[i]):
+                return self._pair_destinations[i]
+        return self._default[state]
+
+    def route(self, state: int, is_true: Callable[[InstrumentLogicExpression], bool]) -> int:
+        """
+        Hop from the state until a PRESENT state or END
+        """
+        hops = 0
+        limit = len(self._default)
+        while state != END:
+            if state % 3 == self.PRESENT:
+                return state
+            hops += 1
+            if hops > limit:
+                raise RuntimeError("Routing does not reach any component (loop in the logic targets)")
+            state = self.step(state, is_true)
+        return END
+
+    def first(self, is_true: Callable[[InstrumentLogicExpression], bool]) -> InstrumentComponentBaseWithLogic | None:
+        if not self._components:
+            return None
+        return self.get_component(self.route(self.ENTER, is_true))
+
+    def after(self, component: InstrumentComponentBaseWithLogic,
+              is_true: Callable[[InstrumentLogicExpression], bool]) -> InstrumentComponentBaseWithLogic | None:
+        return self.get_component(self.route(self.get_state(component, self.EXIT), is_true))
@@ -0,0 +1,148 @@
+import numpy as np
+from typing import Callable, Iterable
+from surveylang.models.responses import ResponseInstance, ResponseGroup, ResponseMatrix
+from surveylang.logicelements.logicparser import SparseCisaLogicEvaluator
+from surveylang.logicelements.batchevaluator import SparseCisaBatchEvaluator
+
+
+def get_item_idx(ri: ResponseInstance) -> int:
+    return ri.item_idx
+
+
+class SparseResponseStore:
+    """
+    SparseResponseStore keeps only the answers actually given, in CSR form: the answers of respondent r are
+    item_slots[row_pointers[r]:row_pointers[r + 1]], sorted by item slot, and their values. Items without answer
+    take no memory and stay distinct from an answer of 0.
+    Item slots are those of the response layout (ResponseLayout.get_item_slot); by default the item_idx of the
+    ResponseInstances.
+    """
+
+    def __init__(self, capacity: int = 1024, value_dtype=np.int64, slot_dtype=np.int32):
+        capacity = max(int(capacity), 1)
+        self._size = 0
+        self._slots: np.ndarray = np.empty(capacity, dtype=slot_dtype)
+        self._values: np.ndarray = np.empty(capacity, dtype=value_dtype)
+        self._row_pointers: np.ndarray = np.zeros(1, dtype=np.int64)
+        self._n_rows = 0
+
+    # Storage management
+
+    def _reserve(self, n_answers: int):
+        needed = self._size + n_answers
+        if needed > len(self._values):
+            new_capacity = max(needed, 2 * len(self._values))
+            for name in ('_slots', '_values'):
+                column = getattr(self, name)
+                grown = np.empty(new_capacity, dtype=column.dtype)
+                grown[:self._size] = column[:self._size]
+                setattr(self, name, grown)
+        if self._n_rows + 2 > len(self._row_pointers):
+            grown = np.empty(max(self._n_rows + 2, 2 * len(self._row_pointers)), dtype=np.int64)
+            grown[:self._n_rows + 1] = self._row_pointers[:self._n_rows + 1]
+            self._row_pointers = grown
+
+    # Appending
+
+    def append_answers(self, item_slots, values) -> int:
+        """
+        Append the answers of one respondent, in any order. Returns its index in the store.
+        """
+        item_slots = np.asarray(item_slots, dtype=self._slots.dtype)
+        values = np.asarray(values, dtype=self._values.dtype)
+        if item_slots.shape != values.shape or item_slots.ndim != 1:
+            raise ValueError("item_slots and values must be 1-D and have the same length")
+        if len(item_slots) and item_slots.min() < 0:
+            raise ValueError("item slots must not be negative")
+        order = np.argsort(item_slots, kind='stable')  # Several answers of one item keep their order
+        self._reserve(len(values))
+        start = self._size
+        end = start + len(values)
+        self._slots[start:end] = item_slots[order]
+        self._values[start:end] = values[order]
+        self._size = end
+        self._row_pointers[self._n_rows + 1] = end
+        self._n_rows += 1
+        return self._n_rows - 1
+
+    def append_groups(self, groups: ResponseMatrix | Iterable[ResponseGroup],
+                      slot_of: Callable[[ResponseInstance], int] = get_item_idx) -> int:
+        """
+        Append the responses of one respondent, straight from its ResponseGroups
+        """
+        responses = [ri for group in groups for ri in group]
+        return self.append_answers([slot_of(ri) for ri in responses], [ri.val for ri in responses])
+
+    @classmethod
+    def from_response_matrices(cls, matrices: Iterable[ResponseMatrix | Iterable[ResponseGroup]],
+                               slot_of: Callable[[ResponseInstance], int] = get_item_idx) -> 'SparseResponseStore':
+        store = cls()
+        for matrix in matrices:
+            store.append_groups(matrix, slot_of)
+        return store
+
+    # Access
+
+    def get_row_pointers(self) -> np.ndarray:
+        return self._row_pointers[:self._n_rows + 1]
+
+    def get_item_slots(self) -> np.ndarray:
+        return self._slots[:self._size]
+
+    def get_values(self) -> np.ndarray:
+        return self._values[:self._size]
+
+    def get_answer_count(self) -> int:
+        return self._size
+
+    def get_row(self, index: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (item slots, values) of one respondent, as views
+        """
+        if index < 0:
+            index += self._n_rows
+        if not 0 <= index < self._n_rows:
+            raise IndexError("respondent index out of range")
+        start, end = self._row_pointers[index], self._row_pointers[index + 1]
+        return self._slots[start:end], self._values[start:end]
+
+    def get_value(self, index: int, slot: int, default=None):
+        """
+        First answer of an item, default when it was not answered
+        """
+        slots, values = self.get_row(index)
+        k = int(np.searchsorted(slots, slot))
+        if k < len(slots) and slots[k] == slot:
+            return values[k].item()
+        return default
+
+    def to_dense(self, n_items: int, fill: int = 0) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (values, answered) respondents x items arrays, keeping the first answer of each item
+        """
+        values = np.full((self._n_rows, n_items), fill, dtype=self._values.dtype)
+        answered = np.zeros((self._n_rows, n_items), dtype=bool)
+        rows = np.repeat(np.arange(self._n_rows), np.diff(self.get_row_pointers()))
+        slots = self.get_item_slots()
+        first = np.ones(self._size, dtype=bool)
+        first[1:] = (rows[1:] != rows[:-1]) | (slots[1:] != slots[:-1])
+        values[rows[first], slots[first]] = self.get_values()[first]
+        answered[rows[first], slots[first]] = True
+        return values, answered
+
+    def get_evaluator(self, ref_dict: dict[str, int], section_offsets: list[int], index: int = 0,
+                      summarize: bool = False) -> SparseCisaLogicEvaluator:
+        """
+        Evaluator of one respondent, moved to the others with evaluator.bind(*store.get_row(index))
+        """
+        return SparseCisaLogicEvaluator(ref_dict, section_offsets, *self.get_row(index), summarize=summarize)
+
+    def get_batch_evaluator(self, ref_dict: dict[str, int], section_offsets) -> SparseCisaBatchEvaluator:
+        return SparseCisaBatchEvaluator(ref_dict, self.get_row_pointers(), self.get_item_slots(), self.get_values(),
+                                        section_offsets)
+
+    def nbytes(self) -> int:
+        return self.get_item_slots().nbytes + self.get_values().nbytes + self.get_row_pointers().nbytes
+
+    def __len__(self) -> int:
+        return self._n_rows
@@ -0,0 +1,159 @@
+# ----------------------------------------
+# Traversal of component trees.
+#
+# iter_preorder and iter_postorder walk a tree without recursion, optionally filtered by ComponentType or
+# ItemType and limited in depth. FlatTree freezes a tree into preorder arrays with enter/exit indices:
+# the subtree of the component at index i is the slice [i, exit[i]), so the components of a given type
+# under any component are a slice of the preorder list of that type.
+# ----------------------------------------
+
+from typing import Callable, Iterator
+from surveylang.common.enumerators import ComponentType, ItemType
+from surveylang.models.instrument_component_base import InstrumentComponentBase, InstrumentComponentBaseWithChildren
+
+
+def _matches(component: InstrumentComponentBase, component_type: ComponentType | None,
+             item_type: ItemType | None) -> bool:
+    if item_type is not None:
+        return component.get_type() == ComponentType.ITEM and component.get_item_type() == item_type
+    return component_type is None or component.get_type() == component_type
+
+
+def iter_preorder(root: InstrumentComponentBase, component_type: ComponentType | None = None,
+                  item_type: ItemType | None = None, max_depth: int | None = None,
+                  descend: Callable[[InstrumentComponentBase], bool] | None = None) \
+        -> Iterator[InstrumentComponentBase]:
+    """
+    Yields the root and its descendants, parents before children, in document order.
+    Only components of component_type (or items of item_type) are yielded. The root has depth 0 and components
+    deeper than max_depth are not visited, nor are the children of components for which descend is false.
+    """
+    stack: list[tuple[InstrumentComponentBase, int]] = [(root, 0)]
+    while stack:
+        component, depth = stack.pop()
+        if _matches(component, component_type, item_type):
+            yield component
+        if isinstance(component, InstrumentComponentBaseWithChildren) \
+                and (max_depth is None or depth < max_depth) and (descend is None or descend(component)):
+            stack.extend((child, depth + 1) for child in reversed(component.get_children()))
+
+
+def iter_postorder(root: InstrumentComponentBase, component_type: ComponentType | None = None,
+                   item_type: ItemType | None = None, max_depth: int | None = None,
+                   descend: Callable[[InstrumentComponentBase], bool] | None = None) \
+        -> Iterator[InstrumentComponentBase]:
+    """
+    Yields the root and its descendants, children before parents, in document order.
+    Same filters as iter_preorder.
+    """
+    stack: list[tuple[InstrumentComponentBase, int, bool]] = [(root, 0, False)]
+    while stack:
+        component, depth, expanded = stack.pop()
+        if expanded:
+            if _matches(component, component_type, item_type):
+                yield component
+            continue
+        stack.append((component, depth, True))
+        if isinstance(component, InstrumentComponentBaseWithChildren) \
+                and (max_depth is None or depth < max_depth) and (descend is None or descend(component)):
+            stack.extend((child, depth + 1, False) for child in reversed(component.get_children()))
+
+
+class FlatTree:
+    """
+    FlatTree is a frozen preorder snapshot of a component tree (Euler tour). Component i spans the indices
+    [i, get_exit(i)), its depth and parent index are stored, and the components of one type are kept in
+    preorder lists, so the descendants of a component with a given type are found with two lookups.
+    The snapshot does not follow later changes of the tree: build a new one after editing it.
+    """
+
+    def __init__(self, root: InstrumentComponentBase):
+        self._components: list[InstrumentComponentBase] = []
+        self._exit: list[int] = []
+        self._depth: list[int] = []
+        self._parent: list[int] = []
+        self._index: dict[int, int] = {}  # id(component) -> preorder index
+        stack: list[tuple[InstrumentComponentBase, int, int]] = [(root, 0, -1)]
+        open_: list[int] = []  # Indices whose subtree is not closed yet
+        while stack:
+            component, depth, parent = stack.pop()
+            while open_ and self._depth[open_[-1]] >= depth:
+                self._exit[open_.pop()] = len(self._components)
+            index = len(self._components)
+            self._components.append(component)
+            self._exit.append(-1)
+            self._depth.append(depth)
+            self._parent.append(parent)
+            self._index[id(component)] = index
+            open_.append(index)
+            if isinstance(component, InstrumentComponentBaseWithChildren):
+                stack.extend((child, depth + 1, index) for child in reversed(component.get_children()))
+        for index in open_:
+            self._exit[index] = len(self._components)
+        self._by_type: dict[ComponentType | ItemType, tuple[list[InstrumentComponentBase], list[int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._components)
+
+    def get_components(self) -> list[InstrumentComponentBase]:
+        return self._components
+
+    def get_index(self, component: InstrumentComponentBase) -> int:
+        return self._index[id(component)]
+
+    def get_enter(self, index: int) -> int:
+        return index
+
+    def get_exit(self, index: int) -> int:
+        return self._exit[index]
+
+    def get_depth(self, index: int) -> int:
+        return self._depth[index]
+
+    def get_parent_index(self, index: int) -> int:
+        """
+        Preorder index of the parent, -1 for the root
+        """
+        return self._parent[index]
+
+    def get_subtree(self, component: InstrumentComponentBase) -> list[InstrumentComponentBase]:
+        """
+        The component and its descendants in preorder
+        """
+        index = self.get_index(component)
+        return self._components[index:self._exit[index]]
+
+    def is_descendant(self, component: InstrumentComponentBase, ancestor: InstrumentComponentBase) -> bool:
+        index, start = self.get_index(component), self.get_index(ancestor)
+        return start < index < self._exit[start]
+
+    def _typed(self, kind: ComponentType | ItemType) -> tuple[list[InstrumentComponentBase], list[int]]:
+        """
+        Components of a type in preorder, and for every preorder index the number of them before it
+        """
+        typed = self._by_type.get(kind)
+        if typed is None:
+            component_type, item_type = (None, kind) if isinstance(kind, ItemType) else (kind, None)
+            components: list[InstrumentComponentBase] = []
+            rank: list[int] = []
+            for component in self._components:
+                rank.append(len(components))
+                if _matches(component, component_type, item_type):
+                    components.append(component)
+            rank.append(len(components))
+            typed = self._by_type[kind] = components, rank
+        return typed
+
+    def get_descendants(self, component: InstrumentComponentBase, kind: ComponentType | ItemType) \
+            -> list[InstrumentComponentBase]:
+        """
+        Components of a ComponentType or ItemType in the subtree of the component, in preorder
+        """
+        components, rank = self._typed(kind)
+        index = self.get_index(component)
+        return components[rank[index]:rank[self._exit[index]]]
+
+    def count_descendants(self, component: InstrumentComponentBase, kind: ComponentType | ItemType) -> int:
+        _, rank = self._typed(kind)
+        index = self.get_index(component)
+        return rank[self._exit[index]] - rank[index]
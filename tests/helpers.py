@@ -0,0 +1,66 @@
+import random
+from surveylang.logicelements.logicparser import ItemIndexable, SectionIndexable
+from surveylang.logicelements.logicparser import LT, LTE, GT, GTE, EQ
+from surveylang.logicelements.logicparser import SLT, SLTE, SGT, SGTE, IN
+from surveylang.logicelements.logicparser import ANY, ALL, NOT
+from surveylang.models.instrument_component_base import InstrumentLogicBlock, InstrumentLogicExpression
+from surveylang.models import instrument_components as components
+
+
+def make_questionnaire(n_sections: int = 2, n_items: int = 3) -> components.Questionnaire:
+    questionnaire = components.Questionnaire()
+    for s in range(n_sections):
+        section = components.Section()
+        section.set_shortname(f'S{s}')
+        question = components.Question()
+        battery = components.Battery()
+        segment = components.Segment()
+        segment.set_qnid(f'Q{s}')
+        for i in range(n_items):
+            item = components.Item()
+            item.set_shortname(f'item{s}_{i}')
+            option = components.Option()
+            option.set_value(1)
+            item.add_child(option)
+            segment.add_child(item)
+        battery.add_child(segment)
+        question.add_child(battery)
+        section.add_child(question)
+        questionnaire.add_child(section)
+    return questionnaire
+
+
+def make_segment(shortname: str, entry: list[tuple[str, str]] | None = None,
+                 exit_logic: list[tuple[str, str]] | None = None, entry_target: str = '@HERE') -> components.Segment:
+    segment = components.Segment()
+    segment.set_shortname(shortname)
+    if entry is not None:
+        segment.set_entry_logic(InstrumentLogicBlock([InstrumentLogicExpression(e, t) for e, t in entry],
+                                                     entry_target))
+    if exit_logic is not None:
+        segment.set_exit_logic(InstrumentLogicBlock([InstrumentLogicExpression(e, t) for e, t in exit_logic]))
+    return segment
+
+
+def likert_item(shortname: str) -> components.ItemLikertN:
+    item = components.ItemLikertN()
+    item.set_shortname(shortname)
+    for value, text in enumerate(['Never', 'Rarely', 'Sometimes', 'Often', 'Always'], start=1):
+        option = components.Option()
+        option.set_value(value)
+        option.set_text(text)
+        item.add_child(option)
+    return item
+
+
+def random_logic(rnd: random.Random, depth: int = 3):
+    if depth == 0 or rnd.random() < 0.3:
+        if rnd.random() < 0.5:
+            op = rnd.choice([SLT, SLTE, SGT, SGTE, IN])
+            return op(rnd.randint(0, 12), SectionIndexable('S{}'.format(rnd.randint(1, 5))))
+        op = rnd.choice([LT, LTE, GT, GTE, EQ])
+        return op(rnd.randint(0, 12), ItemIndexable('I{}'.format(rnd.randint(1, 8))))
+    kind = rnd.choice([ANY, ALL, NOT])
+    if kind is NOT:
+        return NOT(random_logic(rnd, depth - 1))
+    return kind([random_logic(rnd, depth - 1) for _ in range(rnd.randint(0, 4))])
@@ -0,0 +1,62 @@
+import random
+import unittest
+import numpy as np
+from surveylang.logicelements.logicparser import CisaLogicParser, CisaLogicEvaluator
+from surveylang.logicelements.batchevaluator import CisaBatchEvaluator
+from helpers import random_logic
+
+
+class TestBatchEvaluator(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cisaparser = CisaLogicParser()
+        self.ref_index_dict = {'S{}'.format(i + 1): i for i in range(5)}
+        self.ref_index_dict.update({'I{}'.format(i + 1): i for i in range(8)})
+        self.section_offsets = [0, 3, 4, 6, 7, 8]
+        rng = np.random.default_rng(42)
+        self.values = rng.integers(0, 13, size=(200, 8))
+
+    def _scalar(self, r: int, logic) -> bool:
+        offsets = self.section_offsets
+        section_responses = [[int(v) for v in self.values[r, offsets[s]:offsets[s + 1]]] for s in range(5)]
+        return bool(CisaLogicEvaluator(self.ref_index_dict, section_responses).eval(logic))
+
+    def test_matches_scalar_eval(self):
+        batch = CisaBatchEvaluator(self.ref_index_dict, self.values, self.section_offsets)
+        rnd = random.Random(99)
+        for _ in range(100):
+            logic = random_logic(rnd)
+            expected = [self._scalar(r, logic) for r in range(len(batch))]
+            self.assertEqual(batch.eval(logic).tolist(), expected, msg=str(logic))
+
+    def test_parsed_expression(self):
+        batch = CisaBatchEvaluator(self.ref_index_dict, [[1, 2, 3, 9], [4, 5, 6, 1]], [0, 3, 4])
+        res = batch.eval(self.cisaparser.parse('IN(2, S1) OR GT(5, I4)'))
+        self.assertEqual(res.dtype, np.bool_)
+        self.assertEqual(res.tolist(), [True, False])
+
+    def test_from_section_responses_masks_missing_answers(self):
+        batch = CisaBatchEvaluator.from_section_responses({'S1': 0, 'S2': 1}, [[[1, 2, 3], [9]], [[0], []]])
+        self.assertEqual(batch.section_offsets.tolist(), [0, 3, 4])
+        self.assertEqual(batch.eval(self.cisaparser.parse('IN(0, S1)')).tolist(), [False, True])
+        self.assertEqual(batch.eval(self.cisaparser.parse('SLT(5, S2)')).tolist(), [False, False])
+        self.assertEqual(batch.eval(self.cisaparser.parse('NOT SGT(2, S1)')).tolist(), [False, True])
+
+    def test_ragged_sections_keep_item_refs_per_respondent(self):
+        ref_dict = {'S1': 0, 'S2': 1, 'I1': 0, 'I2': 1, 'I3': 2, 'I4': 3}
+        respondents = [[[1, 2], [7]], [[1], [7, 8]], [[], [3]]]
+        batch = CisaBatchEvaluator.from_section_responses(ref_dict, respondents)
+        for expr, expected in (('EQ(7, I2)', [False, True, False]), ('EQ(3, I1)', [False, False, True]),
+                               ('GT(1, I3)', [True, True, False]), ('IN(7, S2)', [True, True, False])):
+            logic = self.cisaparser.parse(expr)
+            self.assertEqual(batch.eval(logic).tolist(), expected, msg=expr)
+            for r in range(2):
+                self.assertEqual(CisaLogicEvaluator(ref_dict, respondents[r]).eval(logic), expected[r], msg=expr)
+        self.assertEqual(batch.eval(self.cisaparser.parse('LT(99, I4)')).tolist(), [False, False, False])
+
+    def test_bad_offsets(self):
+        with self.assertRaises(ValueError):
+            CisaBatchEvaluator({}, np.zeros((2, 3)), [0, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from surveylang.models import instrument_components as components
+from helpers import make_questionnaire
+
+
+class TestComponentIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.questionnaire = make_questionnaire()
+        self.index = self.questionnaire.get_component_index()
+
+    def test_lookup_and_path(self):
+        item = self.questionnaire.get_component('item1_2')
+        self.assertEqual(item.get_shortname(), 'item1_2')
+        self.assertEqual(self.index.get_path(item), (1, 0, 0, 0, 2))
+        option = item[0]
+        self.assertIs(self.questionnaire.get_component(option.get_uid()), option)
+        self.assertEqual(self.index.get_path(option), (1, 0, 0, 0, 2, 0))
+        self.assertEqual(self.index.find_path('Q0'), (0, 0, 0, 0))
+        self.assertEqual(len(self.index), 1 + 2 * (4 + 3 * 2))
+        with self.assertRaises(KeyError):
+            self.index.find('missing')
+
+    def test_kept_current(self):
+        segment = self.questionnaire.get_component('Q0')
+        item = components.Item()
+        item.set_shortname('new')
+        segment.insert_child_at(0, item)
+        self.assertEqual(self.index.find_path('new'), (0, 0, 0, 0, 0))
+        self.assertEqual(self.index.find_path('item0_0'), (0, 0, 0, 0, 1))
+        segment.move_child_to_end(item)
+        self.assertEqual(self.index.find_path('new'), (0, 0, 0, 0, 3))
+        segment.remove_child(item)
+        self.assertNotIn('new', self.index)
+        replacement = components.Item()
+        replacement.set_shortname('replacement')
+        segment[0] = replacement
+        self.assertNotIn('item0_0', self.index)
+        self.assertEqual(self.index.find_path('replacement'), (0, 0, 0, 0, 0))
+        del self.questionnaire[1]
+        self.assertNotIn('item1_0', self.index)
+        self.assertNotIn('Q1', self.index)
+        replacement.set_shortname('renamed')
+        self.assertNotIn('replacement', self.index)
+        self.assertIs(self.index.find('renamed'), replacement)
+
+    def test_duplicate_names(self):
+        segment = self.questionnaire.get_component('Q1')
+        duplicate = components.Item()
+        duplicate.set_shortname('item0_0')
+        segment.add_child(duplicate)
+        self.assertEqual(len(self.index.find_all('item0_0')), 2)
+        self.assertEqual(self.index.find_path('item0_0'), (0, 0, 0, 0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
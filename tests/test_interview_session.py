@@ -0,0 +1,179 @@
+import unittest
+import numpy as np
+from surveylang.models.instrument_component_base import InstrumentLogicBlock, InstrumentLogicExpression
+from surveylang.models.interview_session import InterviewSession
+from surveylang.models import instrument_components as components
+from surveylang.logicelements.logiccompiler import UnresolvedRefError
+from surveylang.logicelements.logicparser import UNANSWERED
+from helpers import make_segment
+
+
+class TestInterviewSession(unittest.TestCase):
+    def setUp(self) -> None:
+        self.questionnaire = components.Questionnaire()
+        self.battery = components.Battery()
+        # A asks S1 (multi select) and I2. B is skipped unless 2 was selected in S1.
+        # C jumps to E when I2 is 9. D is only asked when I2 > 3.
+        self.battery.add_child(make_segment('A'))
+        self.battery.add_child(make_segment('B', entry=[('NOT IN(2, S1)', '@NEXT')]))
+        self.battery.add_child(make_segment('C', exit_logic=[('EQ(9, I2)', 'E')]))
+        self.battery.add_child(make_segment('D', entry=[('GT(3, I2)', '@HERE')], entry_target='@NEXT'))
+        self.battery.add_child(make_segment('E'))
+        question = components.Question()
+        question.add_child(self.battery)
+        section = components.Section()
+        section.add_child(question)
+        self.questionnaire.add_child(section)
+        self.ref_dict = {'S1': 0, 'S2': 1, 'I1': 0, 'I2': 1, 'I3': 2}
+        self.session = InterviewSession(self.questionnaire, self.ref_dict)
+
+    def route(self) -> list[str]:
+        names = [self.session.start().get_shortname()]
+        while self.session.advance() is not None:
+            names.append(self.session.get_current_component().get_shortname())
+        return names
+
+    def test_routing_follows_answers(self):
+        self.assertEqual(self.route(), ['A', 'C', 'E'])
+        self.session.set_answer('S1', [2])
+        self.session.set_answer('S2', [5])
+        self.assertEqual(self.route(), ['A', 'B', 'C', 'D', 'E'])
+        self.session.set_answer('I2', 9)
+        self.assertEqual(self.route(), ['A', 'B', 'C', 'E'])
+
+    def test_only_dependent_conditions_are_reevaluated(self):
+        self.session.set_answer('S1', [1, 2])
+        self.assertEqual(self.session.last_event_evaluations, 3)  # Slots of I2 moved: all the conditions read it
+        self.session.set_answer('I1', 2)
+        self.assertEqual(self.session.last_event_evaluations, 1)  # Only B reads S1, and nobody reads I1
+        self.assertEqual(self.session.section_responses, [[2, 2], []])
+        self.session.set_answer('I2', 9)
+        self.assertEqual(self.session.last_event_evaluations, 3)
+        self.session.set_answer('I2', 9)
+        self.assertEqual(self.session.last_event_evaluations, 0)
+
+    def test_clear_answer(self):
+        self.session.set_answer('S1', [2, 7])
+        b = self.battery[1]
+        self.assertFalse(self.session.get_result(b.get_entry_logic().get_expressions()[0]))
+        self.session.clear_answer('I1')
+        self.assertEqual(self.session.section_responses[0], [7])
+        self.assertTrue(self.session.get_result(b.get_entry_logic().get_expressions()[0]))
+        self.session.clear_answer('S1')
+        self.assertEqual(self.session.item_responses, [])
+
+    def test_next_component(self):
+        self.assertEqual(self.session.get_next_component().get_shortname(), 'A')
+        self.session.start()
+        self.assertEqual(self.session.get_next_component().get_shortname(), 'C')
+        self.session.set_answer('S1', [2])
+        self.assertEqual(self.session.get_next_component().get_shortname(), 'B')
+
+    def test_follows_questionnaire_changes(self):
+        self.battery.add_child(make_segment('F', entry=[('SGT(0, S2)', '@NEXT')]))
+        self.assertEqual(self.route(), ['A', 'C', 'E', 'F'])
+        self.session.set_answer('S2', [1])
+        self.assertEqual(self.route(), ['A', 'C', 'E'])
+        self.battery.remove_child(self.battery[2])
+        self.assertEqual(self.session.get_condition_count(), 3)
+
+    def test_unknown_refs_up_front(self):
+        self.session.close()
+        self.battery.add_child(make_segment('F', entry=[('SGT(0, S9)', '@NEXT')]))
+        with self.assertRaises(UnresolvedRefError):
+            InterviewSession(self.questionnaire, self.ref_dict)
+
+    def test_unknown_refs_added_later_are_recorded(self):
+        segment = make_segment('F', entry=[('EQ(1, I7)', '@NEXT')])
+        self.battery.add_child(segment)
+        self.assertIs(segment.get_parent(), self.battery)
+        (expression, refs), = self.session.get_unresolved()
+        self.assertEqual((expression.get_expr(), refs), ('EQ(1, I7)', ['I7']))
+        self.assertFalse(self.session.get_result(expression))
+        self.assertEqual(self.route(), ['A', 'C', 'E', 'F'])
+        self.battery[0].set_exit_logic(InstrumentLogicBlock([InstrumentLogicExpression('IN(1, S5)', '@NEXT')]))
+        self.assertEqual(len(self.session.get_unresolved()), 2)
+        segment.set_entry_logic(InstrumentLogicBlock([InstrumentLogicExpression('EQ(1, I3)', '@NEXT')]))
+        self.session.set_answer('S2', [1, 1, 1])
+        self.assertEqual(self.route(), ['A', 'C', 'E'])
+        self.battery.remove_child(self.battery[0])
+        self.assertEqual(self.session.get_unresolved(), [])
+
+    def test_refs_and_values_are_checked(self):
+        with self.assertRaises(KeyError):
+            self.session.set_answer('@HERE', 1)
+        self.session.ref_dict['Q1'] = 0
+        with self.assertRaises(ValueError):
+            self.session.set_answer('Q1', 1)
+        with self.assertRaises(IndexError):
+            self.session.set_answer('I3', 1)  # Item refs index the answers given without section_offsets
+        self.session.set_answer('S1', np.int64(2))
+        self.assertEqual(self.session.section_responses[0], [2])
+
+    def test_items_answered_one_by_one_with_the_layout(self):
+        questionnaire = components.Questionnaire()
+        segments = [make_segment('A'), make_segment('B', entry=[('EQ(2, I2)', '@HERE')], entry_target='@NEXT'),
+                    make_segment('C', entry=[('NOT SGT(4, S2)', '@NEXT')])]
+        for segment, n_items in zip(segments, (3, 2, 0)):
+            for _ in range(n_items):
+                segment.add_child(components.Item())
+            section = components.Section()
+            section.add_child(segment)
+            questionnaire.add_child(section)
+        session = InterviewSession(questionnaire)
+        self.assertEqual(session.section_offsets, [0, 3, 5, 5])
+        session.set_answer('I5', 7)
+        self.assertEqual(session.section_responses, [[], [7], []])
+        self.assertEqual(session.item_responses[:2], [UNANSWERED, UNANSWERED])
+        session.set_answer('I2', 2)
+        self.assertEqual(session.last_event_evaluations, 1)
+        self.assertEqual(session.section_responses, [[2], [7], []])
+        names = [session.start().get_shortname()]
+        while session.advance() is not None:
+            names.append(session.get_current_component().get_shortname())
+        self.assertEqual(names, ['A', 'B', 'C'])
+        session.clear_answer('I2')
+        self.assertEqual(session.section_responses[0], [])
+        self.assertFalse(session.get_result(segments[1].get_entry_logic().get_expressions()[0]))
+        session.set_answer('S2', [1])
+        self.assertEqual(session.item_responses[3:], [1, UNANSWERED])
+        with self.assertRaises(ValueError):
+            session.set_answer('S1', [1, 2, 3, 4])
+
+    def test_layout_followed_when_items_are_inserted(self):
+        questionnaire = components.Questionnaire()
+        segments = [make_segment('A'), make_segment('B', entry=[('EQ(5, I4)', '@HERE')], entry_target='@NEXT')]
+        for segment in segments:
+            for _ in range(3):
+                segment.add_child(components.Item())
+            section = components.Section()
+            section.add_child(segment)
+            questionnaire.add_child(section)
+        session = InterviewSession(questionnaire)
+        session.set_answer('I1', 1)
+        session.set_answer('I4', 5)
+        expression = segments[1].get_entry_logic().get_expressions()[0]
+        self.assertTrue(session.get_result(expression))
+        inserted = components.Item()
+        segments[0].insert_child_at(0, inserted)
+        self.assertEqual(session.section_offsets, [0, 4, 7])
+        self.assertEqual(session.item_responses, [UNANSWERED, 1, UNANSWERED, UNANSWERED, 5, UNANSWERED, UNANSWERED])
+        self.assertFalse(session.get_result(expression))  # I4 is now the last item of the first section
+        session.set_answer('I4', 5)
+        self.assertEqual(session.section_responses, [[1, 5], [5]])
+        self.assertTrue(session.get_result(expression))
+        segments[0].remove_child(inserted)
+        self.assertEqual(session.section_offsets, [0, 3, 6])
+        self.assertEqual(session.section_responses, [[1, 5], [5]])
+        self.assertEqual(session.item_responses[:4], [1, UNANSWERED, 5, 5])
+
+    def test_routing_loop(self):
+        self.battery[0].set_exit_logic(InstrumentLogicBlock([], 'A'))
+        self.battery[0].set_entry_logic(InstrumentLogicBlock([], 'C'))
+        self.battery[2].set_entry_logic(InstrumentLogicBlock([], 'A'))
+        with self.assertRaises(RuntimeError):
+            self.session.start()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+from surveylang.models.instrument_component_base import InstrumentLogicBlock, InstrumentLogicExpression
+from surveylang.models.instrument_logic import ENTRY_LOGIC, EXIT_LOGIC
+from surveylang.models.logic_dependency_index import LogicDependencyIndex
+from surveylang.models import instrument_components as components
+from helpers import make_segment
+
+
+class TestLogicDependencyIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.questionnaire = components.Questionnaire()
+        self.battery = components.Battery()
+        self.battery.add_child(make_segment('A', exit_logic=[('EQ(1, I1)', 'C')]))
+        self.battery.add_child(make_segment('B', entry=[('IN(2, S1) AND GT(3, I2)', '@NEXT')]))
+        self.battery.add_child(make_segment('C', entry=[('LT(5, I4)', '@NEXT')]))
+        self.battery.add_child(make_segment('D', entry=[('IN(1, S2)', '@NEXT')]))
+        question = components.Question()
+        question.add_child(self.battery)
+        section = components.Section()
+        section.add_child(question)
+        self.questionnaire.add_child(section)
+        self.index = LogicDependencyIndex(self.questionnaire)
+
+    def test_direct_dependencies(self):
+        self.assertEqual(sorted(self.index.get_refs()), ['I1', 'I2', 'I4', 'S1', 'S2'])
+        (owner, kind, expression), = self.index.get_expressions('S1')
+        self.assertEqual((owner.get_shortname(), kind, expression.get_expr()), ('B', ENTRY_LOGIC, 'IN(2, S1) AND GT(3, I2)'))
+        self.assertEqual(self.index.get_expressions('I9'), [])
+
+    def test_transitive_closure(self):
+        direct = self.index.get_affected_components('I1', transitive=False)
+        self.assertEqual([x.get_shortname() for x in direct], ['A'])
+        # A jumps to C, or falls through to B; C skips to D
+        affected = self.index.get_affected_components('I1')
+        self.assertEqual(sorted(x.get_shortname() for x in affected), ['A', 'B', 'C', 'D'])
+        affected = self.index.get_affected_components('I4')
+        self.assertEqual(sorted(x.get_shortname() for x in affected), ['C', 'D'])
+
+    def test_next_leaves_the_last_child(self):
+        # D is the last child: '@NEXT' evaluates the exit block of the battery, not its entry block
+        self.battery.set_entry_logic(InstrumentLogicBlock([InstrumentLogicExpression('EQ(1, I8)', '@HERE')]))
+        question = self.battery.get_parent()
+        question.set_exit_logic(InstrumentLogicBlock([InstrumentLogicExpression('EQ(1, I7)', '@NEXT')]))
+        affected = self.index.get_affected('S2')
+        self.assertEqual(sorted((owner.get_shortname() or owner.get_type().name, kind) for owner, kind, _ in affected),
+                         [('D', ENTRY_LOGIC), ('QUESTION', EXIT_LOGIC)])  # The battery has no exit block
+        self.battery.set_exit_logic(InstrumentLogicBlock([InstrumentLogicExpression('EQ(1, I9)', 'A')]))
+        affected = self.index.get_affected('S2')  # Then A to D, and the question exit block once more
+        self.assertEqual(sorted(expression.get_expr() for _, _, expression in affected),
+                         ['EQ(1, I1)', 'EQ(1, I7)', 'EQ(1, I9)', 'IN(1, S2)', 'IN(2, S1) AND GT(3, I2)', 'LT(5, I4)'])
+
+    def test_incremental_updates(self):
+        segment = make_segment('E', exit_logic=[('SGT(3, S7)', '@NEXT')])
+        self.battery.add_child(segment)
+        self.assertEqual(self.index.get_components('S7'), [segment])
+        segment.get_exit_logic().add_expression(InstrumentLogicExpression('EQ(2, I8)', '@NEXT'))
+        self.assertEqual(len(self.index.get_expressions('I8')), 1)
+        segment.set_exit_logic(InstrumentLogicBlock([InstrumentLogicExpression('EQ(2, I9)', '@NEXT')]))
+        self.assertNotIn('S7', self.index)
+        self.assertNotIn('I8', self.index)
+        self.assertIn('I9', self.index)
+        self.battery.remove_child(segment)
+        self.assertNotIn('I9', self.index)
+        del self.battery[0]
+        self.assertNotIn('I1', self.index)
+        self.battery[0] = make_segment('F', exit_logic=[('EQ(1, I3)', '@NEXT')])
+        self.assertNotIn('S1', self.index)
+        self.assertIn('I3', self.index)
+        self.index.close()
+        self.battery.clear_children()
+        self.assertIn('I3', self.index)
+
+    def test_expressions_change_only_through_the_block(self):
+        expressions = [InstrumentLogicExpression('EQ(1, I5)', '@NEXT')]
+        block = InstrumentLogicBlock(expressions)
+        self.battery[0].set_exit_logic(block)
+        expressions.append(InstrumentLogicExpression('EQ(1, I6)', '@NEXT'))
+        with self.assertRaises(AttributeError):
+            block.get_expressions().append(InstrumentLogicExpression('EQ(1, I7)', '@NEXT'))
+        self.assertEqual(sorted(self.index.get_refs()), ['I2', 'I4', 'I5', 'S1', 'S2'])
+        block.add_expression(expressions[1])
+        self.assertIn('I6', self.index)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import random
+import unittest
+from surveylang.logicelements.logicparser import CisaLogicParser, CisaLogicEvaluator
+from surveylang.logicelements.logicparser import GT, SLT, SLTE, SGT, SGTE, IN
+from surveylang.logicelements.logicparser import ANY, ALL, NOT
+from surveylang.logicelements.logiccompiler import CisaLogicCompiler, CisaLogicBinder, UnresolvedRefError
+from helpers import random_logic
+
+
+class TestLogicCompiler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cisaparser = CisaLogicParser()
+        self.section_responses = [[1, 2, 3], [9], [10, 11], [8], [99]]
+        self.ref_index_dict = {'S{}'.format(i + 1): i for i in range(5)}
+        self.ref_index_dict.update({'I{}'.format(i + 1): i for i in range(8)})
+        self.compiler = CisaLogicCompiler(self.ref_index_dict)
+        self.evaluator = CisaLogicEvaluator(ref_dict=self.ref_index_dict, section_responses=self.section_responses)
+
+    def test_compiled_expression(self):
+        compiled = self.compiler.compile(self.cisaparser.parse('IN(10,S3) AND NOT(EQ(5,I1)) OR GT(8, I4)'))
+        self.assertTrue(compiled.eval(self.evaluator))
+        self.assertEqual(compiled.get_item_slots(), [0, 3])
+        self.assertEqual(compiled.get_section_slots(), [2])
+
+    def test_empty_operators(self):
+        self.assertFalse(self.compiler.compile(ANY([]))(self.section_responses, self.evaluator.item_responses))
+        self.assertTrue(self.compiler.compile(ALL([]))(self.section_responses, self.evaluator.item_responses))
+
+    def test_empty_section(self):
+        section_responses = [[], [1]]
+        compiled = [self.compiler.compile(op(0, 0)) for op in (SLT, SLTE, SGT, SGTE, IN)]
+        evaluator = CisaLogicEvaluator(ref_dict={}, section_responses=section_responses)
+        for op in compiled:
+            self.assertEqual(op.eval(evaluator), evaluator.eval(op.get_cisa_logic()))
+
+    def test_matches_evaluator(self):
+        rnd = random.Random(1234)
+        for _ in range(500):
+            logic = random_logic(rnd)
+            compiled = self.compiler.compile(logic)
+            self.assertEqual(compiled.eval(self.evaluator), bool(self.evaluator.eval(logic)), msg=str(logic))
+
+    def test_long_chains(self):
+        for joiner in (' AND ', ' OR '):
+            logic = self.cisaparser.parse(joiner.join('GT({}, I{})'.format(i % 7, i % 8 + 1) for i in range(300)))
+            compiled = self.compiler.compile(logic)
+            self.assertEqual(compiled.eval(self.evaluator), bool(self.evaluator.eval(logic)))
+            bound = CisaLogicBinder(self.ref_index_dict).bind(logic)
+            self.assertEqual(bound.eval(self.evaluator), compiled.eval(self.evaluator))
+
+
+class TestLogicBinder(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cisaparser = CisaLogicParser()
+        self.ref_index_dict = {'S1': 0, 'S2': 1, 'I1': 0, 'I2': 1, 'I3': 2, 'I4': 3}
+
+    def test_refs_become_slots(self):
+        bound = CisaLogicBinder(self.ref_index_dict).bind(self.cisaparser.parse('IN(2, S2) AND NOT GT(3, I4)'))
+        self.assertEqual(bound.get_bound_logic(), ALL([IN(2, 1), NOT(GT(3, 3))]))
+        self.assertTrue(bound.get_bound_logic().is_frozen())
+        self.assertEqual(bound.get_section_slots(), [1])
+        self.assertEqual(bound.get_item_slots(), [3])
+
+    def test_reused_across_respondents(self):
+        bound = CisaLogicBinder(self.ref_index_dict).bind(self.cisaparser.parse('IN(2, S2) OR EQ(1, I1)'))
+        respondents = [[[1, 0], [2, 5]], [[0, 0], [3, 5]], [[1, 1], [0, 0]]]
+        for section_responses in respondents:
+            evaluator = CisaLogicEvaluator(self.ref_index_dict, section_responses)
+            self.assertEqual(bound.eval(evaluator), evaluator.eval(bound.get_cisa_logic()))
+            self.assertEqual(evaluator.eval(bound.get_bound_logic()), evaluator.eval(bound.get_cisa_logic()))
+
+    def test_unknown_refs_are_reported_up_front(self):
+        binder = CisaLogicBinder(self.ref_index_dict)
+        logics = [self.cisaparser.parse('IN(2, S7) AND GT(3, I4)'), self.cisaparser.parse('EQ(1, I9) OR IN(1, S7)')]
+        self.assertEqual(binder.find_unresolved(logics[1]), ['I9', 'S7'])
+        with self.assertRaises(UnresolvedRefError) as ctx:
+            binder.bind_all(logics)
+        self.assertEqual(ctx.exception.refs, ['S7', 'I9'])
+        self.assertIsInstance(ctx.exception, KeyError)
+
+    def test_slots_outside_layout(self):
+        binder = CisaLogicBinder(self.ref_index_dict, n_sections=1, n_items=4)
+        self.assertEqual(binder.find_unresolved(self.cisaparser.parse('IN(2, S2) AND GT(3, I4)')), ['S2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+from surveylang.logicelements.logicparser import CisaLogicParser, CisaLogicEvaluator, CisaLogic, CisaIndexable
+from surveylang.logicelements.logicparser import ItemIndexable, SectionIndexable, IN, EQ, NOT, ANY
+from surveylang.logicelements.logicdag import CisaLogicInterner, CisaLogicDAG
+from surveylang.models.instrument_component_base import InstrumentLogicBlock, InstrumentLogicExpression
+from surveylang.models.instrument_logic import QuestionnaireLogicDAG, iter_logic_expressions, ENTRY_LOGIC, EXIT_LOGIC
+from surveylang.models import instrument_components as components
+
+
+class TestLogicDAG(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cisaparser = CisaLogicParser()
+        self.ref_index_dict = {'S1': 0, 'S2': 1, 'S3': 2, 'I1': 0, 'I2': 1, 'I3': 2, 'I4': 3}
+        self.section_responses = [[1, 2], [9], [1]]
+
+    def test_nodes_are_hashable(self):
+        first = self.cisaparser.parse('ANY(IN(1, S3), NOT EQ(2, I1))')
+        second = ANY([IN(1, SectionIndexable('S3')), NOT(EQ(2, ItemIndexable('I1')))])
+        self.assertEqual(hash(first), hash(second))
+        self.assertEqual(len({first, second, self.cisaparser.parse('IN(1, S3)')}), 2)
+        self.assertNotEqual(hash(ItemIndexable('I1')), hash(SectionIndexable('I1')))
+
+    def test_other_nodes_hash_by_identity(self):
+        node, ref = CisaLogic(), CisaIndexable('S1')
+        self.assertEqual(len({node, CisaLogic(), ref}), 3)
+        interner = CisaLogicInterner()
+        canonical = interner.intern(node)
+        self.assertIs(interner.intern(node), canonical)
+        self.assertTrue(canonical.is_frozen())
+        self.assertFalse(node.is_frozen())  # The caller's node stays modifiable
+        node.note = 'still mutable'
+
+    def test_interner_shares_subtrees(self):
+        interner = CisaLogicInterner()
+        first = interner.intern(self.cisaparser.parse('IN(1, S3) AND EQ(2, I1)'))
+        second = interner.intern(self.cisaparser.parse('NOT IN(1, S3)'))
+        self.assertIs(first.v[0], second.x)
+        self.assertIs(first.v[0].t, interner.intern(self.cisaparser.parse('SGT(1, S3)')).t)
+        self.assertIs(interner.intern(self.cisaparser.parse('IN(1, S3) AND EQ(2, I1)')), first)
+        self.assertTrue(first.is_frozen())
+
+    def test_dag_evaluates_shared_nodes_once(self):
+        dag = CisaLogicDAG()
+        logics = [self.cisaparser.parse(x) for x in ('IN(1, S3) AND EQ(1, I1)', 'IN(1, S3) OR GT(5, I4)',
+                                                       'NOT IN(1, S3)', 'IN(1,S3)')]
+        for logic in logics:
+            dag.add(logic)
+        self.assertEqual(len(dag), 6)
+        evaluator = CisaLogicEvaluator(self.ref_index_dict, self.section_responses)
+        evaluation = dag.evaluate(evaluator)
+        self.assertEqual([evaluation.eval(x) for x in logics], [bool(evaluator.eval(x)) for x in logics])
+        self.assertEqual(evaluation.evaluations, 5)  # GT(5, I4) is never needed
+
+
+class TestQuestionnaireLogicDAG(unittest.TestCase):
+    def setUp(self) -> None:
+        self.questionnaire = components.Questionnaire()
+        for s in range(3):
+            section = components.Section()
+            section.set_entry_logic(InstrumentLogicBlock([InstrumentLogicExpression('IN(1, S1)', '@HERE')]))
+            segment = components.Segment()
+            segment.set_exit_logic(InstrumentLogicBlock([
+                InstrumentLogicExpression('IN(1, S1) AND EQ({}, I1)'.format(s), '@NEXT')]))
+            question = components.Question()
+            battery = components.Battery()
+            battery.add_child(segment)
+            question.add_child(battery)
+            section.add_child(question)
+            self.questionnaire.add_child(section)
+
+    def test_collects_every_block(self):
+        found = list(iter_logic_expressions(self.questionnaire))
+        self.assertEqual(len(found), 6)
+        self.assertEqual([kind for _, kind, _ in found[:2]], [ENTRY_LOGIC, EXIT_LOGIC])
+
+    def test_shared_evaluation(self):
+        dag = QuestionnaireLogicDAG(self.questionnaire)
+        self.assertEqual(len(dag), 1 + 3 * 2)
+        evaluation = dag.evaluate(CisaLogicEvaluator({'S1': 0, 'I1': 0}, [[1]]))
+        results = evaluation.eval_all()
+        self.assertEqual(sorted(results.values()), [False, False, True, True, True, True])
+        self.assertEqual(evaluation.evaluations, 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import random
+import unittest
+from surveylang.logicelements.logicparser import CisaLogicParser, CisaLogicEvaluator
+from surveylang.logicelements.logicparser import ItemIndexable, SectionIndexable
+from surveylang.logicelements.logicparser import EQ, GT, GTE, LTE, SLT, IN, ANY, ALL, NOT
+from surveylang.logicelements.logicoptimizer import CisaLogicOptimizer, logic_size
+from helpers import random_logic
+
+
+class TestLogicOptimizer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cisaparser = CisaLogicParser()
+        self.optimizer = CisaLogicOptimizer()
+        self.ref_index_dict = {'S{}'.format(i + 1): i for i in range(5)}
+        self.ref_index_dict.update({'I{}'.format(i + 1): i for i in range(8)})
+
+    def optimize(self, expr: str):
+        return self.optimizer.optimize(self.cisaparser.parse(expr))
+
+    def test_flatten(self):
+        res, report = self.optimize('IN(1, S1) AND IN(2, S2) AND IN(3, S3)')
+        self.assertEqual(res, ALL([IN(1, SectionIndexable('S1')), IN(2, SectionIndexable('S2')),
+                                   IN(3, SectionIndexable('S3'))]))
+        self.assertEqual(report.get_counts()['flatten'], 1)
+
+    def test_double_negation_and_push_not(self):
+        res, _ = self.optimize('NOT NOT IN(1, S1)')
+        self.assertEqual(res, IN(1, SectionIndexable('S1')))
+        res, report = self.optimize('NOT ANY(GT(3, I1), IN(1, S2))')
+        self.assertEqual(res, ALL([LTE(3, ItemIndexable('I1')), NOT(IN(1, SectionIndexable('S2')))]))
+        self.assertIn('push_not', report.get_counts())
+
+    def test_dedupe(self):
+        res, report = self.optimize('ANY(IN(1, S1), EQ(2, I2), IN(1,S1))')
+        self.assertEqual(res, ANY([IN(1, SectionIndexable('S1')), EQ(2, ItemIndexable('I2'))]))
+        self.assertEqual(report.get_counts()['dedupe'], 1)
+
+    def test_fold_ranges(self):
+        res, _ = self.optimize('GT(3, I1) AND GT(5, I1)')
+        self.assertEqual(res, GT(5, ItemIndexable('I1')))
+        res, _ = self.optimize('GTE(4, I1) AND LTE(4, I1)')
+        self.assertEqual(res, EQ(4, ItemIndexable('I1')))
+        res, _ = self.optimize('ALL(GT(3, I1), LTE(9, I1), EQ(5, I1), IN(1, S1))')
+        self.assertEqual(res, ALL([EQ(5, ItemIndexable('I1')), IN(1, SectionIndexable('S1'))]))
+        res, _ = self.optimize('ANY(SLT(3, S1), SLT(5, S1), EQ(7, I2), GT(6, I2))')
+        self.assertEqual(res, ANY([SLT(5, SectionIndexable('S1')), GT(6, ItemIndexable('I2'))]))
+
+    def test_constant_conditions(self):
+        res, report = self.optimize('EQ(1, I1) AND EQ(2, I1)')
+        self.assertEqual(res, ANY([]))
+        self.assertFalse(report.constant)
+        res, report = self.optimize('IN(3, S2) OR NOT IN(3, S2)')
+        self.assertEqual(res, ALL([]))
+        self.assertTrue(report.constant)
+        res, report = self.optimize('GT(3, I1) OR LTE(5, I1)')
+        self.assertTrue(report.constant)
+        res, report = self.optimize('IN(1, S1) AND (GT(5, I1) AND LT(4, I1))')
+        self.assertFalse(report.constant)
+        self.assertIsNone(self.optimize('IN(1, S1)')[1].constant)
+
+    def test_equivalent_and_not_bigger(self):
+        rnd = random.Random(2024)
+        respondents = [[[rnd.randint(0, 12) for _ in range(n)] for n in (3, 1, 2, 1, 1)] for _ in range(40)]
+        for _ in range(300):
+            logic = random_logic(rnd, depth=4)
+            optimized, report = self.optimizer.optimize(logic)
+            self.assertLessEqual(logic_size(optimized), logic_size(logic), msg=str(logic))
+            self.assertEqual(report.size_after, logic_size(optimized))
+            for section_responses in respondents:
+                evaluator = CisaLogicEvaluator(self.ref_index_dict, section_responses)
+                self.assertEqual(bool(evaluator.eval(optimized)), bool(evaluator.eval(logic)),
+                                 msg='{} -> {}'.format(logic, optimized))
+
+    def test_keep_negated_comparisons(self):
+        res, _ = CisaLogicOptimizer(complement_comparisons=False).optimize(self.cisaparser.parse('NOT GT(3, I1)'))
+        self.assertEqual(res, NOT(GT(3, ItemIndexable('I1'))))
+
+
+if __name__ == '__main__':
+    unittest.main()
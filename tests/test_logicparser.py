@@ -1,11 +1,18 @@
+import array
+import os
+import random
+import subprocess
+import sys
 import unittest
-from surveylang.logicelements.logicparser import CisaLogicParser
+from surveylang.logicelements.logicparser import CisaLogicParser, CisaLogicSyntaxError, DESCENT_BACKEND
 from surveylang.logicelements.logicparser import ItemIndexable, SectionIndexable
 from surveylang.logicelements.logicparser import LT, LTE, GT, GTE, EQ
 from surveylang.logicelements.logicparser import SLT, SLTE, SGT, SGTE, IN
 from surveylang.logicelements.logicparser import ANY, ALL, \
     NOT  # OR y AND son simplemente ANY(x1,x2) y ALL(x1,x2) respectivamente.
-from surveylang.logicelements.logicparser import CisaLogicEvaluator
+from surveylang.logicelements.logicparser import CisaLogicEvaluator, FlatCisaLogicEvaluator, SectionSummary
+from surveylang.logicelements.logicparser import CisaLogicParseCache, parse_cached
+from surveylang.models.instrument_component_base import InstrumentLogicExpression
 
 
 class MyTestCase(unittest.TestCase):
@@ -137,5 +144,230 @@ class MyTestCase(unittest.TestCase):
         self.assertTrue(res)
 
 
+class TestGrammarLoading(unittest.TestCase):
+    def test_sly_is_imported_on_first_parse(self):
+        code = ('import sys, surveylang.models.instrument_component_base as m; print("sly" in sys.modules); '
+                'm.InstrumentLogicExpression("EQ(1, I1)", "@NEXT"); print("sly" in sys.modules)')
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, check=True)
+        self.assertEqual(out.stdout.split(), ['False', 'True'])
+
+    def test_shipped_tables(self):
+        from sly.yacc import LRTable
+        from surveylang.logicelements.logicgrammar import LogicParser, CachedLRTable, TABLES_FILE
+        CisaLogicParser().parse('EQ(1, I1)')
+        self.assertEqual(LogicParser.tables_source, TABLES_FILE)  # Regenerate them if the grammar changed
+        built = LRTable(LogicParser._grammar)
+        self.assertEqual(LogicParser._lrtable.lr_action, built.lr_action)
+        self.assertEqual(LogicParser._lrtable.lr_goto, built.lr_goto)
+        self.assertEqual(LogicParser._lrtable.defaulted_states, built.defaulted_states)
+        self.assertIsNone(CachedLRTable.load(TABLES_FILE, 'another grammar'))
+
+
+def random_expression(rnd: random.Random, depth: int = 3) -> str:
+    """
+    Random expression mixing every operator, bare and parenthesized NOTs, AND/OR chains, ';' and spacing
+    """
+    space = lambda: rnd.choice(['', '', ' ', '  ', '\t', '\n'])
+    if depth == 0 or rnd.random() < 0.3:
+        name = rnd.choice(['LT', 'LTE', 'GT', 'GTE', 'EQ', 'SLT', 'SLTE', 'SGT', 'SGTE', 'IN'])
+        ref = rnd.choice('sS' if name in ('SLT', 'SLTE', 'SGT', 'SGTE', 'IN') else 'iI') + str(rnd.randint(0, 120))
+        expr = '{}{}({}{},{}{}{})'.format(name, space(), space(), rnd.randint(0, 99), space(), ref, space())
+    else:
+        kind = rnd.randrange(4)
+        if kind == 0:
+            args = [random_expression(rnd, depth - 1) for _ in range(rnd.randint(1, 3))]
+            expr = '{}({})'.format(rnd.choice(['ALL', 'ANY']), ','.join(space() + x for x in args))
+        elif kind == 1:
+            expr = 'NOT({})'.format(random_expression(rnd, depth - 1))
+        elif kind == 2:
+            expr = 'NOT {}'.format(random_expression(rnd, depth - 1))
+        else:
+            expr = '{} {} {}'.format(random_expression(rnd, depth - 1), rnd.choice(['AND', 'OR']),
+                                     random_expression(rnd, depth - 1))
+    return expr + (';' if rnd.random() < 0.1 else '') + space()
+
+
+class TestDescentBackend(unittest.TestCase):
+    def setUp(self) -> None:
+        self.sly = CisaLogicParser()
+        self.descent = CisaLogicParser(backend=DESCENT_BACKEND)
+
+    def test_same_trees_as_sly(self):
+        rnd = random.Random(3)
+        for _ in range(500):
+            expr = random_expression(rnd)
+            self.assertEqual(self.descent.parse(expr), self.sly.parse(expr), msg=expr)
+
+    def test_sly_conflict_resolution(self):
+        a, b, c = EQ(1, ItemIndexable('I1')), IN(2, SectionIndexable('S2')), GT(3, ItemIndexable('i3'))
+        expected = {
+            'EQ(1,I1) AND IN(2,S2) OR GT(3,i3)': ALL([a, ANY([b, c])]),
+            'EQ(1,I1) OR IN(2,S2) AND GT(3,i3)': ANY([a, ALL([b, c])]),
+            'NOT EQ(1,I1) AND IN(2,S2)': NOT(ALL([a, b])),
+            'NOT(EQ(1,I1)) AND IN(2,S2)': ALL([NOT(a), b]),
+            'EQ(1,I1) AND NOT IN(2,S2) OR GT(3,i3)': ALL([a, NOT(ANY([b, c]))]),
+            'EQ(1,I1);; OR IN(2,S2);': ANY([a, b]),
+            'ALL(EQ(1,I1) AND IN(2,S2), GT(3,i3))': ALL([ALL([a, b]), c]),
+        }
+        for expr, logic in expected.items():
+            self.assertEqual(self.sly.parse(expr), logic, msg=expr)
+            self.assertEqual(self.descent.parse(expr), logic, msg=expr)
+
+    def test_long_chains(self):
+        expr = ' OR '.join(['EQ(1, I1) AND NOT IN(2, S2)'] * 100)
+        self.assertEqual(self.descent.parse(expr), self.sly.parse(expr))
+        logic = self.descent.parse(' AND '.join(['EQ(1, I1)'] * 5000))  # Deeper than the recursion limit
+        for _ in range(4999):
+            logic = logic.v[1]
+        self.assertEqual(logic, EQ(1, ItemIndexable('I1')))
+
+    def test_error_positions(self):
+        errors = {
+            'EQ(1,I1) EQ(2,I2)': 9,
+            'EQ(1,': 5,
+            'ALL()': 4,
+            'EQ(1, S1)': 6,
+            'IN(1, S2) AND': 13,
+            'ANY(IN(1,S2) IN(2,S2))': 13,
+            'EQ(1,I1) # ': 9,
+            'NOT': 3,
+        }
+        for expr, position in errors.items():
+            with self.assertRaises(CisaLogicSyntaxError, msg=expr) as raised:
+                self.descent.parse(expr)
+            self.assertEqual(raised.exception.position, position, msg=expr)
+            self.assertIn('position {}'.format(position), str(raised.exception))
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            CisaLogicParser(backend='yacc')
+
+
+class TestFlatEvaluator(unittest.TestCase):
+    def setUp(self) -> None:
+        self.offsets = [0, 3, 4, 4, 8, 12]  # S3 is empty
+        self.ref_dict = {}
+        for k in range(121):  # Every ref random_expression can produce
+            self.ref_dict.update({'S{}'.format(k): k % 5, 's{}'.format(k): k % 5})
+            self.ref_dict.update({'I{}'.format(k): k % 12, 'i{}'.format(k): k % 12})
+        rnd = random.Random(5)
+        parser = CisaLogicParser(backend=DESCENT_BACKEND)
+        self.logics = [parser.parse(random_expression(rnd)) for _ in range(200)]
+        self.respondents = [[rnd.randint(0, 99) for _ in range(12)] for _ in range(20)]
+
+    def test_same_results(self):
+        import numpy as np
+        flat = FlatCisaLogicEvaluator(self.ref_dict, self.offsets)
+        for items in self.respondents:
+            sections = [items[a:b] for a, b in zip(self.offsets, self.offsets[1:])]
+            expected = [CisaLogicEvaluator(self.ref_dict, sections).eval(x) for x in self.logics]
+            for buffer in (items, array.array('q', items), np.array(items, dtype=np.int32),
+                           np.array(items, dtype='>i4'), np.array(items, dtype=object)):
+                self.assertIs(flat.bind(buffer), flat)
+                self.assertEqual([flat.eval(x) for x in self.logics], expected)
+
+    def test_views(self):
+        import numpy as np
+        values = np.arange(24, dtype=np.int64).reshape(2, 12)
+        flat = FlatCisaLogicEvaluator(self.ref_dict, self.offsets, values[1])
+        self.assertIsInstance(flat.section_responses[3], memoryview)
+        self.assertEqual(list(flat.section_responses[3]), [16, 17, 18, 19])
+        values[1, 6] = 99  # The evaluator reads the buffer itself
+        self.assertTrue(flat.eval(IN(99, SectionIndexable('S3'))))
+        self.assertEqual(len(flat.section_responses), 5)
+        flat.bind(values[0], [0, 6, 12, 12, 12, 12])
+        self.assertEqual(list(flat.section_responses[1]), list(range(6, 12)))
+        with self.assertRaises(ValueError):
+            flat.bind(values[0, :10])
+        with self.assertRaises(ValueError):
+            flat.bind(values)
+
+    def test_compiled_logic(self):
+        from surveylang.logicelements.logiccompiler import CisaLogicCompiler
+        compiler = CisaLogicCompiler(self.ref_dict)
+        flat = FlatCisaLogicEvaluator(self.ref_dict, self.offsets, array.array('q', self.respondents[0]))
+        for logic in self.logics:
+            self.assertEqual(compiler.compile(logic).eval(flat), bool(flat.eval(logic)))
+
+
+class TestSectionSummary(unittest.TestCase):
+    def test_same_results_as_scans(self):
+        rnd = random.Random(9)
+        section_responses = [[rnd.randint(0, 12) for _ in range(rnd.choice([0, 1, 3, 40]))] for _ in range(30)]
+        section_responses.append([2.5, 7, 7])
+        ref_dict = {'S{}'.format(s + 1): s for s in range(len(section_responses))}
+        scan = CisaLogicEvaluator(ref_dict, section_responses)
+        summarized = CisaLogicEvaluator(ref_dict, section_responses, summarize=True)
+        self.assertEqual(len(summarized.summary), len(section_responses))
+        for ref in ref_dict:
+            for x in range(-1, 15):
+                for cls in (IN, SLT, SLTE, SGT, SGTE):
+                    logic = cls(x, SectionIndexable(ref))
+                    self.assertEqual(summarized.eval(logic), scan.eval(logic), msg=str(logic))
+                    self.assertIsNotNone(summarized.summary.eval(logic, ref_dict[ref]))
+        logic = NOT(ANY([IN(3, SectionIndexable('S2')), SGT(10, SectionIndexable('S5'))]))
+        self.assertEqual(summarized.eval(logic), scan.eval(logic))
+
+    def test_unordered_sections_are_scanned(self):
+        summary = SectionSummary([[1, None], [[1], 2]])
+        self.assertIsNone(summary.eval(SLT(3, 0), 0))
+        self.assertTrue(summary.eval(IN(1, 0), 0))
+        self.assertIsNone(summary.eval(IN(2, 1), 1))
+        evaluator = CisaLogicEvaluator({}, [[1, None], [[1], 2]], summarize=True)
+        self.assertTrue(evaluator.eval(IN(2, 1)))
+        with self.assertRaises(TypeError):  # Same as the scan
+            evaluator.eval(SLT(3, 0))
+
+    def test_flat_evaluator(self):
+        flat = FlatCisaLogicEvaluator({'S1': 0, 'S2': 1}, [0, 3, 5], array.array('q', [4, 1, 9, 2, 2]), summarize=True)
+        self.assertEqual(flat.summary.get_bounds(0), (3, 1, 9))
+        self.assertTrue(flat.eval(SGTE(9, SectionIndexable('S1'))))
+        flat.bind(array.array('q', [4, 1, 8, 2, 3]))
+        self.assertEqual(flat.summary.get_bounds(1), (2, 2, 3))
+        self.assertFalse(flat.eval(SGTE(9, SectionIndexable('S1'))))
+        self.assertTrue(flat.eval(IN(3, SectionIndexable('S2'))))
+
+
+class TestParseCache(unittest.TestCase):
+    def test_hits_and_misses(self):
+        cache = CisaLogicParseCache(maxsize=8)
+        first = cache.parse('IN(1, S3)')
+        second = cache.parse('  IN(1,\tS3) ')
+        self.assertIs(first, second)
+        self.assertEqual(cache.get_stats()['hits'], 1)
+        self.assertEqual(cache.get_stats()['misses'], 1)
+        self.assertEqual(first, IN(1, SectionIndexable('S3')))
+
+    def test_normalization_keeps_tokens_apart(self):
+        self.assertEqual(CisaLogicParseCache.normalize(' NOT  GT( 8,\n I4 ) '), 'NOT GT(8,I4)')
+
+    def test_eviction(self):
+        cache = CisaLogicParseCache(maxsize=2)
+        cache.parse('EQ(1, I1)')
+        cache.parse('EQ(2, I1)')
+        cache.parse('EQ(1, I1)')  # Refresh, so EQ(2, I1) is the oldest
+        cache.parse('EQ(3, I1)')
+        self.assertEqual(cache.get_stats()['evictions'], 1)
+        self.assertIn('EQ(1, I1)', cache)
+        self.assertNotIn('EQ(2, I1)', cache)
+
+    def test_shared_trees_are_frozen(self):
+        cache = CisaLogicParseCache()
+        parsed = cache.parse('ANY(GT(8, I4), NOT IN(8, S1))')
+        self.assertTrue(parsed.is_frozen())
+        self.assertIsInstance(parsed.v, tuple)
+        with self.assertRaises(AttributeError):
+            parsed.v = []
+        with self.assertRaises(AttributeError):
+            parsed.v[0].t.ref = 'I5'
+
+    def test_expressions_share_trees(self):
+        first = InstrumentLogicExpression('IN(1, S3)', '@NEXT')
+        second = InstrumentLogicExpression('IN(1,S3)', '@HERE')
+        self.assertIs(first.get_cisa_logic(), second.get_cisa_logic())
+        self.assertIs(first.get_cisa_logic(), parse_cached('IN(1, S3)'))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,83 @@
+import gc
+import os
+import random
+import tempfile
+import unittest
+from surveylang.logicelements.logicparser import CisaLogicParser, CisaLogicEvaluator
+from surveylang.logicelements.logicparser import ANY, EQ, IN, ItemIndexable, SectionIndexable
+from surveylang.logicelements.logicstats import CisaLogicStats, AdaptiveCisaLogicEvaluator
+from helpers import random_logic
+
+
+class TestShortCircuit(unittest.TestCase):
+    def test_any_and_all_stop_early(self):
+        parser = CisaLogicParser()
+        evaluator = CisaLogicEvaluator(ref_dict={'I1': 0, 'I99': 99}, section_responses=[[1]])
+        # I99 is out of range: evaluating it would raise IndexError
+        self.assertTrue(evaluator.eval(parser.parse('ANY(EQ(1, I1), EQ(1, I99))')))
+        self.assertFalse(evaluator.eval(parser.parse('ALL(EQ(2, I1), EQ(1, I99))')))
+
+
+class TestAdaptiveEvaluator(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cisaparser = CisaLogicParser()
+        self.ref_index_dict = {'S{}'.format(i + 1): i for i in range(5)}
+        self.ref_index_dict.update({'I{}'.format(i + 1): i for i in range(8)})
+        self.section_responses = [[1, 2, 3], [9], [10, 11], [8], [99]]
+
+    def test_matches_evaluator(self):
+        stats = CisaLogicStats(reorder_interval=3)
+        rnd = random.Random(5)
+        logics = [random_logic(rnd) for _ in range(100)]
+        for _ in range(5):
+            for logic in logics:
+                plain = CisaLogicEvaluator(self.ref_index_dict, self.section_responses).eval(logic)
+                adaptive = AdaptiveCisaLogicEvaluator(self.ref_index_dict, self.section_responses, stats).eval(logic)
+                self.assertEqual(adaptive, bool(plain), msg=str(logic))
+
+    def test_decisive_children_move_first(self):
+        stats = CisaLogicStats(reorder_interval=1)
+        logic = self.cisaparser.parse('ANY(EQ(7, I1), IN(99, S5))')
+        for _ in range(3):
+            self.assertTrue(AdaptiveCisaLogicEvaluator(self.ref_index_dict, self.section_responses, stats).eval(logic))
+        self.assertEqual(stats.order(logic)[0], logic.v[1])
+        self.assertEqual(stats.get(logic.v[1]), {'evaluations': 3, 'p_true': 1.0, 'cost': 1.0})
+        self.assertEqual(stats.get(logic.v[0])['evaluations'], 1)  # Not needed once IN runs first
+
+    def test_unseen_children_ordered_by_static_cost(self):
+        stats = CisaLogicStats()
+        logic = self.cisaparser.parse('ALL(ANY(EQ(1, I1), EQ(2, I2), EQ(5, I3)), IN(99, S5))')
+        self.assertEqual(stats.order(logic)[0], logic.v[1])
+
+    def test_nodes_are_not_kept_alive(self):
+        stats = CisaLogicStats()
+        for _ in range(50):
+            logic = ANY([EQ(7, ItemIndexable('I1')), IN(99, SectionIndexable('S5'))])
+            AdaptiveCisaLogicEvaluator(self.ref_index_dict, self.section_responses, stats).eval(logic)
+        del logic
+        gc.collect()
+        self.assertEqual(len(stats._nodes), 0)
+        self.assertEqual(len(stats), 2)  # The statistics themselves are kept by text
+
+    def test_equal_trees_are_cached_apart(self):
+        stats = CisaLogicStats(reorder_interval=1)
+        trees = [self.cisaparser.parse('ANY(EQ(7, I1), IN(99, S5))') for _ in range(2)]
+        for logic in trees:
+            AdaptiveCisaLogicEvaluator(self.ref_index_dict, self.section_responses, stats).eval(logic)
+        self.assertEqual(len(stats._nodes), 6)  # Each tree and its two children, without hashing the subtrees
+        self.assertEqual(stats.get(trees[1].v[1])['evaluations'], 2)  # The statistics are shared by text
+
+    def test_persistence(self):
+        stats = CisaLogicStats()
+        logic = self.cisaparser.parse('ALL(GT(5, I4), IN(1, S1))')
+        AdaptiveCisaLogicEvaluator(self.ref_index_dict, self.section_responses, stats).eval(logic)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'stats.json')
+            stats.save(path)
+            loaded = CisaLogicStats.load(path)
+        self.assertEqual(loaded.to_dict(), stats.to_dict())
+        self.assertEqual(loaded.get(self.cisaparser.parse('IN(1,S1)')), stats.get(logic.v[1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import random
+import tempfile
+import unittest
+import numpy as np
+from surveylang.models.responses import ResponseInstance, ResponseGroup
+from surveylang.models.mapped_response_store import MappedResponseStore
+from surveylang.models.sparse_response_store import SparseResponseStore
+from surveylang.logicelements.logicparser import EQ, ItemIndexable
+from helpers import random_logic
+
+
+def response(item_idx: int, value: int, option_idx: int, raw: str | None) -> ResponseInstance:
+    return ResponseInstance(value, raw, 0, 0, 0, 0, item_idx, option_idx)
+
+
+class TestMappedResponseStore(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'wave')
+        # Same layout as random_logic: 5 sections and 8 items
+        self.ref_dict = {'S{}'.format(i + 1): i for i in range(5)}
+        self.ref_dict.update({'I{}'.format(i + 1): i for i in range(8)})
+        self.section_offsets = [0, 3, 4, 6, 7, 8]
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        with MappedResponseStore.create(self.path) as store:
+            store.append_groups([ResponseGroup([response(5, 3, 2, 'três'), response(1, 0, 0, None)]),
+                                 ResponseGroup([response(5, 7, 6, '7')])])
+            store.append_answers([], [])
+            self.assertEqual(store.append_answers([2], [4], raw=['x']), 2)
+            self.assertEqual(len(store), 0)  # Not flushed yet
+        store = MappedResponseStore(self.path)
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store.get_offsets().tolist(), [0, 3, 3, 4])
+        self.assertEqual(store.column('item_idx').tolist(), [1, 5, 5, 2])
+        self.assertEqual(store.column('val').tolist(), [0, 3, 7, 4])
+        self.assertEqual(store.column('option_idx').tolist(), [0, 2, 6, -1])
+        self.assertEqual([store.get_raw(k) for k in range(4)], [None, 'três', '7', 'x'])
+        self.assertEqual(store.get_value(0, 5), 3)
+        self.assertIsNone(store.get_value(1, 5))
+        instance = store.get_group(0)[1]
+        self.assertEqual((instance.val, instance.raw, instance.item_idx, instance.option_idx), (3, 'três', 5, 2))
+        with self.assertRaises(ValueError):
+            store.append_answers([0], [1])
+        with self.assertRaises(FileExistsError):
+            MappedResponseStore.create(self.path)
+
+    def test_appends_extend_the_files(self):
+        with MappedResponseStore.create(self.path, buffer_size=2) as store:
+            for r in range(5):
+                store.append_answers([0, 3], [r, r + 1], raw=[str(r), None])
+            self.assertEqual((len(store), store.get_pending_count()), (4, 1))
+        with MappedResponseStore(self.path, 'r+') as store:
+            store.append_answers([7], [9], raw=['nine'])
+        # An interrupted flush leaves bytes past the published counts: they are ignored, then overwritten
+        with open(os.path.join(self.path, 'val.bin'), 'ab') as f:
+            f.write(b'\xff' * 13)
+        with MappedResponseStore(self.path, 'r+') as store:
+            self.assertEqual(store.get_response_count(), 11)
+            store.append_answers([1], [5], raw=['five'])
+        store = MappedResponseStore(self.path)
+        self.assertEqual(len(store), 7)
+        self.assertEqual(store.get_row(4)[1].tolist(), [4, 5])
+        self.assertEqual(store.get_value(6, 1), 5)
+        self.assertEqual([store.get_raw(k) for k in (8, 9, 10, 11)], ['4', None, 'nine', 'five'])
+        self.assertEqual(os.path.getsize(os.path.join(self.path, 'val.bin')), 12 * 8)
+
+    def test_bad_raw_values_do_not_lose_the_buffer(self):
+        store = MappedResponseStore.create(self.path, buffer_size=10)
+        store.append_answers([0], [1], raw=['ok'])
+        with self.assertRaises(ValueError):
+            store.append_answers([0], [2], raw=['\ud800'])
+        with self.assertRaises(TypeError):
+            store.append_answers([0], [2], raw=[2])
+        self.assertEqual(store.get_pending_count(), 1)
+        store.close()
+        store = MappedResponseStore(self.path)
+        self.assertEqual((len(store), store.get_raw(0)), (1, 'ok'))
+
+    def test_same_results_as_in_memory(self):
+        rng = np.random.default_rng(7)
+        memory = SparseResponseStore()
+        with MappedResponseStore.create(self.path) as store:
+            for _ in range(300):
+                slots = np.flatnonzero(rng.random(8) < 0.3)
+                values = rng.integers(0, 13, len(slots))
+                memory.append_answers(slots, values)
+                store.append_answers(slots, values)
+        store = MappedResponseStore(self.path)
+        batch = memory.get_batch_evaluator(self.ref_dict, self.section_offsets)
+        rnd = random.Random(7)
+        logics = [random_logic(rnd) for _ in range(60)]
+        results = store.eval_all(logics, self.ref_dict, self.section_offsets, chunk_size=37)
+        for logic, result in zip(logics, results):
+            self.assertEqual(result.tolist(), batch.eval(logic).tolist(), msg=str(logic))
+        evaluator = store.get_evaluator(self.ref_dict, self.section_offsets, 5)
+        self.assertEqual(evaluator.eval(logics[0]), results[0][5])
+
+        where = store.eval(EQ(2, ItemIndexable('I4')), self.ref_dict, self.section_offsets, chunk_size=50)
+        values, answered = memory.to_dense(8)
+        for selected in (None, where):
+            rows = answered[:, 6] if selected is None else answered[:, 6] & selected
+            expected = dict(zip(*(x.tolist() for x in np.unique(values[rows, 6], return_counts=True))))
+            self.assertEqual(store.tabulate(6, selected, chunk_size=41), expected)
+
+    def test_rejects_other_files(self):
+        os.makedirs(self.path)
+        with open(os.path.join(self.path, 'store.json'), 'w') as f:
+            f.write('{"format": "other"}')
+        with self.assertRaises(ValueError):
+            MappedResponseStore(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
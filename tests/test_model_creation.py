@@ -1,5 +1,5 @@
 import unittest
-from surveylang.models.instrument_component_base import InstrumentComponentBase
+from surveylang.models.instrument_component_base import InstrumentComponentBase, InstrumentComponentListener
 from surveylang.models import instrument_components as components
 
 
@@ -38,6 +38,128 @@ class TestModelCreation(unittest.TestCase):
 
         self.assertTrue(item1.verify())
 
+    def test_compact_components(self):
+        option = components.Option()
+        self.assertFalse(hasattr(option, '__dict__'))
+        self.assertFalse(hasattr(components.ItemNumeric(), '__dict__'))
+        with self.assertRaises(AttributeError):
+            option.undeclared = 1
+        self.assertIsNone(option._uid)  # Generated on first use
+        uid = option.get_uid()
+        self.assertEqual(option.get_uid(), uid)
+        self.assertNotEqual(components.Option().get_uid(), uid)
+
+    def test_parent_and_listeners(self):
+        events = []
+
+        class Recorder(InstrumentComponentListener):
+            def child_added(self, parent, child):
+                events.append(('added', child.get_shortname()))
+
+            def child_removed(self, parent, child):
+                events.append(('removed', child.get_shortname()))
+
+            def children_moved(self, parent):
+                events.append(('moved', parent.get_shortname()))
+
+        segment = components.Segment()
+        segment.set_shortname("segment")
+        battery = components.Battery()
+        battery.add_child(segment)
+        battery.add_listener(Recorder())
+        item1 = components.Item()
+        item1.set_shortname("item1")
+        item2 = components.Item()
+        item2.set_shortname("item2")
+        segment.add_child(item1)
+        segment.add_child(item2)
+        segment.move_child_up(item2)
+        segment.remove_child(item1)
+
+        self.assertIs(item2.get_parent(), segment)
+        self.assertIs(item2.get_root(), battery)
+        self.assertIsNone(item1.get_parent())
+        self.assertEqual(item2.get_position(), 0)
+        self.assertEqual(events, [('added', 'item1'), ('added', 'item2'), ('moved', 'segment'), ('removed', 'item1')])
+
+    def test_adding_a_child_moves_it_from_its_parent(self):
+        first, second = components.Segment(), components.Segment()
+        items = [components.Item() for _ in range(3)]
+        for item in items:
+            first.add_child(item)
+        second.add_child(components.Item())
+        second.add_child(items[0])
+        self.assertEqual(first.get_children(), [items[1], items[2]])
+        self.assertIs(items[0].get_parent(), second)
+        second[0] = items[1]
+        self.assertEqual((first.get_children(), second.get_children()), ([items[2]], [items[1], items[0]]))
+        with self.assertRaises(ValueError):
+            second[0] = items[0]
+        second.insert_child_at(0, items[0])
+        self.assertEqual(second.get_children(), [items[0], items[1]])
+        self.assertTrue(first.build().verify() and second.build().verify())
+        self.assertEqual([x.get_position() for x in second], [0, 1])
+
+    def test_positions_are_renumbered_by_build(self):
+        questionnaire = components.Questionnaire()
+        segments = []
+        for _ in range(3):
+            section = components.Section()
+            segment = components.Segment()
+            for _ in range(4):
+                segment.add_child(components.Item())
+            section.add_child(segment)
+            questionnaire.add_child(section)
+            segments.append(segment)
+        self.assertTrue(questionnaire.verify())
+
+        segment = segments[1]
+        first = components.Item()
+        segment.insert_child_at(0, first)
+        self.assertEqual(first.get_position(), 0)
+        self.assertFalse(questionnaire.verify())  # The following items are renumbered by build()
+        # Only the path to the changed segment is visited
+        self.assertEqual(list(questionnaire._dirty_children.values()), [segment.get_parent()])
+        questionnaire.build()
+        self.assertTrue(questionnaire.verify())
+        self.assertEqual([x.get_position() for x in segment], list(range(5)))
+        self.assertEqual(questionnaire._dirty_children, {})
+
+        last = segment[-1]
+        segment.move_child_up(last)
+        segment.move_child_to_start(segment[2])
+        del segment[1]
+        segment[0] = components.Item()
+        segment.remove_child(segment[1])
+        segment.build()
+        self.assertEqual([x.get_position() for x in segment], list(range(3)))
+        self.assertTrue(questionnaire.verify())
+
+        segment[0].set_position(7)
+        self.assertFalse(questionnaire.verify())
+        self.assertEqual(questionnaire.build().get_children()[1][0][0].get_position(), 0)
+        self.assertTrue(questionnaire.verify())
+
+    def test_children_change_only_through_the_component(self):
+        segment = components.Segment()
+        items = [components.Item() for _ in range(4)]
+        for item in items:
+            segment.add_child(item)
+        self.assertIs(segment.get_children(), segment.get_children())
+        self.assertEqual(segment.get_child_index(items[2]), 2)
+        del segment[-1]
+        del segment[-1]
+        segment[-1] = components.Item()
+        self.assertEqual([x.get_position() for x in segment.build()], [0, 1])
+        self.assertEqual((items[1].get_position(), items[2].get_position()), (-1, -1))
+        self.assertTrue(segment.verify())
+        with self.assertRaises(TypeError):
+            del segment[0:1]
+        with self.assertRaises(TypeError):
+            segment[0:1] = [components.Item()]
+        with self.assertRaises(IndexError):
+            del segment[2]
+
 
 if __name__ == '__main__':
     unittest.main()
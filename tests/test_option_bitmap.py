@@ -0,0 +1,83 @@
+import random
+import unittest
+import numpy as np
+from surveylang.models import instrument_components as components
+from surveylang.models.option_bitmap import OptionBitmap
+from surveylang.models.responses import ResponseInstance, ResponseGroup
+from surveylang.logicelements.batchevaluator import CisaBatchEvaluator, SectionBitmap
+from surveylang.logicelements.logicparser import IN, SLT, SLTE, SGT, SGTE, ANY, ALL, NOT, EQ
+from surveylang.logicelements.logicparser import SectionIndexable, ItemIndexable
+
+
+def checkbox_item(values: list[int]) -> components.ItemCheckbox:
+    item = components.ItemCheckbox()
+    for value in values:
+        option = components.Option()
+        option.set_value(value)
+        option.set_raw_value(str(value))
+        item.add_child(option)
+    return item
+
+
+class TestOptionBitmap(unittest.TestCase):
+    def setUp(self) -> None:
+        self.items = [checkbox_item([1, 2, 3, 4, 5]), checkbox_item(list(range(10, 90, 10)))]
+        self.coding = OptionBitmap(self.items, item_indices=[3, 4], section_idx=2, segment_idx=1)
+
+    def response(self, item_idx: int, option_idx: int) -> ResponseInstance:
+        option = self.items[item_idx - 3][option_idx]
+        return ResponseInstance(option.get_value(), option.get_raw_value(), 2, -1, -1, 1, item_idx, option_idx)
+
+    def assertSameGroup(self, first: ResponseGroup, second: ResponseGroup):
+        fields = lambda ri: (ri.val, ri.raw, ri.section_idx, ri.question_idx, ri.battery_idx, ri.segment_idx,
+                             ri.item_idx, ri.option_idx)
+        self.assertEqual([fields(x) for x in first], [fields(x) for x in second])
+
+    def test_round_trip(self):
+        group = ResponseGroup([self.response(3, 1), self.response(3, 4), self.response(4, 7)])
+        bits = self.coding.encode(group)
+        self.assertEqual(bits, (1 << 1) | (1 << 4) | (1 << 12))
+        self.assertSameGroup(self.coding.decode(bits), group)
+        self.assertEqual(len(self.coding.decode(0)), 0)
+        with self.assertRaises(ValueError):
+            self.coding.encode([self.response(3, 1), ResponseInstance(1, '1', 2, -1, -1, 1, 9, 0)])
+
+        groups = [group, ResponseGroup([]), ResponseGroup([self.response(4, 0)])]
+        bitmap = self.coding.encode_groups(groups)
+        self.assertEqual(bitmap.words.shape, (3, 1))
+        self.assertEqual(bitmap.get_bits(0), bits)
+        for decoded, original in zip(self.coding.decode_groups(bitmap), groups):
+            self.assertSameGroup(decoded, original)
+
+    def test_same_results_as_values(self):
+        rnd = random.Random(4)
+        wide = OptionBitmap([checkbox_item(list(range(100)))])  # Two words per respondent
+        for coding, n_values in ((self.coding, 13), (wide, 100)):
+            groups, respondents = [], []
+            for _ in range(300):
+                picked = sorted(rnd.sample(range(n_values), rnd.choice([0, 1, 2, 5])))
+                group = [ResponseInstance(0, None, 0, 0, 0, 0, *coding.get_bit_key(b)) for b in picked]
+                groups.append(group)
+                respondents.append([[int(coding.bit_values[b]) for b in picked], [rnd.randint(0, 9)]])
+            ref_dict = {'S1': 0, 'S2': 1, 'I1': 0}
+            by_values = CisaBatchEvaluator.from_section_responses(ref_dict, respondents)
+            by_bits = CisaBatchEvaluator.from_section_responses(ref_dict, respondents,
+                                                                bitmaps={0: coding.encode_groups(groups)})
+            s1, s2 = SectionIndexable('S1'), SectionIndexable('S2')
+            conditions = [cls(x, s1) for cls in (IN, SLT, SLTE, SGT, SGTE) for x in (0, 3, 5, 40, 99, 1000)]
+            conditions += [
+                ANY([IN(2, s1), IN(30, s1), IN(4, s2)]),
+                ANY([IN(3, s1), SGT(50, s1), EQ(1, ItemIndexable('I1'))]),
+                ALL([NOT(IN(1, s1)), SLTE(20, s1)]),
+                NOT(ANY([IN(1, s1), IN(5, s1)])),
+            ]
+            for logic in conditions:
+                self.assertEqual(by_bits.eval(logic).tolist(), by_values.eval(logic).tolist(), msg=str(logic))
+
+    def test_section_bitmap(self):
+        bitmap = SectionBitmap.from_selected(np.array([[True, False, True], [False, False, False]]), [7, 8, 9])
+        self.assertEqual(bitmap.get_bits(0), 0b101)
+        self.assertEqual(bitmap.eval(SGTE(9, 0)).tolist(), [True, False])
+        self.assertEqual(bitmap.any_of(np.array([False, True, False])).tolist(), [False, False])
+        with self.assertRaises(ValueError):
+            SectionBitmap(np.zeros(2, dtype=np.uint64), list(range(65)))
@@ -0,0 +1,88 @@
+import unittest
+from surveylang.models import instrument_components as components
+from surveylang.models.instrument_components import OptionSet, share_option_sets
+from helpers import likert_item
+
+
+class TestOptionSets(unittest.TestCase):
+    def setUp(self) -> None:
+        self.questionnaire = components.Questionnaire()
+        section = components.Section()
+        segment = components.Segment()
+        for i in range(4):
+            segment.add_child(likert_item(f'likert{i}'))
+        other = components.ItemList()
+        other.set_shortname('other')
+        other.add_child(components.Option())
+        segment.add_child(other)
+        section.add_child(segment)
+        self.questionnaire.add_child(section)
+        self.segment = segment
+
+    def test_share_and_copy_on_write(self):
+        index = self.questionnaire.get_component_index()
+        n_indexed = len(index)
+        option_sets = share_option_sets(self.questionnaire)
+        self.assertEqual(len(option_sets), 2)
+        first, second = self.segment[0], self.segment[1]
+        self.assertIs(first.get_option_set(), second.get_option_set())
+        self.assertIs(first.get_options()[2], second.get_options()[2])
+        self.assertEqual([x.get_text() for x in second.get_options()][:2], ['Never', 'Rarely'])
+        self.assertEqual(len(index), n_indexed - (4 * 5 + 1))  # Shared options belong to no item
+        self.assertEqual(first.get_option_set().get_index('4'), 3)
+        with self.assertRaises(AttributeError):
+            first.get_options()[0].set_text('Not at all')
+
+        # Customizing one scale copies the options of that item only
+        extra = components.Option()
+        extra.set_value(6)
+        second.add_child(extra)
+        self.assertIsNone(second.get_option_set())
+        self.assertEqual(len(second), 6)
+        self.assertEqual(len(first), 5)
+        self.assertIsNot(second[0], first[0])
+        self.assertIs(second[0].get_parent(), second)
+        second[0].set_text('Not at all')
+        self.assertEqual(first[0].get_text(), 'Never')
+        self.assertEqual(index.find_path(extra.get_uid()), (0, 0, 1, 5))
+
+        third = self.segment[2]
+        third.move_child_to_start(third[4])
+        self.assertEqual([x.get_value() for x in third], [5, 1, 2, 3, 4])
+        self.assertEqual([x.get_value() for x in self.segment[3]], [1, 2, 3, 4, 5])
+        self.assertIs(self.segment[3].get_option_set(), first.get_option_set())
+
+    def test_only_identical_options_are_shared(self):
+        for i, item in enumerate(self.segment.get_children()[:2]):
+            item[0].set_shortname(f'likert{i}_opt1')
+        share_option_sets(self.questionnaire)
+        first, second, third = self.segment[0], self.segment[1], self.segment[2]
+        self.assertIsNot(first.get_option_set(), second.get_option_set())
+        self.assertEqual(second[0].get_shortname(), 'likert1_opt1')
+        self.assertIs(third.get_option_set(), self.segment[3].get_option_set())
+
+        # The options of a set cannot be changed through one of its items
+        with self.assertRaises(AttributeError):
+            third.get_options().append(components.Option())
+        with self.assertRaises(AttributeError):
+            third.get_option_set().get_options().append(components.Option())
+        self.assertEqual(len(self.segment[3]), 5)
+        self.assertIsNone(third[0].get_parent())  # Shared options have no parent
+        third.own_options()
+        self.assertIs(third[0].get_parent(), third)
+        self.assertIs(third[0].get_root(), self.questionnaire)
+
+    def test_option_set(self):
+        scale = OptionSet.from_values([1, 2, 3], ['a', 'b', 'c'])
+        self.assertEqual(scale, OptionSet.from_values([1, 2, 3], ['a', 'b', 'c']))
+        self.assertNotEqual(scale, OptionSet.from_values([1, 2, 3]))
+        item = likert_item('item')
+        item.set_option_set(scale)
+        self.assertEqual([x.get_text() for x in item.get_options()], ['a', 'b', 'c'])
+        item.remove_child(scale[1])
+        self.assertEqual([x.get_value() for x in item], [1, 3])
+        self.assertEqual(len(scale), 3)
+        item.set_option_set(scale)
+        item.clear_children()
+        self.assertEqual(len(item), 0)
+        self.assertTrue(item.build().verify())
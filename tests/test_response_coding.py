@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+import unittest
+from surveylang.models.instrument_components import Option, OptionSet
+from surveylang.models.response_coding import OptionCoding
+from helpers import likert_item
+
+
+class TestResponseCoding(unittest.TestCase):
+    def test_item_coding(self):
+        item = likert_item('item')
+        coding = item.get_coding()
+        self.assertEqual(coding.code('3'), (3, 2))
+        self.assertEqual(coding.get_option_index('5'), 4)
+        self.assertIsNone(coding.code('Often'))
+        with self.assertRaises(KeyError):
+            coding.get_value('6')
+        coding = item.get_coding(match_text=True)
+        self.assertEqual(coding.code('  often '), (4, 3))
+        self.assertEqual(coding.code('ALWAYS'), (5, 4))
+
+    def test_code_column(self):
+        item = likert_item('item')
+        column = item.get_coding(match_text=True).code_column(['1', 'never', None, '9', '5', '9', 'N/A'])
+        self.assertEqual(column.values.tolist(), [1, 1, -1, -1, 5, -1, -1])
+        self.assertEqual(column.option_indices.tolist(), [0, 0, -1, -1, 4, -1, -1])
+        self.assertEqual(column.known.tolist(), [True, True, False, False, True, False, False])
+        self.assertEqual(column.unknown, {'9': [3, 5], 'N/A': [6]})
+        self.assertEqual(column.get_unknown_count(), 3)
+        self.assertFalse(column.is_complete())
+        self.assertTrue(OptionCoding(item.get_options()).code_column(['2', None]).is_complete())
+
+    def test_item_coding_is_kept_until_the_options_change(self):
+        item = likert_item('item')
+        coding = item.get_coding()
+        self.assertIs(item.get_coding(), coding)
+        self.assertIsNot(item.get_coding(match_text=True), coding)
+        item[0].set_value(-1)
+        self.assertEqual(item.get_coding().code('-1'), (-1, 0))
+        extra = Option()
+        item.add_child(extra)
+        self.assertEqual(item.get_coding().code('-1'), (-1, 0))
+        self.assertIsNone(item.get_coding().code('6'))
+        extra.set_raw_value('6')
+        self.assertEqual(item.get_coding().code('6'), (None, 5))  # An option without value is not -1
+        column = item.get_coding().code_column(['-1', '6', 'x'])
+        self.assertEqual(column.valued.tolist(), [True, False, False])
+        self.assertEqual(column.known.tolist(), [True, True, False])
+        self.assertEqual(column.values[0], -1)
+        item.remove_child(extra)
+        self.assertIsNone(item.get_coding().code('6'))
+
+    def test_shared_coding(self):
+        scale = OptionSet.from_values([1, 2, 3])
+        first, second = likert_item('first'), likert_item('second')
+        first.set_option_set(scale)
+        second.set_option_set(scale)
+        self.assertIs(first.get_coding(), second.get_coding())
+        self.assertEqual(scale.get_index('2'), 1)
+
+    def test_numpy_is_imported_on_first_coding(self):
+        code = ('import sys, surveylang.models.instrument_components as m; print("numpy" in sys.modules); '
+                'm.Item().get_coding(); print("numpy" in sys.modules)')
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, check=True)
+        self.assertEqual(out.stdout.split(), ['False', 'True'])
@@ -0,0 +1,58 @@
+import array
+import unittest
+from surveylang.models import instrument_components as components
+from surveylang.logicelements.logicparser import CisaLogicEvaluator, parse_cached
+from helpers import make_questionnaire
+
+
+class TestResponseLayout(unittest.TestCase):
+    def setUp(self) -> None:
+        self.questionnaire = make_questionnaire(n_sections=3, n_items=2)
+
+    def test_layout(self):
+        layout = self.questionnaire.get_response_layout()
+        self.assertEqual(layout.get_section_count(), 3)
+        self.assertEqual(layout.get_item_count(), 6)
+        self.assertEqual(layout.get_section_offsets(), [0, 2, 4, 6])
+        self.assertEqual(layout.get_ref_dict()['S2'], 1)
+        self.assertEqual(layout.get_ref_dict()['I6'], 5)
+        item = self.questionnaire.get_component('item1_1')
+        self.assertEqual(layout.get_item_slot(item), 3)
+        self.assertIs(layout.get_item(3), item)
+        self.assertEqual(layout.get_section_of_slot(3), 1)
+        self.assertEqual(layout.get_section_index(self.questionnaire[2]), 2)
+        section_responses = layout.split([1, 2, 3, 4, 5, 6])
+        self.assertEqual(section_responses, [[1, 2], [3, 4], [5, 6]])
+        evaluator = CisaLogicEvaluator(layout.get_ref_dict(), section_responses)
+        self.assertTrue(evaluator.eval(parse_cached('ALL(IN(4, S2), EQ(4, I4))')))
+        flat = layout.get_evaluator(array.array('q', [1, 2, 3, 4, 5, 6]))
+        self.assertTrue(flat.eval(parse_cached('ALL(IN(4, S2), EQ(4, I4))')))
+        self.assertFalse(flat.bind(array.array('q', [0] * 6)).eval(parse_cached('IN(4, S2)')))
+        self.assertIs(self.questionnaire.get_response_layout(), layout)
+
+    def test_incremental_updates(self):
+        layout = self.questionnaire.get_response_layout()
+        planner = self.questionnaire._layout_planner
+        rebuilt = planner.rebuilt_sections
+        segment = self.questionnaire.get_component('Q1')
+        item = components.Item()
+        segment.insert_child_at(0, item)
+        updated = self.questionnaire.get_response_layout()
+        self.assertIsNot(updated, layout)
+        self.assertEqual(planner.rebuilt_sections, rebuilt + 1)  # Only the section of the item
+        self.assertEqual(updated.get_section_offsets(), [0, 2, 5, 7])
+        self.assertEqual(updated.get_item_slot(item), 2)
+
+        # Options do not change the layout
+        option = components.Option()
+        item.add_child(option)
+        self.assertIs(self.questionnaire.get_response_layout(), updated)
+
+        segment.move_child_to_end(item)
+        self.assertEqual(self.questionnaire.get_response_layout().get_item_slot(item), 4)
+        del self.questionnaire[0]
+        layout = self.questionnaire.get_response_layout()
+        self.assertEqual(layout.get_section_offsets(), [0, 3, 5])
+        self.assertEqual(layout.get_item_slot(item), 2)
+        self.questionnaire.move_child_to_start(self.questionnaire[1])
+        self.assertEqual(self.questionnaire.get_response_layout().get_section_offsets(), [0, 2, 5])
@@ -0,0 +1,54 @@
+import unittest
+import numpy as np
+from surveylang.models.responses import ResponseInstance, ResponseGroup, ResponseMatrix
+from surveylang.models.response_store import ResponseStore
+
+
+def make_matrix(section_values: list[list[int]]) -> ResponseMatrix:
+    groups = []
+    for s, values in enumerate(section_values):
+        groups.append(ResponseGroup([ResponseInstance(v, str(v), s, 0, 0, 0, i, v) for i, v in enumerate(values)]))
+    return ResponseMatrix(groups)
+
+
+class TestResponseStore(unittest.TestCase):
+    def setUp(self) -> None:
+        self.matrices = [make_matrix([[1, 2, 3], [9], [10, 11]]), make_matrix([[], [4]]), make_matrix([[1]])]
+        self.store = ResponseStore.from_response_matrices(self.matrices)
+
+    def test_response_matrix_layout(self):
+        self.assertEqual(len(self.store), 3)
+        for matrix, view in zip(self.matrices, self.store):
+            self.assertEqual([list(x) for x in view.get_response_matrix()], matrix.get_response_matrix())
+
+    def test_views_share_memory(self):
+        groups = self.store.get_response_matrix(0)
+        self.assertTrue(np.shares_memory(groups[0], self.store.column('val')))
+
+    def test_iteration_rebuilds_instances(self):
+        view = self.store[0]
+        self.assertEqual(len(view), 3)
+        instance = view[2][1]
+        self.assertEqual((instance.val, instance.raw, instance.section_idx, instance.item_idx, instance.option_idx),
+                         (11, '11', 2, 1, 11))
+        self.assertEqual([int(ri) for group in view for ri in group], [1, 2, 3, 9, 10, 11])
+
+    def test_raw_strings_are_interned(self):
+        self.assertEqual(self.store.get_raw_table().count('1'), 1)
+        raw_ids = self.store.column('raw_id')
+        self.assertEqual(raw_ids[0], raw_ids[-1])
+
+    def test_append_arrays_and_growth(self):
+        store = ResponseStore(capacity=2)
+        for r in range(50):
+            store.append_arrays([r, r + 1, r + 2], [2, 1], item_idx=[0, 1, 2])
+        self.assertEqual(store.get_response_count(), 150)
+        self.assertEqual([list(x) for x in store.get_response_matrix(49)], [[49, 50], [51]])
+        self.assertEqual(store[49][1][0].item_idx, 2)
+        self.assertIsNone(store[49][1][0].raw)
+        with self.assertRaises(ValueError):
+            store.append_arrays([1, 2], [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+from surveylang.models.routing import RoutingTable, RoutingError, END
+from surveylang.models import instrument_components as components
+from helpers import make_segment
+
+
+class TestRoutingTable(unittest.TestCase):
+    def setUp(self) -> None:
+        self.questionnaire = components.Questionnaire()
+        self.battery = components.Battery()
+        self.battery.add_child(make_segment('A', exit_logic=[('EQ(1, I1)', 'C')]))
+        self.battery.add_child(make_segment('B', entry=[('EQ(2, I1)', '@NEXT')]))
+        self.battery.add_child(make_segment('C', exit_logic=[('EQ(3, I1)', '@HERE')]))
+        self.questionnaire.add_child(self.battery)
+        self.table = RoutingTable(self.questionnaire)
+
+    def test_targets_resolve_to_states(self):
+        a, b, c = self.battery.get_children()
+        self.assertEqual(len(self.table), 5)
+        pairs, default = self.table.get_row(self.table.get_state(a, RoutingTable.EXIT))
+        self.assertEqual(pairs, [(a.get_exit_logic().get_expressions()[0], self.table.get_state(c, RoutingTable.ENTER))])
+        self.assertEqual(default, self.table.get_state(b, RoutingTable.ENTER))
+        pairs, default = self.table.get_row(self.table.get_state(b, RoutingTable.ENTER))
+        self.assertEqual(pairs[0][1], self.table.get_state(c, RoutingTable.ENTER))
+        self.assertEqual(default, self.table.get_state(b, RoutingTable.PRESENT))
+        pairs, default = self.table.get_row(self.table.get_state(c, RoutingTable.EXIT))
+        self.assertEqual(pairs[0][1], self.table.get_state(c, RoutingTable.ENTER))
+        self.assertEqual(default, self.table.get_state(self.battery, RoutingTable.EXIT))
+        _, default = self.table.get_row(self.table.get_state(self.questionnaire, RoutingTable.EXIT))
+        self.assertEqual(default, END)
+
+    def test_route(self):
+        a, b, c = self.battery.get_children()
+        never = lambda expression: False
+        self.assertIs(self.table.first(never), a)
+        self.assertIs(self.table.after(a, never), b)
+        self.assertIs(self.table.after(b, never), c)
+        self.assertIsNone(self.table.after(c, never))
+        self.assertIs(self.table.after(a, lambda expression: True), c)
+        self.assertIs(self.table.after(c, lambda expression: expression.get_target() == '@HERE'), c)
+
+    def test_unresolved_targets(self):
+        self.battery.add_child(make_segment('D', entry=[('EQ(1, I1)', 'X'), ('EQ(2, I1)', 'Y')]))
+        with self.assertRaises(RoutingError) as context:
+            RoutingTable(self.questionnaire)
+        self.assertEqual(context.exception.targets, ['X', 'Y'])
+
+    def test_loop(self):
+        self.battery.add_child(make_segment('D', entry=[('EQ(1, I1)', 'E')]))
+        self.battery.add_child(make_segment('E', entry=[('EQ(1, I1)', 'D')]))
+        table = RoutingTable(self.questionnaire)
+        with self.assertRaises(RuntimeError):
+            table.after(self.battery[2], lambda expression: expression.get_target() in ('D', 'E'))
+
+    def test_session_recompiles_after_changes(self):
+        from surveylang.models.interview_session import InterviewSession
+        session = InterviewSession(self.questionnaire, {'I1': 0, 'S1': 0}, [[0]])
+        table = session.get_routing_table()
+        self.assertIs(session.get_routing_table(), table)
+        self.battery.move_child_to_start(self.battery[2])
+        self.assertIsNot(session.get_routing_table(), table)
+        self.assertEqual(session.start().get_shortname(), 'C')
+        session.close()
@@ -0,0 +1,86 @@
+import random
+import unittest
+import numpy as np
+from surveylang.models.responses import ResponseInstance, ResponseGroup
+from surveylang.models.sparse_response_store import SparseResponseStore
+from surveylang.logicelements.batchevaluator import CisaBatchEvaluator
+from surveylang.logicelements.logiccompiler import CisaLogicCompiler
+from surveylang.logicelements.logicparser import UNANSWERED, EQ, IN, NOT, SLT, ItemIndexable, SectionIndexable
+from helpers import random_logic
+
+
+def answer(item_idx: int, value: int) -> ResponseInstance:
+    return ResponseInstance(value, str(value), 0, 0, 0, 0, item_idx, 0)
+
+
+class TestSparseResponseStore(unittest.TestCase):
+    def setUp(self) -> None:
+        # Same layout as random_logic: 5 sections and 8 items
+        self.ref_dict = {'S{}'.format(i + 1): i for i in range(5)}
+        self.ref_dict.update({'I{}'.format(i + 1): i for i in range(8)})
+        self.section_offsets = [0, 3, 4, 6, 7, 8]
+
+    def test_csr_arrays(self):
+        store = SparseResponseStore(capacity=2)
+        store.append_groups([ResponseGroup([answer(5, 3), answer(1, 0)]), ResponseGroup([])])
+        store.append_groups([])
+        store.append_answers([7, 2, 7], [1, 4, 2])
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store.get_row_pointers().tolist(), [0, 2, 2, 5])
+        self.assertEqual(store.get_item_slots().tolist(), [1, 5, 2, 7, 7])
+        self.assertEqual(store.get_values().tolist(), [0, 3, 4, 1, 2])
+        self.assertEqual(store.get_value(0, 1), 0)
+        self.assertIsNone(store.get_value(0, 2))
+        self.assertEqual(store.get_value(2, 7), 1)
+        self.assertEqual(store.nbytes(), 5 * 4 + 5 * 8 + 4 * 8)  # Proportional to the answers
+        values, answered = store.to_dense(8)
+        self.assertEqual(values[2].tolist(), [0, 0, 4, 0, 0, 0, 0, 1])
+        self.assertEqual(answered[0].tolist(), [False, True, False, False, False, True, False, False])
+
+    def test_unanswered_is_not_zero(self):
+        store = SparseResponseStore()
+        store.append_answers([0], [0])
+        store.append_answers([], [])
+        batch = store.get_batch_evaluator(self.ref_dict, self.section_offsets)
+        evaluator = store.get_evaluator(self.ref_dict, self.section_offsets)
+        equals_zero = EQ(0, ItemIndexable('I1'))
+        self.assertEqual(batch.eval(equals_zero).tolist(), [True, False])
+        self.assertEqual(batch.eval(NOT(equals_zero)).tolist(), [False, True])
+        self.assertTrue(evaluator.eval(equals_zero))
+        evaluator.bind(*store.get_row(1))
+        self.assertIs(evaluator.item_responses[0], UNANSWERED)
+        self.assertFalse(evaluator.eval(equals_zero))
+        self.assertFalse(evaluator.eval(IN(0, SectionIndexable('S1'))))
+        self.assertFalse(evaluator.eval(SLT(5, SectionIndexable('S1'))))
+
+    def test_same_results_as_dense(self):
+        rng = np.random.default_rng(6)
+        store = SparseResponseStore()
+        for _ in range(300):
+            slots = np.flatnonzero(rng.random(8) < 0.3)
+            store.append_answers(slots, rng.integers(0, 13, len(slots)))
+        values, answered = store.to_dense(8)
+        dense = CisaBatchEvaluator(self.ref_dict, values, self.section_offsets, answered)
+        sparse = store.get_batch_evaluator(self.ref_dict, self.section_offsets)
+        evaluator = store.get_evaluator(self.ref_dict, self.section_offsets)
+        compiler = CisaLogicCompiler(self.ref_dict)
+        rnd = random.Random(6)
+        for _ in range(100):
+            logic = random_logic(rnd)
+            expected = dense.eval(logic).tolist()
+            self.assertEqual(sparse.eval(logic).tolist(), expected, msg=str(logic))
+            compiled = compiler.compile(logic)
+            for r in range(0, 300, 7):
+                evaluator.bind(*store.get_row(r))
+                self.assertEqual(bool(evaluator.eval(logic)), expected[r], msg=str(logic))
+                self.assertEqual(compiled.eval(evaluator), expected[r], msg=str(logic))
+
+    def test_several_answers_per_item(self):
+        store = SparseResponseStore()
+        store.append_answers([3, 3, 4], [2, 9, 5])  # e.g. the options checked in one checkbox item
+        batch = store.get_batch_evaluator(self.ref_dict, self.section_offsets)
+        evaluator = store.get_evaluator(self.ref_dict, self.section_offsets)
+        for logic, expected in ((IN(9, SectionIndexable('S2')), True), (EQ(2, ItemIndexable('I4')), True),
+                                (EQ(9, ItemIndexable('I4')), False)):
+            self.assertEqual(batch.eval(logic).tolist(), [expected], msg=str(logic))
+            self.assertEqual(evaluator.eval(logic), expected, msg=str(logic))
@@ -0,0 +1,53 @@
+import unittest
+from surveylang.common.enumerators import ComponentType, ItemType
+from surveylang.models import instrument_components as components
+from surveylang.models.traversal import iter_preorder, iter_postorder, FlatTree
+from helpers import make_questionnaire
+
+
+class TestTraversal(unittest.TestCase):
+    def setUp(self) -> None:
+        self.questionnaire = make_questionnaire(n_sections=2, n_items=2)
+        checkbox = components.ItemCheckbox()
+        checkbox.set_shortname('checkbox')
+        self.questionnaire.get_component('Q1').add_child(checkbox)
+
+    def test_preorder_and_postorder(self):
+        types = [x.get_type() for x in iter_preorder(self.questionnaire, max_depth=2)]
+        self.assertEqual(types, [ComponentType.QUESTIONNAIRE, ComponentType.SECTION, ComponentType.QUESTION,
+                                 ComponentType.SECTION, ComponentType.QUESTION])
+        names = [x.get_shortname() for x in iter_preorder(self.questionnaire, ComponentType.ITEM)]
+        self.assertEqual(names, ['item0_0', 'item0_1', 'item1_0', 'item1_1', 'checkbox'])
+        checkboxes = list(iter_preorder(self.questionnaire, item_type=ItemType.CHECKBOX))
+        self.assertEqual([x.get_shortname() for x in checkboxes], ['checkbox'])
+
+        postorder = list(iter_postorder(self.questionnaire))
+        self.assertEqual(len(postorder), len(list(iter_preorder(self.questionnaire))))
+        self.assertIs(postorder[-1], self.questionnaire)
+        self.assertEqual(postorder[0].get_type(), ComponentType.OPTION)
+        self.assertEqual(postorder[1].get_shortname(), 'item0_0')
+        sections = list(iter_postorder(self.questionnaire, ComponentType.SECTION,
+                                       descend=lambda x: x.get_type() != ComponentType.SECTION))
+        self.assertEqual([x.get_shortname() for x in sections], ['S0', 'S1'])
+
+    def test_flat_tree(self):
+        flat = FlatTree(self.questionnaire)
+        self.assertEqual(flat.get_components(), list(iter_preorder(self.questionnaire)))
+        section = self.questionnaire[1]
+        self.assertEqual(flat.get_subtree(section), list(iter_preorder(section)))
+        self.assertEqual([x.get_shortname() for x in flat.get_descendants(section, ComponentType.ITEM)],
+                         ['item1_0', 'item1_1', 'checkbox'])
+        self.assertEqual(flat.count_descendants(self.questionnaire, ComponentType.OPTION), 4)
+        self.assertEqual(flat.get_descendants(self.questionnaire[0], ItemType.CHECKBOX), [])
+        item = self.questionnaire.get_component('item1_1')
+        index = flat.get_index(item)
+        self.assertEqual(flat.get_depth(index), 5)
+        self.assertIs(flat.get_components()[flat.get_parent_index(index)], item.get_parent())
+        self.assertEqual(flat.get_exit(index), index + 2)  # The item and its option
+        self.assertTrue(flat.is_descendant(item, section))
+        self.assertFalse(flat.is_descendant(item, self.questionnaire[0]))
+        self.assertEqual(flat.get_exit(0), len(flat))
+
+
+if __name__ == '__main__':
+    unittest.main()